@@ -0,0 +1,367 @@
+"""
+Bi-Cortex SNN Benchmark Suite
+
+エンジン・リザーバ初期化・Visual Encoder・実験シナリオの性能を計測し、JSON に保存する。
+保存済みのベースラインと比較し、指定した許容幅を超えて悪化した項目を報告する
+(悪化があった場合は終了コード 1)。
+
+使い方:
+    python benchmarks/run_benchmarks.py --quick                       # 小規模な計測
+    python benchmarks/run_benchmarks.py --save-baseline                # ベースラインとして保存
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.2
+
+計測項目:
+    engine     steps/sec とピークメモリ (n_mem, 結合密度, 発火状態, ゲート開放率, バックエンド)
+    reservoir  init_memory_reservoir の所要時間 (dense / sparse)
+    encoder    VisualEncoder の images/sec (バッチサイズ別)
+    scenarios  Phase 1.4 / 1.5 実験の end-to-end 実行時間
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# パス設定 (プロジェクトルートのモジュールを読み込めるようにする)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(os.path.join(project_root, 'src'))
+sys.path.append(project_root)
+
+from core.engine import BiCortexEngine
+from core.instrumentation import Instrumentation
+
+DEFAULT_OUTPUT = os.path.join(project_root, "reports/benchmarks/latest.json")
+DEFAULT_BASELINE = os.path.join(current_dir, "baseline.json")
+
+# 比較対象の指標と、その良い方向
+HIGHER_IS_BETTER = ("steps_per_sec", "images_per_sec")
+LOWER_IS_BETTER = ("wall_time_s", "peak_mem_mb")
+
+# 発火状態: 毎ステップ閾値超えの入力を受ける記憶ニューロンの割合
+FIRING_REGIMES = {"quiet": 0.0, "moderate": 0.02, "bursty": 0.1}
+
+# 各軸は既定値の周りで1つずつ変化させる (全組み合わせは計測しない)
+ENGINE_DEFAULTS = dict(n_mem=1000, density=0.1, regime="moderate", gate=0.5)
+FULL_GRID = dict(
+    n_mem=[100, 1000, 4000, 10000],
+    density=[0.01, 0.05, 0.1, 0.2],
+    regime=list(FIRING_REGIMES),
+    gate=[0.0, 0.5, 1.0],
+    backend=["dense", "sparse", "event_driven", "numba", "blocks"],
+)
+QUICK_GRID = dict(
+    n_mem=[100, 1000],
+    density=[0.01, 0.1],
+    regime=["quiet", "bursty"],
+    gate=[0.0, 1.0],
+    backend=["dense", "sparse", "event_driven"],
+)
+# dense な W (n_total^2 float64) が大きくなりすぎる構成は sparse 系バックエンドのみで計測する
+DENSE_MAX_N_MEM = 4000
+
+BACKENDS = {
+    "dense": dict(),
+    "sparse": dict(sparse=True),
+    "event_driven": dict(sparse=True, event_driven=True),
+    "numba": dict(backend="numba"),
+    "blocks": dict(block_structured=True),
+}
+
+
+def build_engine(n_mem, density, backend, seed=0):
+    kwargs = BACKENDS[backend]
+    engine = BiCortexEngine(n_sensory=2, n_concept=2, n_motor=1, n_mem=n_mem, seed=seed, **kwargs)
+    engine.init_memory_reservoir(density=density, spectral_radius=0.9, method="sparse")
+    return engine
+
+
+def make_inputs(engine, regime, gate, period=100, seed=0):
+    """
+    (period, n_total) の周期入力を作る
+    - 記憶野: FIRING_REGIMES[regime] の割合のニューロンに毎ステップ閾値超えの入力
+    - 概念野: 周期の先頭 gate の割合のステップで強い入力 (SRG ゲートを開く)
+    """
+    rng = np.random.default_rng(seed)
+    inputs = np.zeros((period, engine.n_total))
+    rate = FIRING_REGIMES[regime]
+    if rate > 0:
+        drive = rng.random((period, engine.n_mem)) < rate
+        inputs[:, engine.n_think:] = drive * (2.0 * engine.v_base)
+    inputs[:int(round(gate * period)), engine.idx_concept] = 2.0 * engine.v_base
+    return inputs
+
+
+def bench_engine(n_mem, density, regime, gate, backend, steps, warmup=20):
+    engine = build_engine(n_mem, density, backend)
+    inputs = make_inputs(engine, regime, gate)
+    period = len(inputs)
+    for t in range(warmup):
+        engine.step(inputs[t % period])
+
+    # 計測用カウンタ (タイマーなし) で実際の発火率・ゲート開放率を記録する
+    inst = engine.attach_instrumentation(Instrumentation(timers=False))
+    t0 = time.perf_counter()
+    for t in range(steps):
+        engine.step(inputs[t % period])
+    elapsed = time.perf_counter() - t0
+    summary = inst.summary()
+
+    return {
+        "engine_backend": engine.backend,  # 実際に実行されたバックエンド
+        "steps_per_sec": steps / elapsed,
+        "wall_time_s": elapsed,
+        "peak_mem_mb": peak_memory_mb(lambda: build_engine(n_mem, density, backend), inputs),
+        "gate_open_ratio": summary["gate_open_ratio"],
+        "mem_spike_rate": summary["spike_rate"]["mem"] / n_mem,
+        "hebbian_updates_per_step": summary["hebbian_updates"] / steps,
+    }
+
+
+def peak_memory_mb(build, inputs, steps=10):
+    """構築と数ステップの実行中に確保された Python / NumPy メモリのピーク (MiB)"""
+    tracemalloc.start()
+    try:
+        engine = build()
+        for t in range(steps):
+            engine.step(inputs[t % len(inputs)])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def engine_configs(grid):
+    """既定値から1軸ずつ変化させた構成の一覧"""
+    configs = []
+    for backend in grid["backend"]:
+        for axis in ("n_mem", "density", "regime", "gate"):
+            for value in grid[axis]:
+                config = dict(ENGINE_DEFAULTS, backend=backend)
+                config[axis] = value
+                if backend in ("dense", "numba", "blocks") and config["n_mem"] > DENSE_MAX_N_MEM:
+                    continue
+                if config not in configs:
+                    configs.append(config)
+    return configs
+
+
+def run_engine_suite(grid, steps):
+    from core import kernels
+
+    results = {}
+    for config in engine_configs(grid):
+        key = "engine/" + ",".join(f"{k}={v}" for k, v in config.items())
+        if config["backend"] == "numba" and not kernels.HAS_NUMBA:
+            # NumPy へのフォールバックを numba の結果として記録しない
+            print(f"  {key} (skipped: numba is not installed)", flush=True)
+            continue
+        print(f"  {key}", flush=True)
+        results[key] = guarded(bench_engine, steps=steps, **config)
+    return results
+
+
+def run_reservoir_suite(grid):
+    results = {}
+    for n_mem in grid["n_mem"]:
+        for method in ("dense", "sparse"):
+            if method == "dense" and n_mem > DENSE_MAX_N_MEM:
+                continue
+            key = f"reservoir/n_mem={n_mem},method={method}"
+            print(f"  {key}", flush=True)
+            results[key] = guarded(bench_reservoir, n_mem=n_mem, method=method)
+    return results
+
+
+def bench_reservoir(n_mem, method, density=0.1):
+    engine = BiCortexEngine(n_sensory=2, n_concept=2, n_motor=1, n_mem=n_mem, seed=0,
+                            sparse=(method == "sparse"))
+    t0 = time.perf_counter()
+    engine.init_memory_reservoir(density=density, spectral_radius=0.9, method=method)
+    return {"wall_time_s": time.perf_counter() - t0}
+
+
+def run_encoder_suite(batch_sizes, n_images):
+    from core.visual import VisualEncoder
+
+    rng = np.random.default_rng(0)
+    from PIL import Image
+    images = [Image.fromarray(rng.integers(0, 256, (224, 224, 3), dtype=np.uint8)) for _ in range(n_images)]
+
+    results = {}
+    for runtime in ("eager", "traced"):
+        encoder = VisualEncoder(runtime=runtime)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                encoder.load()
+        except Exception as e:
+            results[f"encoder/runtime={runtime}"] = {"error": repr(e)}
+            continue
+        for batch_size in batch_sizes:
+            key = f"encoder/runtime={runtime},batch_size={batch_size}"
+            print(f"  {key}", flush=True)
+            results[key] = guarded(bench_encoder, encoder=encoder, images=images, batch_size=batch_size)
+        encoder.close()
+    return results
+
+
+def bench_encoder(encoder, images, batch_size):
+    encoder.encode_batch(images[:batch_size], batch_size)  # ウォームアップ
+    t0 = time.perf_counter()
+    encoder.encode_batch(images, batch_size)
+    elapsed = time.perf_counter() - t0
+    return {"images_per_sec": len(images) / elapsed, "wall_time_s": elapsed}
+
+
+def run_scenario_suite():
+    from experiments.phase1_4_pavlov import run_experiment as pavlov
+    from experiments.phase1_5_discrimination import run_experiment as discrimination
+
+    results = {}
+    scenarios = (
+        ("phase1_4_pavlov", pavlov, pavlov.run_pavlov_experiment),
+        ("phase1_5_discrimination", discrimination, discrimination.run_discrimination_experiment),
+    )
+    for name, module, run in scenarios:
+        key = f"scenario/{name}"
+        print(f"  {key}", flush=True)
+        results[key] = guarded(bench_scenario, module=module, run=run)
+    return results
+
+
+def bench_scenario(module, run):
+    # グラフ出力先を一時ディレクトリへ差し替え、reports/ の成果物を上書きしない
+    original_root = module.project_root
+    with tempfile.TemporaryDirectory() as tmp:
+        module.project_root = tmp
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - t0
+        finally:
+            module.project_root = original_root
+    return {"wall_time_s": elapsed}
+
+
+def guarded(func, **kwargs):
+    """1項目の失敗 (依存ライブラリ不足・メモリ不足など) で全体を止めない"""
+    try:
+        return func(**kwargs)
+    except Exception as e:
+        print(f"    failed: {e!r}", flush=True)
+        return {"error": repr(e)}
+
+
+def environment() -> dict:
+    import scipy
+    env = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+    }
+    try:
+        import numba
+        env["numba"] = numba.__version__
+    except ImportError:
+        pass
+    return env
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    ベースラインより tolerance (相対) を超えて悪化した指標を返す
+
+    Returns:
+        list[tuple]: (項目, 指標, ベースライン値, 今回の値, 相対変化)
+    """
+    regressions = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if base is None or "error" in metrics or "error" in base:
+            continue
+        if "engine_backend" in base and metrics.get("engine_backend") != base["engine_backend"]:
+            # 実行されたバックエンドが異なる (numba のフォールバック等) 結果は比較しない
+            continue
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            if metric not in metrics or metric not in base or base[metric] == 0:
+                continue
+            change = (metrics[metric] - base[metric]) / base[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append((key, metric, base[metric], metrics[metric], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", default="engine,reservoir,encoder,scenarios",
+                        help="実行する計測 (カンマ区切り)")
+    parser.add_argument("--quick", action="store_true", help="小規模な構成のみ計測する")
+    parser.add_argument("--steps", type=int, default=None, help="エンジン計測のステップ数")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="結果 JSON の保存先")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="比較するベースライン JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="悪化とみなす相対変化")
+    parser.add_argument("--save-baseline", action="store_true", help="結果をベースラインとしても保存する")
+    args = parser.parse_args(argv)
+
+    suites = set(args.suite.split(","))
+    grid = QUICK_GRID if args.quick else FULL_GRID
+    steps = args.steps or (200 if args.quick else 1000)
+
+    results = {}
+    if "engine" in suites:
+        print("=== Engine ===")
+        results.update(run_engine_suite(grid, steps))
+    if "reservoir" in suites:
+        print("=== Reservoir Init ===")
+        results.update(run_reservoir_suite(grid))
+    if "encoder" in suites:
+        print("=== Visual Encoder ===")
+        batch_sizes = [1, 8] if args.quick else [1, 8, 32]
+        results.update(run_encoder_suite(batch_sizes, n_images=16 if args.quick else 64))
+    if "scenarios" in suites:
+        print("=== Scenarios ===")
+        results.update(run_scenario_suite())
+
+    report = {"environment": environment(), "quick": args.quick, "steps": steps, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; skipping comparison.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+        return 0
+    print(f"Regressions beyond {args.tolerance:.0%}:")
+    for key, metric, base, value, change in regressions:
+        print(f"  {key} {metric}: {base:.4g} -> {value:.4g} ({change:+.1%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@ project_root = os.path.abspath(os.path.join(current_dir, "../../"))
 sys.path.append(os.path.join(project_root, 'src'))
 
 from core.engine import BiCortexEngine
+from core.probes import EventProbe, SpikeProbe, StateProbe, WeightProbe
+from core.stimulus import StimulusSchedule
 from utils.cli_plotter import print_cli_heatmap, print_cli_float_series
 
 def print_diagnostics(engine, log_mem, log_gate, log_weights, mem_bell_idx, mem_food_idx):
@@ -44,9 +46,32 @@ def print_diagnostics(engine, log_mem, log_gate, log_weights, mem_bell_idx, mem_
         print("  ❌ STATUS: WEAK / NO LEARNING")
     print("="*60 + "\n")
 
-def run_pavlov_experiment():
-    print("=== Phase 1.4: Pavlov (Golden Parameters) ===")
+# 最適化済みのパラメータセット (Golden Parameters, スイープ対象のハイパーパラメータ)
+DEFAULT_PARAMS = dict(
+    # 学習率: 0.001 (過剰適合を防ぎ、必要最小限の結合を作る)
+    learning_rate=0.001,
+    
+    # ゲート: 0.15 (不応期の影響を受けずに確実に開く閾値)
+    gate_ratio=0.15,
+    
+    # 減衰: 0.005 (不要な記憶を消去する適度な強さ)
+    global_decay=0.005,
     
+    # 順応: 0.3 (刺激消失後のループを断ち切る絶妙なブレーキ)
+    adaptation_step=0.3, 
+)
+
+
+def build_engine(params: dict = None, seed: int = 42):
+    """
+    Phase 1.4 の配線済みエンジンを構築する
+
+    Args:
+        params (dict): DEFAULT_PARAMS を上書きするハイパーパラメータ
+        seed (int): エンジン (リザーバ) の乱数シード
+    Returns:
+        tuple: (engine, 記憶野の領域 dict: "bell" / "food" -> インデックス)
+    """
     # 1. 設定
     N_SENSORY = 2 
     N_CONCEPT = 2 
@@ -54,30 +79,19 @@ def run_pavlov_experiment():
     N_MEMORY  = 100 
     DT = 1.0 
     
-    # エンジン初期化 (最適化済みのパラメータセット)
+    # エンジン初期化
     engine = BiCortexEngine(
         n_sensory=N_SENSORY,
         n_concept=N_CONCEPT,
         n_motor=N_MOTOR,
         n_mem=N_MEMORY,
         dt=DT,
-        
-        # 学習率: 0.001 (過剰適合を防ぎ、必要最小限の結合を作る)
-        learning_rate=0.001,
-        
-        # ゲート: 0.15 (不応期の影響を受けずに確実に開く閾値)
-        gate_ratio=0.15,
-        
-        # 減衰: 0.005 (不要な記憶を消去する適度な強さ)
-        global_decay=0.005,
-        
-        # 順応: 0.3 (刺激消失後のループを断ち切る絶妙なブレーキ)
-        adaptation_step=0.3, 
         adaptation_tau=100.0,
         
         # 重み上限: 0.8 (リザーバ容量を圧迫しない範囲)
         w_max_clip=0.8,
-        seed=42
+        seed=seed,
+        **dict(DEFAULT_PARAMS, **(params or {}))
     )
     
     # リザーバ初期化 & クリップ適用
@@ -120,11 +134,16 @@ def run_pavlov_experiment():
     engine.W[grid_post_pre] = 0.0
     engine.mask_plastic[grid_post_pre] = True
 
+    return engine, {"bell": mem_bell_indices, "food": mem_food_indices}
+
+
+def build_input_series():
+    """Phase 1.4 の入力スケジュール (total_steps=1500, 2チャンネル) を作る"""
     # 4. シナリオ作成
     total_steps = 1500
-    input_series = np.zeros((total_steps, N_SENSORY))
+    input_series = StimulusSchedule(total_steps, n_channels=2)
     def set_pulse(start, duration, channel):
-        input_series[start:start+duration, channel] = 10.0
+        input_series.add(start, duration, channel, 10.0)
 
     set_pulse(100, 50, 0) # Pre-Test (Bellのみ)
     
@@ -137,38 +156,68 @@ def run_pavlov_experiment():
         set_pulse(t + 60, 30, 1) # Food
         
     set_pulse(train_start + 5 * interval + 100, 50, 0) # Post-Test (Bellのみ)
+    return input_series
+
+
+def run_trials(engine, regions, input_series):
+    """記録プローブ付きでシナリオを実行する"""
+    probes = [
+        SpikeProbe("motor", engine.idx_motor),
+        SpikeProbe("concept", engine.idx_concept),
+        EventProbe("mem", engine.idx_mem),
+        StateProbe("gate", "is_gating"),
+        WeightProbe("weights_mean", regions["food"], regions["bell"]),
+    ]
+    return engine.run(input_series, probes=probes)
+
+
+def simulate(params: dict, seed: int, input_series: StimulusSchedule) -> dict:
+    """
+    パラメータスイープ用: 1条件を実行し、評価指標のみを返す (ログ・グラフは出力しない)
+
+    Returns:
+        dict: Pre/Post-Test の反応量、末尾の残存反応、重み変化、学習期間のゲート開放率
+    """
+    engine, regions = build_engine(params, seed)
+    logs = run_trials(engine, regions, input_series)
+    log_motor = logs["motor"]
+    pre = float(np.sum(log_motor[100:200]))
+    post = float(np.sum(log_motor[-250:-150]))
+    tail = float(np.sum(log_motor[-100:]))
+    return {
+        "pre_test_response": pre,
+        "post_test_response": post,
+        "tail_response": tail,
+        "weight_delta": float(logs["weights_mean"][-1] - logs["weights_mean"][0]),
+        "gate_open_ratio": float(np.mean(logs["gate"][300:1050])),
+        "success": bool(pre == 0 and post > 0 and tail < post * 0.2),
+    }
+
+
+def run_pavlov_experiment():
+    print("=== Phase 1.4: Pavlov (Golden Parameters) ===")
+
+    engine, regions = build_engine()
+    mem_bell_indices, mem_food_indices = regions["bell"], regions["food"]
+    input_series = build_input_series()
+    total_steps = len(input_series)
 
     # 5. シミュレーション実行
     print(f"Running simulation for {total_steps} steps...")
     
-    log_motor = []
-    log_concept = []
-    log_gate = []
-    log_mem = []
-    log_weights_mean = []
-    monitor_indices = grid_post_pre
-    
-    for t in range(total_steps):
-        current_input = np.zeros(engine.n_total)
-        current_input[idx_s] = input_series[t]
-        spikes = engine.step(current_input)
-        
-        log_motor.append(spikes[idx_m])
-        log_concept.append(spikes[idx_c])
-        log_mem.append(spikes[idx_mem])
-        log_gate.append(1.0 if engine.is_gating else 0.0)
-        log_weights_mean.append(np.mean(engine.W[monitor_indices]))
+    logs = run_trials(engine, regions, input_series)
 
     # 6. 可視化 & 評価
-    log_motor = np.array(log_motor)
-    log_concept = np.array(log_concept)
-    log_mem = np.array(log_mem)
-    log_gate = np.array(log_gate)
-    log_weights_mean = np.array(log_weights_mean)
+    log_motor = logs["motor"]
+    log_concept = logs["concept"]
+    log_mem = logs["mem"]
+    log_gate = logs["gate"]
+    log_weights_mean = logs["weights_mean"]
     
     print_diagnostics(engine, log_mem, log_gate, log_weights_mean, mem_bell_indices[0], mem_food_indices[0])
 
-    print_cli_heatmap(input_series[:, 0], title="Input: Bell")
+    input_dense = input_series.to_dense()  # 可視化用
+    print_cli_heatmap(input_dense[:, 0], title="Input: Bell")
     print_cli_heatmap(log_concept[:, 1], title="Concept Output: Food")
     print_cli_heatmap(log_motor, title="Motor Output: Salivation")
     print_cli_float_series(log_weights_mean, title="Weight Evolution (Bell->Food)")
@@ -196,8 +245,8 @@ def run_pavlov_experiment():
     save_path = os.path.join(output_dir, "result.png")
     
     fig, axes = plt.subplots(4, 1, figsize=(12, 10), sharex=True)
-    axes[0].plot(input_series[:, 0], label="Bell", color='blue')
-    axes[0].plot(input_series[:, 1], label="Food", color='orange', alpha=0.7)
+    axes[0].plot(input_dense[:, 0], label="Bell", color='blue')
+    axes[0].plot(input_dense[:, 1], label="Food", color='orange', alpha=0.7)
     axes[0].legend()
     axes[0].set_title("Input")
     
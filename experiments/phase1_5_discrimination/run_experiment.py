@@ -11,11 +11,29 @@ project_root = os.path.abspath(os.path.join(current_dir, "../../"))
 sys.path.append(os.path.join(project_root, 'src'))
 
 from core.engine import BiCortexEngine
+from core.probes import SpikeProbe, WeightProbe
+from core.stimulus import StimulusSchedule
 from utils.cli_plotter import print_cli_heatmap, print_cli_float_series
 
-def run_discrimination_experiment():
-    print("=== Phase 1.5: Discrimination Task (Red=Reward, Blue=None) ===")
-    
+# Phase 1.4 Golden Parameters (スイープ対象のハイパーパラメータ)
+DEFAULT_PARAMS = dict(
+    learning_rate=0.001,      # 低学習率で慎重に結合
+    gate_ratio=0.15,          # ゲート感度
+    global_decay=0.005,       # 忘却率
+    adaptation_step=0.3,      # 順応ブレーキ (重要)
+)
+
+
+def build_engine(params: dict = None, seed: int = 42):
+    """
+    Phase 1.5 の配線済みエンジンを構築する
+
+    Args:
+        params (dict): DEFAULT_PARAMS を上書きするハイパーパラメータ
+        seed (int): エンジン (リザーバ) の乱数シード
+    Returns:
+        tuple: (engine, 記憶野の領域 dict: "red" / "blue" / "reward" -> インデックス)
+    """
     # 1. 設定定義
     # Sensory: 0=Red, 1=Blue, 2=Reward
     # Concept: 0=Red, 1=Blue, 2=Reward
@@ -25,20 +43,17 @@ def run_discrimination_experiment():
     N_MEMORY  = 100 
     DT = 1.0 
     
-    # エンジン初期化 (Phase 1.4 Golden Parameters)
+    # エンジン初期化
     engine = BiCortexEngine(
         n_sensory=N_SENSORY,
         n_concept=N_CONCEPT,
         n_motor=N_MOTOR,
         n_mem=N_MEMORY,
         dt=DT,
-        learning_rate=0.001,      # 低学習率で慎重に結合
-        gate_ratio=0.15,          # ゲート感度
-        global_decay=0.005,       # 忘却率
-        adaptation_step=0.3,      # 順応ブレーキ (重要)
         adaptation_tau=100.0,
         w_max_clip=0.8,
-        seed=42
+        seed=seed,
+        **dict(DEFAULT_PARAMS, **(params or {}))
     )
     
     # リザーバ初期化
@@ -95,25 +110,35 @@ def run_discrimination_experiment():
     engine.W[grid_post_pre] = 0.0
     engine.mask_plastic[grid_post_pre] = True
 
+    regions = {"red": mem_red_indices, "blue": mem_blue_indices, "reward": mem_reward_indices}
+    return engine, regions
+
+
+def build_input_series():
+    """
+    Phase 1.5 の入力系列を作る
+
+    Returns:
+        tuple: (入力スケジュール (total_steps=2500, 3チャンネル), Post-Test の開始ステップ)
+    """
     # 5. シナリオ作成
     total_steps = 2500
-    input_series = np.zeros((total_steps, N_SENSORY))
+    input_series = StimulusSchedule(total_steps, n_channels=3)
     
     def set_trial(start_time, stimulus_idx, has_reward):
         # 刺激呈示 (50step)
-        input_series[start_time : start_time+50, stimulus_idx] = 10.0
+        input_series.add(start_time, 50, stimulus_idx, 10.0)
         # 報酬呈示 (遅延60step後, 30step間)
         if has_reward:
-            input_series[start_time+60 : start_time+90, 2] = 10.0
+            input_series.add(start_time + 60, 30, 2, 10.0)
 
     # --- シナリオ構成 ---
     # 0-300: Pre-Test (学習前)
     set_trial(100, 0, False) # Red only
     set_trial(200, 1, False) # Blue only
     
-    # 300-2000: Training (ランダム学習)
-    # 赤は報酬あり、青は報酬なしを交互に近い形で繰り返す
-    rng = np.random.default_rng(42)
+    # 300-2000: Training
+    # 赤は報酬あり、青は報酬なしを交互に繰り返す
     train_start = 400
     interval = 180
     
@@ -130,42 +155,64 @@ def run_discrimination_experiment():
     test_start = train_start + 8 * interval + 100
     set_trial(test_start, 0, False)      # Red Test (Expect Reaction)
     set_trial(test_start + 200, 1, False) # Blue Test (Expect No Reaction)
+    return input_series, test_start
+
+
+def run_trials(engine, regions, input_series):
+    """記録プローブ付きでシナリオを実行する (出力バッファはrun()開始時に一括確保される)"""
+    probes = [
+        SpikeProbe("motor", engine.idx_motor),
+        SpikeProbe("concept", engine.idx_concept),
+        WeightProbe("weights_red_rew", regions["reward"], regions["red"]),
+        WeightProbe("weights_blue_rew", regions["reward"], regions["blue"]),
+    ]
+    return engine.run(input_series, probes=probes)
+
+
+def simulate(params: dict, seed: int, input_series: StimulusSchedule, test_start: int) -> dict:
+    """
+    パラメータスイープ用: 1条件を実行し、評価指標のみを返す (ログ・グラフは出力しない)
+
+    Returns:
+        dict: Post-Test の反応量と重み変化
+    """
+    engine, regions = build_engine(params, seed)
+    logs = run_trials(engine, regions, input_series)
+    log_motor = logs["motor"]
+    red = float(np.sum(log_motor[test_start : test_start+100]))
+    blue = float(np.sum(log_motor[test_start+200 : test_start+300]))
+    return {
+        "red_test_response": red,
+        "blue_test_response": blue,
+        "red_weight_delta": float(logs["weights_red_rew"][-1] - logs["weights_red_rew"][0]),
+        "blue_weight_delta": float(logs["weights_blue_rew"][-1] - logs["weights_blue_rew"][0]),
+        "success": bool(red > 5 and blue < red * 0.2),
+    }
+
+
+def run_discrimination_experiment():
+    print("=== Phase 1.5: Discrimination Task (Red=Reward, Blue=None) ===")
+
+    engine, regions = build_engine()
+    input_series, test_start = build_input_series()
+    total_steps = len(input_series)
 
     # 6. シミュレーション実行
     print(f"Running simulation for {total_steps} steps...")
     
-    log_motor = []
-    log_concept = []
-    log_weights_red_rew = []
-    log_weights_blue_rew = []
-    
-    # モニタリング用インデックス
-    idx_red_to_rew = np.ix_(mem_reward_indices, mem_red_indices)
-    idx_blue_to_rew = np.ix_(mem_reward_indices, mem_blue_indices)
-    
-    for t in range(total_steps):
-        current_input = np.zeros(engine.n_total)
-        current_input[idx_s] = input_series[t]
-        
-        spikes = engine.step(current_input)
-        
-        log_motor.append(spikes[idx_m])
-        log_concept.append(spikes[idx_c])
-        
-        # 重みの平均値を記録
-        log_weights_red_rew.append(np.mean(engine.W[idx_red_to_rew]))
-        log_weights_blue_rew.append(np.mean(engine.W[idx_blue_to_rew]))
+    logs = run_trials(engine, regions, input_series)
 
     # 7. 結果評価 & 可視化
-    log_motor = np.array(log_motor)
-    log_concept = np.array(log_concept)
-    log_weights_red_rew = np.array(log_weights_red_rew)
-    log_weights_blue_rew = np.array(log_weights_blue_rew)
+    log_motor = logs["motor"]
+    log_concept = logs["concept"]
+    log_weights_red_rew = logs["weights_red_rew"]
+    log_weights_blue_rew = logs["weights_blue_rew"]
     
     # CLI Report
-    print_cli_heatmap(input_series[:, 0], title="Input: Red Stimulus")
-    print_cli_heatmap(input_series[:, 1], title="Input: Blue Stimulus")
-    print_cli_heatmap(input_series[:, 2], title="Input: Reward")
+    input_dense = input_series.to_dense()  # 可視化用
+    print_cli_heatmap(input_dense[:, 0], title="Input: Red Stimulus")
+    print_cli_heatmap(input_dense[:, 1], title="Input: Blue Stimulus")
+    print_cli_heatmap(input_dense[:, 2], title="Input: Reward")
     print_cli_heatmap(log_motor, title="Motor Output: Action")
     
     print("\n[Weight Evolution]")
@@ -198,9 +245,9 @@ def run_discrimination_experiment():
     fig, axes = plt.subplots(4, 1, figsize=(12, 12), sharex=True)
     
     # Input
-    axes[0].plot(input_series[:, 0], label="Red", color='red')
-    axes[0].plot(input_series[:, 1], label="Blue", color='blue')
-    axes[0].plot(input_series[:, 2], label="Reward", color='orange', linestyle='--')
+    axes[0].plot(input_dense[:, 0], label="Red", color='red')
+    axes[0].plot(input_dense[:, 1], label="Blue", color='blue')
+    axes[0].plot(input_dense[:, 2], label="Reward", color='orange', linestyle='--')
     axes[0].legend(loc='upper right')
     axes[0].set_title("Sensory Inputs")
     
@@ -0,0 +1,86 @@
+"""
+Phase 1.4 / 1.5 のパラメータスイープ (マルチシード・並列実行)
+
+使い方:
+    python experiments/run_sweep.py --scenario phase1_5 \
+        --grid learning_rate=0.001,0.002,0.005 gate_ratio=0.1,0.15 --seeds 8
+    python experiments/run_sweep.py --scenario phase1_4 --random 32 \
+        --range learning_rate=0.0005:0.01:log global_decay=0.001:0.01 --seeds 4
+
+結果は --results (CSV) に条件ごとに追記され、同じコマンドを再実行すると未完了の条件のみを実行する。
+"""
+import argparse
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(os.path.join(project_root, 'src'))
+sys.path.append(project_root)
+
+import pandas as pd
+
+from experiments.phase1_4_pavlov import run_experiment as pavlov
+from experiments.phase1_5_discrimination import run_experiment as discrimination
+from utils.sweep import grid_space, random_space, run_sweep, summarize
+
+
+def scenario_setup(name: str):
+    """
+    シナリオ名 -> (scenario 関数, 共有メモリで渡す刺激, 共通引数)
+    入力はイベント数に比例する小さな StimulusSchedule のため、共通引数としてワーカーへ渡す。
+    """
+    if name == "phase1_4":
+        return pavlov.simulate, {}, {"input_series": pavlov.build_input_series()}
+    if name == "phase1_5":
+        input_series, test_start = discrimination.build_input_series()
+        return discrimination.simulate, {}, {"input_series": input_series, "test_start": test_start}
+    raise ValueError(f"unknown scenario: {name!r}")
+
+
+def parse_axes(specs, parse_value):
+    axes = {}
+    for spec in specs or []:
+        name, value = spec.split("=", 1)
+        axes[name] = parse_value(value)
+    return axes
+
+
+def parse_range(value: str):
+    parts = value.split(":")
+    bounds = (float(parts[0]), float(parts[1]))
+    return bounds + ("log",) if len(parts) > 2 and parts[2] == "log" else bounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=("phase1_4", "phase1_5"), default="phase1_5")
+    parser.add_argument("--grid", nargs="*", help="name=v1,v2,... (全組み合わせ)")
+    parser.add_argument("--random", type=int, default=0, help="ランダムサンプリングの条件数")
+    parser.add_argument("--range", nargs="*", help="name=low:high[:log] (--random 用)")
+    parser.add_argument("--seeds", type=int, default=4, help="各条件のシード数 (0..N-1)")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (既定: CPU コア数)")
+    parser.add_argument("--results", default=None, help="結果 CSV (既定: reports/sweeps/<scenario>.csv)")
+    args = parser.parse_args(argv)
+
+    if args.random:
+        param_sets = random_space(args.random, **parse_axes(args.range, parse_range))
+    else:
+        axes = parse_axes(args.grid, lambda v: [float(x) for x in v.split(",")])
+        param_sets = grid_space(**axes) if axes else [{}]
+
+    results_path = args.results or os.path.join(project_root, "reports/sweeps", f"{args.scenario}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+
+    scenario, stimulus, context = scenario_setup(args.scenario)
+    results = run_sweep(scenario, param_sets, range(args.seeds), stimulus=stimulus, context=context,
+                        n_workers=args.workers, results_path=results_path)
+
+    param_names = sorted({k for p in param_sets for k in p})
+    with pd.option_context("display.width", 200, "display.max_columns", 50):
+        print(summarize(results, param_names) if param_names else results.describe())
+    print(f"Results saved to: {results_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Block-Structured Connectivity
+
+結合行列 W を領域 (Sensory / Concept / Motor / Memory) のペアごとのブロックに分け、
+ブロックごとに最も安い表現で保持して積分 (W @ x) を行う。
+
+- absent:   結合なし (積分から除外)
+- diagonal: 1対1 対応の正方ブロック (要素積)
+- sparse:   疎なブロック (CSR)
+- dense:    密なブロック (コピー)
+- plastic:  可塑性シナプスを含むブロック。W のビュー (基本スライス) として保持するため、
+            SRG による重み更新がそのまま反映される (記憶野 MC->MC が典型)。
+
+固定ブロックは構築時の W のスナップショットであるため、配線を変更した後は作り直すこと
+(BiCortexEngine.compile_connectivity)。
+"""
+import numpy as np
+import scipy.sparse as sp
+
+
+class BlockConnectivity:
+    """
+    領域ペアごとの結合ブロック
+
+    毎ステップの積分コストは n_total^2 ではなく、実在するブロックの要素数 (absent は0、
+    diagonal は辺の長さ、sparse は非零要素数) に比例する。
+    """
+
+    def __init__(self, bounds: list, n_total: int):
+        """
+        Args:
+            bounds (list[tuple]): 領域の (名前, 開始ID, 終了ID)。連続した ID 範囲であること。
+            n_total (int): 全ニューロン数
+        """
+        self.bounds = [(name, int(lo), int(hi)) for name, lo, hi in bounds if hi > lo]
+        self.n_total = n_total
+        # 構築元の W (plastic ブロックはこの配列のビュー)
+        self.source = None
+        # (post領域, pre領域) -> (種別, 行スライス, 列スライス, ブロック)
+        self.blocks = {}
+
+    @classmethod
+    def from_dense(cls, W: np.ndarray, plastic_post: np.ndarray, plastic_pre: np.ndarray, bounds: list,
+                   sparse_density: float = 0.25):
+        """
+        dense な W からブロック表現を構築する
+
+        Args:
+            W (np.ndarray): 結合行列 (n_total, n_total)。plastic ブロックはこの配列のビューになる。
+            plastic_post, plastic_pre (np.ndarray): 可塑性シナプスの post / pre ID
+            bounds (list[tuple]): 領域の (名前, 開始ID, 終了ID)
+            sparse_density (float): 非零要素の割合がこれ未満の固定ブロックは CSR で保持する
+        """
+        conn = cls(bounds, W.shape[0])
+        conn.source = W
+        names = [name for name, _, _ in conn.bounds]
+        starts = np.array([lo for _, lo, _ in conn.bounds])
+        post_region = np.searchsorted(starts, plastic_post, side="right") - 1
+        pre_region = np.searchsorted(starts, plastic_pre, side="right") - 1
+        plastic_pairs = {(names[i], names[j]) for i, j in set(zip(post_region.tolist(), pre_region.tolist()))}
+
+        for post, r0, r1 in conn.bounds:
+            for pre, c0, c1 in conn.bounds:
+                rows, cols = slice(r0, r1), slice(c0, c1)
+                block = W[rows, cols]
+                if (post, pre) in plastic_pairs:
+                    conn.blocks[post, pre] = ("plastic", rows, cols, block)
+                    continue
+                nnz = np.count_nonzero(block)
+                if nnz == 0:
+                    continue
+                if block.shape[0] == block.shape[1] and nnz == np.count_nonzero(np.diag(block)):
+                    conn.blocks[post, pre] = ("diagonal", rows, cols, np.diag(block).copy())
+                elif nnz < sparse_density * block.size:
+                    conn.blocks[post, pre] = ("sparse", rows, cols, sp.csr_matrix(block))
+                else:
+                    conn.blocks[post, pre] = ("dense", rows, cols, block.copy())
+        return conn
+
+    def matvec(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """W @ x を実在するブロックのみで計算する"""
+        if out is None:
+            out = np.zeros(self.n_total, dtype=x.dtype)
+        else:
+            out[:] = 0
+        for kind, rows, cols, block in self.blocks.values():
+            if kind == "diagonal":
+                out[rows] += block * x[cols]
+            else:
+                out[rows] += block @ x[cols]
+        return out
+
+    def kinds(self) -> dict:
+        """(post領域, pre領域) -> 種別 (absent のブロックは含まない)"""
+        return {pair: entry[0] for pair, entry in self.blocks.items()}
+
+    def work(self) -> int:
+        """1回の積分で参照する重みの数"""
+        total = 0
+        for kind, _, _, block in self.blocks.values():
+            total += block.nnz if kind == "sparse" else block.size
+        return total
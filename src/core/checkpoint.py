@@ -0,0 +1,270 @@
+"""
+Engine Checkpoint / Restore
+
+BiCortexEngine の重み・可塑性マスク・状態変数・SRG状態を、配列ごとに非圧縮の .npy として
+ディレクトリへ保存する。復元時は np.load(mmap_mode=...) でメモリマップするため、
+大規模エンジンでもファイルを読み込まずにほぼゼロコピーで再開できる。
+
+CheckpointManager は初回に完全スナップショットを保存し、以降は前回スナップショットから
+変化した可塑性シナプスの重みと状態変数のみを差分 (incremental) として保存する。
+
+ディレクトリ構成:
+    <path>/meta.json        構成・スカラー状態
+    <path>/<name>.npy       配列 (W, mask_plastic, v, e_trace, ...)
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import scipy.sparse as sp
+
+from .engine import BiCortexEngine
+from .plasticity import PackedMask, PlasticSynapses
+
+FORMAT_VERSION = 1
+
+# コンストラクタで再構築する構成
+_CONFIG_KEYS = ("n_sensory", "n_concept", "n_motor", "n_mem", "dt", "sparse", "event_driven",
+                "backend", "compact_mask", "block_structured", "plastic_store")
+# 構築後に上書きするスカラー (ハイパーパラメータとSRG状態)
+_SCALAR_KEYS = ("learning_rate", "global_decay", "w_max_clip", "gate_threshold", "activity_ma", "ma_alpha",
+                "is_gating", "v_base", "tau_m", "alpha", "refractory_steps", "adaptation_step", "decay_adapt",
+                "tau_trace", "decay_trace", "tau_fast", "decay_fast", "resync_interval", "prune_epsilon",
+                "prune_interval")
+_STATE_KEYS = ("v", "refractory_count", "adaptation", "e_trace", "x_fast", "i_syn_fixed", "i_syn_plastic")
+
+
+def _to_builtin(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _write_meta(path: str, meta: dict):
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def _save_array(path: str, name: str, array: np.ndarray):
+    np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+
+
+def _load_array(path: str, name: str, mmap_mode=None) -> np.ndarray:
+    return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+
+def _state_meta(engine: BiCortexEngine) -> dict:
+    return {
+        "scalars": {k: _to_builtin(getattr(engine, k)) for k in _SCALAR_KEYS},
+        "rng_state": engine.rng.bit_generator.state,
+    }
+
+
+def _plastic_positions(engine: BiCortexEngine) -> np.ndarray:
+    """可塑性シナプスの、1次元重み格納配列 (dense: W.ravel() / sparse: W.data) 上の位置"""
+    if engine._indexed_plastic:
+        if engine._connectivity_dirty():
+            engine.compile_connectivity()
+        if engine.plastic_store:
+            return np.arange(len(engine.plastic_synapses))
+        if not engine.sparse:
+            return engine._plastic_post.astype(np.int64) * engine.n_total + engine._plastic_pre
+        return engine._plastic_slots
+    return np.flatnonzero(engine.mask_plastic)
+
+
+def save_checkpoint(engine: BiCortexEngine, path: str):
+    """
+    エンジンの完全スナップショットを path (ディレクトリ) に保存する。
+
+    Args:
+        engine (BiCortexEngine): 保存対象
+        path (str): 保存先ディレクトリ (存在しなければ作成)
+    """
+    os.makedirs(path, exist_ok=True)
+    if engine._indexed_plastic and engine._connectivity_dirty():
+        engine.compile_connectivity()
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "kind": "full",
+        "config": {k: _to_builtin(getattr(engine, k)) for k in _CONFIG_KEYS},
+        "dtype": engine.dtype.str,
+    }
+    meta.update(_state_meta(engine))
+
+    if engine.sparse:
+        W = engine.W.tocsr()
+        for part in ("data", "indices", "indptr"):
+            _save_array(path, f"W_{part}", getattr(W, part))
+        mask = engine.mask_plastic.tocsr()
+        for part in ("indices", "indptr"):
+            _save_array(path, f"mask_{part}", getattr(mask, part))
+        if not engine.plastic_store:
+            # コンパイル済みの可塑性インデックスも保存し、復元時の再構築を省く
+            for name in ("_plastic_slots", "_plastic_post", "_plastic_pre"):
+                _save_array(path, name.lstrip("_"), getattr(engine, name))
+    else:
+        _save_array(path, "W", engine.W)
+        if engine.compact_mask:
+            _save_array(path, "mask_bits", engine.mask_plastic.bits)
+        else:
+            _save_array(path, "mask_plastic", engine.mask_plastic)
+
+    if engine.plastic_store:
+        store = engine.plastic_synapses
+        for part in ("post", "pre", "weight", "potentiated"):
+            _save_array(path, f"store_{part}", getattr(store, part))
+
+    for name in _STATE_KEYS:
+        _save_array(path, name, getattr(engine, name))
+    _write_meta(path, meta)
+
+
+def load_checkpoint(path: str, mmap_mode: str = "c") -> BiCortexEngine:
+    """
+    save_checkpoint で保存したエンジンを復元する。
+
+    Args:
+        path (str): チェックポイントのディレクトリ
+        mmap_mode (str): 重み・マスクの読み込みモード。"c" (既定) は copy-on-write のメモリマップで、
+                         書き込まれたページのみがメモリにコピーされる。None で全体を読み込む。
+    Returns:
+        BiCortexEngine: 保存時点の重み・状態を持つエンジン
+    """
+    meta = _read_meta(path)
+    if meta.get("kind") != "full":
+        raise ValueError(f"{path} is not a full checkpoint")
+    config = meta["config"]
+    engine = BiCortexEngine(dtype=np.dtype(meta["dtype"]), **config)
+    n = engine.n_total
+
+    if engine.sparse:
+        W_parts = [_load_array(path, f"W_{p}", mmap_mode) for p in ("data", "indices", "indptr")]
+        engine.W = sp.csr_matrix(tuple(W_parts), shape=(n, n), copy=False)
+        indices = _load_array(path, "mask_indices", mmap_mode)
+        indptr = _load_array(path, "mask_indptr", mmap_mode)
+        engine.mask_plastic = sp.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr),
+                                            shape=(n, n), copy=False)
+        if not engine.plastic_store:
+            engine._plastic_slots = _load_array(path, "plastic_slots")
+            engine._plastic_post = _load_array(path, "plastic_post")
+            engine._plastic_pre = _load_array(path, "plastic_pre")
+        engine._compiled_data = engine.W.data
+        engine._compiled_mask = engine.mask_plastic.indices
+    else:
+        engine.W = _load_array(path, "W", mmap_mode)
+        if engine.compact_mask:
+            engine.mask_plastic = PackedMask((n, n))
+            engine.mask_plastic.bits = np.array(_load_array(path, "mask_bits", mmap_mode))
+        else:
+            engine.mask_plastic = _load_array(path, "mask_plastic", mmap_mode)
+
+    if engine.plastic_store:
+        parts = [np.array(_load_array(path, f"store_{part}")) for part in ("post", "pre", "weight", "potentiated")]
+        engine._store = PlasticSynapses(*parts)
+        engine._bind_store()
+        if engine.compact_mask:
+            engine._compiled_version = engine.mask_plastic.version
+
+    for name in _STATE_KEYS:
+        setattr(engine, name, np.array(_load_array(path, name)))
+    _apply_state_meta(engine, meta)
+    return engine
+
+
+def _apply_state_meta(engine: BiCortexEngine, meta: dict):
+    for key, value in meta["scalars"].items():
+        setattr(engine, key, value)
+    engine.rng.bit_generator.state = meta["rng_state"]
+    # 保存した i_syn をそのまま使う (イベント駆動モード)
+    engine._syn_dirty = False
+    engine._steps_since_sync = 0
+
+
+class CheckpointManager:
+    """
+    長時間のオンライン学習向けの定期チェックポイント
+
+    初回の save() で完全スナップショット (<directory>/full) を保存し、以降の save() では
+    前回から値が変わった可塑性シナプスの重みと状態変数のみを <directory>/inc_00001, ... に保存する。
+    固定結合 (思考野・Interface) の変更や再配線は差分に含まれないため、その場合は save_full() を呼ぶこと。
+    """
+
+    def __init__(self, engine: BiCortexEngine, directory: str):
+        self.engine = engine
+        self.directory = directory
+        self._positions = None
+        self._last_values = None
+        self._n_incremental = 0
+
+    def save(self) -> str:
+        """スナップショットを保存し、保存先ディレクトリを返す"""
+        if self._last_values is None:
+            return self.save_full()
+        return self.save_incremental()
+
+    def save_full(self) -> str:
+        path = os.path.join(self.directory, "full")
+        if os.path.isdir(self.directory):
+            # 古い差分は新しい完全スナップショットと整合しないため削除する
+            for name in os.listdir(self.directory):
+                if name.startswith("inc_"):
+                    shutil.rmtree(os.path.join(self.directory, name))
+        save_checkpoint(self.engine, path)
+        self._positions = _plastic_positions(self.engine).copy()
+        self._last_values = self.engine._weight_store()[self._positions].copy()
+        self._n_incremental = 0
+        return path
+
+    def save_incremental(self) -> str:
+        positions = _plastic_positions(self.engine)
+        if len(positions) != len(self._positions) or not np.array_equal(positions, self._positions):
+            # 可塑性シナプスの構造が変わった場合は差分が取れない
+            return self.save_full()
+
+        values = self.engine._weight_store()[positions]
+        changed = np.flatnonzero(values != self._last_values)
+
+        self._n_incremental += 1
+        path = os.path.join(self.directory, f"inc_{self._n_incremental:05d}")
+        os.makedirs(path, exist_ok=True)
+        _save_array(path, "positions", positions[changed])
+        _save_array(path, "values", values[changed])
+        for name in _STATE_KEYS:
+            _save_array(path, name, getattr(self.engine, name))
+        meta = {"format_version": FORMAT_VERSION, "kind": "incremental", "index": self._n_incremental,
+                "n_changed": int(len(changed))}
+        meta.update(_state_meta(self.engine))
+        _write_meta(path, meta)
+
+        self._last_values[changed] = values[changed]
+        return path
+
+    @staticmethod
+    def restore(directory: str, upto: int = None, mmap_mode: str = "c") -> BiCortexEngine:
+        """
+        完全スナップショットに差分を順に適用してエンジンを復元する。
+
+        Args:
+            directory (str): CheckpointManager の保存先
+            upto (int): 適用する差分の最大番号 (None で全て)
+            mmap_mode (str): load_checkpoint と同じ
+        """
+        engine = load_checkpoint(os.path.join(directory, "full"), mmap_mode=mmap_mode)
+        increments = sorted(d for d in os.listdir(directory) if d.startswith("inc_"))
+        for name in increments:
+            path = os.path.join(directory, name)
+            meta = _read_meta(path)
+            if upto is not None and meta["index"] > upto:
+                break
+            store = engine._weight_store()
+            store[_load_array(path, "positions")] = _load_array(path, "values")
+            for key in _STATE_KEYS:
+                setattr(engine, key, np.array(_load_array(path, key)))
+            _apply_state_meta(engine, meta)
+        return engine
@@ -1,4 +1,33 @@
+import warnings
+
 import numpy as np
+import scipy.sparse as sp
+
+from .blocks import BlockConnectivity
+from .plasticity import PackedMask, PlasticSynapses
+from .reservoir import random_dale_reservoir, estimate_spectral_radius
+from .stimulus import StimulusSchedule
+
+
+def _geometric_response(alpha: float, r: float, k: int) -> float:
+    """sum_{j<k} alpha^(k-1-j) * r^j : r^j で減衰する入力を k ステップ積分した膜電位 (リーク alpha)"""
+    if np.isclose(alpha, r):
+        return k * alpha ** (k - 1)
+    return (alpha ** k - r ** k) / (alpha - r)
+
+
+def _peak_response(alpha: float, r: float, k: int) -> float:
+    """_geometric_response(alpha, r, t) の 1 <= t <= k における最大値 (t について単峰)"""
+    la, lr = np.log(alpha), np.log(r)
+    if np.isclose(la, lr):
+        t_peak = -1.0 / la if la < 0 else k
+    elif la < 0 and lr < 0:
+        t_peak = np.log(lr / la) / (la - lr)
+    else:
+        t_peak = k
+    candidates = {1, k, int(np.clip(np.floor(t_peak), 1, k)), int(np.clip(np.ceil(t_peak), 1, k))}
+    return max(_geometric_response(alpha, r, t) for t in candidates)
+
 
 class BiCortexEngine:
     """
@@ -23,7 +52,14 @@ class BiCortexEngine:
                  adaptation_tau: float = 100.0,
                  refractory_period: float = 2.0,
                  w_max_clip: float = 0.8,
-                 seed: int = 42):
+                 seed: int = 42,
+                 sparse: bool = False,
+                 event_driven: bool = False,
+                 backend: str = "numpy",
+                 dtype=np.float64,
+                 compact_mask: bool = False,
+                 block_structured: bool = False,
+                 plastic_store: bool = False):
         """
         エンジンの初期化
 
@@ -38,9 +74,34 @@ class BiCortexEngine:
             refractory_period (float): 不応期 (ms)。
             w_max_clip (float): 重みのクリッピング上限（絶対値）。
             seed (int): 乱数シード。
+            sparse (bool): Trueの場合、結合行列をスパース(CSR)形式で保持し、
+                           積分・減衰・ヘブ則更新を既存シナプスのみに限定する (大規模記憶野向け)。
+            event_driven (bool): Trueの場合、シナプス電流 (W @ x_fast) を状態として保持し、
+                                 毎ステップ減衰 + 発火列の加算のみで更新する (低発火率向け)。
+            backend (str): "numpy" (既定) または "numba"。"numba" は step 全体を1つの
+                           JITカーネルに融合する (小規模ネットワーク向け、dense のみ)。
+                           Numba が無い環境では警告を出して "numpy" にフォールバックする。
+            dtype: 重み・膜電位・トレース・順応など状態配列の精度 (np.float64 または np.float32)。
+            compact_mask (bool): Trueの場合、mask_plastic をビットパック (PackedMask) で保持し、
+                                 減衰・ヘブ則更新は可塑性シナプスのインデックス列のみを走査する。
+                                 メモリは N^2/8 + 8 byte/可塑性シナプスで、可塑性シナプスの密度
+                                 (P / n_total^2) が約 0.11 を超えると dense マスクより大きくなる。
+            block_structured (bool): Trueの場合、積分 (W @ x_fast) を領域ペアごとのブロック
+                                     (core.blocks.BlockConnectivity) で行い、結合のないブロックを
+                                     飛ばす (dense のみ)。固定ブロックは初回の step() 時点の W から
+                                     構築されるため、その後に配線を変更した場合は
+                                     compile_connectivity() を呼び出すこと。
+            plastic_store (bool): Trueの場合、可塑性シナプスの重みを W から取り出して専用ストア
+                                  (core.plasticity.PlasticSynapses) に保持し、減衰・ヘブ則更新は
+                                  ストアのみを走査する。prune_epsilon > 0 なら prune_interval
+                                  ステップごとに小さな重みのシナプスを削除する (長期のオンライン学習向け)。
         """
         
         self.rng = np.random.default_rng(seed)
+
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError(f"unsupported dtype: {self.dtype} (use float32 or float64)")
         
         # --- 1. 領域定義 (Parcellation) ---
         self.n_sensory = n_sensory
@@ -70,6 +131,14 @@ class BiCortexEngine:
         self.global_decay = global_decay
         self.w_max_clip = w_max_clip
         
+        # 可塑性シナプスの削減 (plastic_store のみ): |w| < prune_epsilon まで減衰したシナプスを
+        # prune_interval ステップごとに削除する (0 で無効)。重み0のまま未学習のシナプスは残す
+        self.prune_epsilon = 0.0
+        self.prune_interval = 1000
+
+        # 静止区間の早送り (run(fast_forward=True)) を証明できなかった場合、次に試みるまでのステップ数
+        self.fast_forward_retry = 10
+
         # Gate Threshold: 不応期による発火率制限(Max 0.5)を考慮し、最小値を0.1に設定
         self.gate_threshold = max(0.1, n_concept * gate_ratio)
         
@@ -79,60 +148,403 @@ class BiCortexEngine:
         self.is_gating = False
 
         # --- 3. ニューロン状態変数 (LIF) ---
-        self.v = np.zeros(self.n_total)
+        self.v = np.zeros(self.n_total, dtype=self.dtype)
         self.v_base = 5.0 
         self.tau_m = 20.0
-        self.alpha = np.exp(-dt / self.tau_m)
+        self.alpha = float(np.exp(-dt / self.tau_m))
         
-        self.refractory_count = np.zeros(self.n_total)
+        self.refractory_count = np.zeros(self.n_total, dtype=self.dtype)
         self.refractory_steps = max(1, int(refractory_period / dt))
 
         # Adaptation (順応)
-        self.adaptation = np.zeros(self.n_total)
+        self.adaptation = np.zeros(self.n_total, dtype=self.dtype)
         self.adaptation_step = adaptation_step
-        self.decay_adapt = np.exp(-dt / adaptation_tau)
+        self.decay_adapt = float(np.exp(-dt / adaptation_tau))
 
         # --- 4. Trace変数 (Synaptic Eligibility) ---
         # Long-term Trace (学習用)
-        self.e_trace = np.zeros(self.n_total)
+        self.e_trace = np.zeros(self.n_total, dtype=self.dtype)
         self.tau_trace = 2000.0 
-        self.decay_trace = np.exp(-dt / self.tau_trace)
+        self.decay_trace = float(np.exp(-dt / self.tau_trace))
 
         # Short-term Trace (信号伝達用)
-        self.x_fast = np.zeros(self.n_total)
+        self.x_fast = np.zeros(self.n_total, dtype=self.dtype)
         self.tau_fast = 5.0
-        self.decay_fast = np.exp(-dt / self.tau_fast)
+        self.decay_fast = float(np.exp(-dt / self.tau_fast))
+
+        # Synaptic Current (イベント駆動モード用): W @ x_fast を固定/可塑成分に分けて保持
+        # 可塑成分を分けておくことで、全体減衰は i_syn_plastic のスカラー倍で追従できる
+        self.event_driven = event_driven
+        self.i_syn_fixed = np.zeros(self.n_total, dtype=self.dtype)
+        self.i_syn_plastic = np.zeros(self.n_total, dtype=self.dtype)
+        self.resync_interval = 10000  # 丸め誤差の蓄積を防ぐための再計算間隔 (step)
+        self._steps_since_sync = 0
+        self._syn_dirty = False
 
         # --- 5. 結合行列 ---
-        self.W = np.zeros((self.n_total, self.n_total))
-        # 可塑性マスク: Trueの箇所のみSRGで更新される
-        self.mask_plastic = np.zeros((self.n_total, self.n_total), dtype=bool)
+        self.sparse = sparse
+        self.compact_mask = compact_mask
+        # 可塑性シナプスをインデックス列で扱うか (sparse / compact_mask / plastic_store)
+        self.plastic_store = plastic_store
+        self._indexed_plastic = sparse or compact_mask or plastic_store
+        if sparse:
+            # 配線中は LIL 形式で保持し、step() 直前に CSR へ変換する (compile_connectivity)
+            self.W = sp.lil_matrix((self.n_total, self.n_total), dtype=self.dtype)
+            self.mask_plastic = sp.lil_matrix((self.n_total, self.n_total), dtype=bool)
+        else:
+            self.W = np.zeros((self.n_total, self.n_total), dtype=self.dtype)
+            # 可塑性マスク: Trueの箇所のみSRGで更新される
+            if compact_mask:
+                self.mask_plastic = PackedMask((self.n_total, self.n_total))
+            else:
+                self.mask_plastic = np.zeros((self.n_total, self.n_total), dtype=bool)
+
+        # 可塑性シナプスの実行時表現: 重み格納配列上の位置 (slot) と post/pre ID
+        # slot は sparse の W.data 上の添字のみ。compact_mask は W[post, pre] で、
+        # plastic_store はストアの配列を直接走査するため slot は持たない
+        self._plastic_slots = None
+        self._plastic_post = None
+        self._plastic_pre = None
+        self._compiled_data = None
+        self._compiled_mask = None
+        self._compiled_version = None
+        self._store = None
+        self._steps_since_prune = 0
+        # イベント駆動用の列方向インデックス (発火した pre の結合のみを O(列の非零数) で取り出す)
+        # 固定結合の CSC コピー (sparse) と、可塑性シナプスの pre 順の並べ替え
+        self._fixed_csc = None
+        self._plastic_by_pre = None
+        self.block_structured = block_structured
+        if block_structured and sparse:
+            raise ValueError("block_structured requires a dense W (sparse=False)")
+        self._blocks = None
 
-    def init_memory_reservoir(self, density=0.1, spectral_radius=0.9):
+        # --- 6. 実行バックエンド ---
+        if backend not in ("numpy", "numba"):
+            raise ValueError(f"unknown backend: {backend!r}")
+        self._fused_step = None
+        if backend == "numba":
+            from . import kernels
+            if sparse or event_driven or compact_mask or block_structured or plastic_store:
+                raise ValueError("backend='numba' supports the dense, matvec-integrated mode "
+                                 "with a dense mask only")
+            if kernels.HAS_NUMBA:
+                self._fused_step = kernels.fused_step
+            else:
+                warnings.warn("numba is not installed; falling back to the NumPy backend")
+                backend = "numpy"
+        self.backend = backend
+
+        # --- 7. 計測 (opt-in, core.instrumentation) ---
+        self.instrumentation = None
+
+    def init_memory_reservoir(self, density=0.1, spectral_radius=0.9, method=None, radius_tol=1e-3):
         """
         記憶野をリザーバ（Echo State Network状）として初期化する。
         Dale's Lawに基づき、興奮性ニューロンからは正、抑制性からは負の結合を出力する。
+
+        Args:
+            density (float): 記憶野内部の結合確率
+            spectral_radius (float): 目標スペクトル半径
+            method (str): "dense" (n_mem x n_mem の乱数行列 + 固有値分解) または
+                          "sparse" (結合を CSR で直接生成し、スペクトル半径を反復法で推定)。
+                          None の場合、sparse エンジンでは "sparse"、それ以外では "dense"。
+            radius_tol (float): method="sparse" におけるスペクトル半径推定の相対精度
         """
-        W_mem = np.zeros((self.n_mem, self.n_mem))
-        mask = self.rng.random((self.n_mem, self.n_mem)) < density
-        weights = self.rng.random((self.n_mem, self.n_mem))
-        
-        # E/I 特性の適用
-        W_mem[:, self.mem_exc_mask] = weights[:, self.mem_exc_mask]   # Exc -> +
-        W_mem[:, self.mem_inh_mask] = -weights[:, self.mem_inh_mask]  # Inh -> -
-        
-        # スペクトル半径の調整
-        W_mem *= mask
-        radius = np.max(np.abs(np.linalg.eigvals(W_mem)))
-        if radius > 0:
-            W_mem *= (spectral_radius / radius)
+        if method is None:
+            method = "sparse" if self.sparse else "dense"
+
+        if method == "dense":
+            W_mem = np.zeros((self.n_mem, self.n_mem))
+            mask = self.rng.random((self.n_mem, self.n_mem)) < density
+            weights = self.rng.random((self.n_mem, self.n_mem))
+            
+            # E/I 特性の適用
+            W_mem[:, self.mem_exc_mask] = weights[:, self.mem_exc_mask]   # Exc -> +
+            W_mem[:, self.mem_inh_mask] = -weights[:, self.mem_inh_mask]  # Inh -> -
             
-        # 初期重みに対してもクリッピングを適用 (重要)
-        W_mem = np.clip(W_mem, -self.w_max_clip, self.w_max_clip)
+            # スペクトル半径の調整
+            W_mem *= mask
+            radius = np.max(np.abs(np.linalg.eigvals(W_mem)))
+            if radius > 0:
+                W_mem *= (spectral_radius / radius)
+                
+            # 初期重みに対してもクリッピングを適用 (重要)
+            W_mem = np.clip(W_mem, -self.w_max_clip, self.w_max_clip)
+        elif method == "sparse":
+            # O(nnz) で生成し、スペクトル半径は ARPACK で推定 (O(n^3) の固有値分解を回避)
+            W_mem = random_dale_reservoir(self.n_mem, self.mem_exc_mask, density, self.rng)
+            radius = estimate_spectral_radius(W_mem, tol=radius_tol, rng=self.rng)
+            if radius > 0:
+                W_mem.data *= (spectral_radius / radius)
+            np.clip(W_mem.data, -self.w_max_clip, self.w_max_clip, out=W_mem.data)
+        else:
+            raise ValueError(f"unknown reservoir init method: {method!r}")
 
         # 全体結合行列へ適用 & 可塑性フラグの設定
-        self.W[np.ix_(self.idx_mem, self.idx_mem)] = W_mem
-        self.mask_plastic[np.ix_(self.idx_mem, self.idx_mem)] = (W_mem != 0)
+        if self.sparse:
+            W_block = W_mem if sp.issparse(W_mem) else sp.csr_matrix(W_mem)
+            self.W = self._with_mem_block(self.W, W_block)
+            self.mask_plastic = self._with_mem_block(self.mask_plastic, W_block != 0)
+        else:
+            if sp.issparse(W_mem):
+                W_mem = W_mem.toarray()
+            self.W[np.ix_(self.idx_mem, self.idx_mem)] = W_mem
+            self.mask_plastic[np.ix_(self.idx_mem, self.idx_mem)] = (W_mem != 0)
+        self._syn_dirty = True
+
+    def _with_mem_block(self, M, block):
+        """スパース行列 M の MC->MC ブロックを block で置き換えた行列を返す (配線中の LIL 形式は維持する)"""
+        coo = sp.coo_matrix(M)
+        outside = (coo.row < self.n_think) | (coo.col < self.n_think)
+        blk = sp.coo_matrix(block)
+        rows = np.concatenate([coo.row[outside], blk.row + self.n_think])
+        cols = np.concatenate([coo.col[outside], blk.col + self.n_think])
+        data = np.concatenate([coo.data[outside], blk.data.astype(coo.data.dtype)])
+        out = sp.csr_matrix((data, (rows, cols)), shape=M.shape, dtype=M.dtype)
+        return out.tolil() if M.format == "lil" else out
+
+    def compile_connectivity(self):
+        """
+        W と mask_plastic を実行時表現に変換する (sparse / compact_mask / block_structured / plastic_store 用)。
+        - sparse: W を CSR に変換し、可塑性シナプスは重みが0でも構造として保持して
+                  W.data 上の位置 (slot) で管理する。
+                  step() は W の構造変化を検知して自動で再変換するが、
+                  mask_plastic を書き換えた場合は明示的に呼び出すこと。
+        - compact_mask: PackedMask から可塑性シナプスのインデックス列を構築する
+                        (mask_plastic への書き込みは自動で検知される)。
+        - block_structured: 領域ペアごとの結合ブロックを構築する
+                            (可塑性シナプスを含むブロックは W のビューとして保持する)。
+        - plastic_store: 可塑性シナプスの重みを W から PlasticSynapses へ移す (W の該当要素は0/削除)。
+                         再コンパイル時はストアの重みを W へ書き戻してから取り出し直す。
+        """
+        self._fixed_csc = None
+        self._plastic_by_pre = None
+        if self.plastic_store:
+            self._compile_plastic_store()
+            if self.block_structured:
+                self._blocks = BlockConnectivity.from_dense(self.W, self._store.post, self._store.pre,
+                                                            self.region_bounds())
+            return
+        if not self.sparse:
+            if self.compact_mask:
+                self._compile_plastic_index()
+            if self.block_structured:
+                post, pre = self.mask_plastic.nonzero()
+                self._blocks = BlockConnectivity.from_dense(self.W, post, pre, self.region_bounds())
+            return
+
+        n = self.n_total
+        W_coo = sp.coo_matrix(self.W)
+        M_coo = sp.coo_matrix(self.mask_plastic)
+        w_keep = W_coo.data != 0
+        m_keep = M_coo.data.astype(bool)
+        m_row, m_col = M_coo.row[m_keep], M_coo.col[m_keep]
+
+        # 可塑性シナプスは重み0でも明示的な要素として構造に含める
+        rows = np.concatenate([W_coo.row[w_keep], m_row])
+        cols = np.concatenate([W_coo.col[w_keep], m_col])
+        data = np.concatenate([W_coo.data[w_keep], np.zeros(len(m_row), dtype=W_coo.data.dtype)])
+        W_csr = sp.csr_matrix((data, (rows, cols)), shape=(n, n), dtype=self.dtype)
+        W_csr.sum_duplicates()
+
+        # 行優先のキー (post * n + pre) で可塑性シナプスの slot を特定
+        entry_rows = np.repeat(np.arange(n), np.diff(W_csr.indptr))
+        keys = entry_rows.astype(np.int64) * n + W_csr.indices
+        plastic_keys = m_row.astype(np.int64) * n + m_col
+        slots = np.flatnonzero(np.isin(keys, plastic_keys))
+
+        self.W = W_csr
+        self.mask_plastic = sp.csr_matrix(
+            (np.ones(len(slots), dtype=bool), (entry_rows[slots], W_csr.indices[slots])),
+            shape=(n, n))
+        self._plastic_slots = slots
+        self._plastic_post = entry_rows[slots]
+        self._plastic_pre = W_csr.indices[slots].astype(np.int64)
+        self._compiled_data = self.W.data
+        self._compiled_mask = self.mask_plastic.indices
+        self._syn_dirty = True
+
+    def _compile_plastic_store(self):
+        """plastic_store 用: mask_plastic の要素の重みを W から PlasticSynapses へ移す"""
+        previous = self._store
+        if previous is not None:
+            self._write_back_store()
+        post, pre = self.mask_plastic.nonzero()
+        if self.sparse:
+            W = sp.csr_matrix(self.W)
+            weights = np.asarray(W[post, pre]).ravel().astype(self.dtype)
+            W = W - sp.csr_matrix((weights, (post, pre)), shape=W.shape)
+            W.eliminate_zeros()
+            self.W = W
+            self._compiled_data = W.data
+            self.mask_plastic = sp.csr_matrix((np.ones(len(post), dtype=bool), (post, pre)), shape=W.shape)
+        else:
+            weights = self.W[post, pre].copy()
+            self.W[post, pre] = 0.0
+            if self.compact_mask:
+                self._compiled_version = self.mask_plastic.version
+        potentiated = weights != 0
+        if previous is not None:
+            # 重みが0まで戻った学習済みのシナプスも、再コンパイル後に削除対象のまま扱う
+            n = self.n_total
+            learned = previous.post[previous.potentiated].astype(np.int64) * n + previous.pre[previous.potentiated]
+            potentiated |= np.isin(np.asarray(post, dtype=np.int64) * n + pre, learned)
+        self._store = PlasticSynapses(post, pre, weights, potentiated)
+        self._bind_store()
+
+    def _write_back_store(self):
+        """PlasticSynapses の重みを W の該当要素へ書き戻す"""
+        store = self._store
+        if self.sparse:
+            W = sp.csr_matrix(self.W) + sp.csr_matrix((store.weight, (store.post, store.pre)), shape=self.W.shape)
+            self.W = W.tocsr()
+        else:
+            self.W[store.post, store.pre] = store.weight
+
+    def _bind_store(self):
+        """インデックス版の更新処理 (_update_weights_srg_indexed 等) がストアを走査するよう設定する"""
+        store = self._store
+        self._plastic_post = store.post
+        self._plastic_pre = store.pre
+        self._plastic_slots = None
+        self._plastic_by_pre = None
+        self._syn_dirty = True
+
+    @property
+    def plastic_synapses(self):
+        """plastic_store の可塑性シナプス (PlasticSynapses)。コンパイル前・plastic_store でない場合は None"""
+        return self._store
+
+    def prune_plastic(self, epsilon: float = None) -> int:
+        """
+        |w| < epsilon まで減衰した可塑性シナプスを削除し、ストアを詰め直す (plastic_store のみ)。
+        重み0で作られ、まだヘブ則で変化していないシナプスは削除しない (学習の機会を残す)。
+        削除したシナプスは mask_plastic からも外れ、以降は結合なしとして扱われる。
+
+        Args:
+            epsilon (float): 閾値 (None で prune_epsilon)
+        Returns:
+            int: 削除したシナプス数
+        """
+        if not self.plastic_store:
+            raise ValueError("prune_plastic requires plastic_store=True")
+        if self._connectivity_dirty():
+            self.compile_connectivity()
+        self._steps_since_prune = 0
+        post, pre = self._store.prune(self.prune_epsilon if epsilon is None else epsilon)
+        if len(post) == 0:
+            return 0
+        if self.sparse:
+            store = self._store
+            self.mask_plastic = sp.csr_matrix((np.ones(len(store), dtype=bool), (store.post, store.pre)),
+                                              shape=self.W.shape)
+        else:
+            self.mask_plastic[post, pre] = False
+            if self.compact_mask:
+                self._compiled_version = self.mask_plastic.version
+        self._bind_store()
+        if self.block_structured:
+            self._blocks = BlockConnectivity.from_dense(self.W, self._store.post, self._store.pre,
+                                                        self.region_bounds())
+        return len(post)
+
+    def full_weights(self):
+        """可塑性シナプスを含む結合行列 (plastic_store ではストアの重みを書き戻したコピー)"""
+        if self._store is None:
+            return self.W.copy()
+        store = self._store
+        if self.sparse:
+            return (self.W + sp.csr_matrix((store.weight, (store.post, store.pre)), shape=self.W.shape)).tocsr()
+        W = self.W.copy()
+        W[store.post, store.pre] = store.weight
+        return W
+
+    def region_bounds(self) -> list:
+        """各領域の (名前, 開始ID, 終了ID)"""
+        n_sc = self.n_sensory + self.n_concept
+        return [("sensory", 0, self.n_sensory), ("concept", self.n_sensory, n_sc),
+                ("motor", n_sc, self.n_think), ("mem", self.n_think, self.n_total)]
+
+    def _compile_plastic_index(self):
+        """compact_mask 用: PackedMask から可塑性シナプスの (post, pre) を構築する (int32 x 2 = 8 byte/シナプス)"""
+        post, pre = self.mask_plastic.nonzero()
+        self._plastic_post = post
+        self._plastic_pre = pre
+        self._compiled_version = self.mask_plastic.version
+        self._syn_dirty = True
+
+    def _weight_store(self) -> np.ndarray:
+        """可塑性シナプスの重みを保持する1次元の格納配列 (sparse: W.data / dense: W のビュー / plastic_store: ストア)"""
+        if self.plastic_store:
+            return self._store.weight
+        return self.W.data if self.sparse else self.W.reshape(-1)
+
+    def _plastic_index(self, sel: np.ndarray = None):
+        """
+        可塑性シナプスの重みを data[index] で読み書きするための (data, index)
+
+        plastic_store ではストアの重みを直接指す (sel が None なら全体のスライスで、in-place に更新できる)。
+        compact_mask では W を (post, pre) で添字付けし、slot 配列を保持しない。
+
+        Args:
+            sel (np.ndarray): 可塑性シナプスの部分集合 (_plastic_post と同じ長さのブールマスク、
+                              または番号の配列)。None で全体。
+        """
+        if self.plastic_store:
+            return self._store.weight, (slice(None) if sel is None else sel)
+        if not self.sparse:
+            if sel is None:
+                return self.W, (self._plastic_post, self._plastic_pre)
+            return self.W, (self._plastic_post[sel], self._plastic_pre[sel])
+        slots = self._plastic_slots
+        return self._weight_store(), (slots if sel is None else slots[sel])
+
+    def _connectivity_dirty(self) -> bool:
+        """実行時表現が W / mask_plastic の現在の構造と食い違っているか"""
+        if self.plastic_store:
+            if self._store is None:
+                return True
+            if self.sparse:
+                return not sp.issparse(self.W) or self.W.format != "csr" or self.W.data is not self._compiled_data
+            return self.compact_mask and self.mask_plastic.version != self._compiled_version
+        if not self.sparse:
+            return self.mask_plastic.version != self._compiled_version
+        return (not sp.issparse(self.W) or self.W.format != "csr"
+                or self.W.data is not self._compiled_data
+                or not sp.issparse(self.mask_plastic) or self.mask_plastic.format != "csr"
+                or self.mask_plastic.indices is not self._compiled_mask)
+
+    def save_checkpoint(self, path: str):
+        """重み・可塑性マスク・状態変数をディレクトリへ保存する (core.checkpoint.save_checkpoint)"""
+        from .checkpoint import save_checkpoint
+        save_checkpoint(self, path)
+
+    @classmethod
+    def load_checkpoint(cls, path: str, mmap_mode: str = "c") -> "BiCortexEngine":
+        """save_checkpoint で保存したエンジンをメモリマップで復元する (core.checkpoint.load_checkpoint)"""
+        from .checkpoint import load_checkpoint
+        return load_checkpoint(path, mmap_mode=mmap_mode)
+
+    def attach_instrumentation(self, instrumentation=None):
+        """
+        step() のフェーズ別タイマーと実行時カウンタを有効にする
+
+        Args:
+            instrumentation (Instrumentation): 使用する計測器。None の場合は新規に作成する。
+        Returns:
+            Instrumentation: 有効になった計測器 (summary() で集計結果を取得)
+        """
+        if instrumentation is None:
+            from .instrumentation import Instrumentation
+            instrumentation = Instrumentation()
+        self.instrumentation = instrumentation
+        return instrumentation
+
+    def detach_instrumentation(self):
+        """計測を無効にし、それまでの計測器を返す"""
+        instrumentation, self.instrumentation = self.instrumentation, None
+        return instrumentation
 
     def reset_state(self):
         """状態変数のリセット（重みは保持）"""
@@ -142,15 +554,149 @@ class BiCortexEngine:
         self.refractory_count[:] = 0
         self.adaptation[:] = 0 
         self.activity_ma = 0.0
+        self.i_syn_fixed[:] = 0
+        self.i_syn_plastic[:] = 0
 
-    def step(self, input_current: np.ndarray):
+    def _synaptic_components(self):
+        """W @ x_fast を (固定結合の寄与, 可塑性結合の寄与) に分けて計算する"""
+        if self._indexed_plastic:
+            if self._connectivity_dirty():
+                self.compile_connectivity()
+            total = self.W @ self.x_fast
+            if self.plastic_store:
+                # W には固定結合のみが残っている
+                return total, self._store.current(self.x_fast, self.n_total)
+            data, index = self._plastic_index()
+            weights = data[index] * self.x_fast[self._plastic_pre]
+            plastic = np.bincount(self._plastic_post, weights=weights, minlength=self.n_total)
+        else:
+            total = self.W @ self.x_fast
+            plastic = np.where(self.mask_plastic, self.W, 0.0) @ self.x_fast
+        return total - plastic, plastic
+
+    def sync_synaptic_current(self):
+        """
+        イベント駆動モード用: シナプス電流を現在の W と x_fast から再計算する。
+        W / mask_plastic を外部から書き換えた後は呼び出すこと。
+        """
+        fixed, plastic = self._synaptic_components()
+        self.i_syn_plastic = plastic.astype(self.dtype)
+        self.i_syn_fixed = fixed.astype(self.dtype)
+        # W / mask_plastic が書き換えられた可能性があるため、列方向インデックスも作り直す
+        self._fixed_csc = None
+        self._plastic_by_pre = None
+        self._steps_since_sync = 0
+        self._syn_dirty = False
+
+    def _fixed_columns(self) -> sp.csc_matrix:
+        """
+        イベント駆動 + sparse 用: 固定結合のみの CSC 行列 (遅延構築)。
+        CSR の列スライスは構造全体を走査する (O(nnz)) ため、発火列の取り出しは CSC で行う。
+        可塑性シナプスを含まないので、重み更新のたびに同期する必要はない。
+        """
+        if self._fixed_csc is None:
+            if self.plastic_store:
+                fixed = self.W
+            else:
+                data = self.W.data.copy()
+                data[self._plastic_slots] = 0.0
+                fixed = sp.csr_matrix((data, self.W.indices, self.W.indptr), shape=self.W.shape)
+            self._fixed_csc = fixed.tocsc()
+            self._fixed_csc.eliminate_zeros()
+        return self._fixed_csc
+
+    def _plastic_from(self, fired: np.ndarray) -> np.ndarray:
+        """イベント駆動用: pre が fired に含まれる可塑性シナプスの番号 (_plastic_post 等の添字)"""
+        if self._plastic_by_pre is None:
+            order = np.argsort(self._plastic_pre, kind="stable")
+            ptr = np.searchsorted(self._plastic_pre[order], np.arange(self.n_total + 1))
+            self._plastic_by_pre = (order, ptr)
+        order, ptr = self._plastic_by_pre
+        lo, counts = ptr[fired], ptr[fired + 1] - ptr[fired]
+        # 各 pre の区間 [lo, lo + count) を連結した添字
+        offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        return order[np.arange(counts.sum()) + offsets]
+
+    def _propagate_spike_events(self, spikes: np.ndarray, fired: np.ndarray):
+        """
+        イベント駆動モード用: x_fast の更新に合わせてシナプス電流を更新する。
+        I(t+1) = decay_fast * I(t) + W[:, fired].sum()  (重み更新前の W を用いる)
+        """
+        self.i_syn_fixed *= self.decay_fast
+        self.i_syn_plastic *= self.decay_fast
+        if len(fired) == 0:
+            return
+
+        if self._indexed_plastic:
+            sel = self._plastic_from(fired)
+            data, index = self._plastic_index(sel)
+            plastic = np.bincount(self._plastic_post[sel], weights=data[index], minlength=self.n_total)
+            if self.sparse:
+                fixed = np.asarray(self._fixed_columns()[:, fired].sum(axis=1)).ravel()
+            else:
+                total = self.W[:, fired].sum(axis=1)
+                fixed = total if self.plastic_store else total - plastic
+        else:
+            cols = self.W[:, fired]
+            total = cols.sum(axis=1)
+            plastic = np.where(self.mask_plastic[:, fired], cols, 0.0).sum(axis=1)
+            fixed = total - plastic
+        self.i_syn_plastic += plastic
+        self.i_syn_fixed += fixed
+
+    def step(self, input_current):
         """
         1タイムステップのシミュレーションを実行する
         Sequence: Integration -> Fire -> Adaptation -> Trace -> Gating -> Learning
+
+        Args:
+            input_current: 外部入力。(n_total,) の ndarray、または疎な入力 (indices, values)
+                           (indices は重複のないニューロンID)。
         """
+        inst = self.instrumentation
+        if inst is not None:
+            inst.start_step()
+
+        if self._fused_step is not None:
+            if isinstance(input_current, tuple):
+                indices, values = input_current
+                input_current = np.zeros(self.n_total, dtype=self.dtype)
+                input_current[indices] = values
+            spikes = self._step_fused(input_current)
+            if inst is not None:
+                inst.lap("fused")
+                inst.end_step(self, spikes)
+            return spikes
+
+        if self._indexed_plastic and self._connectivity_dirty():
+            self.compile_connectivity()
+        elif self.block_structured and (self._blocks is None or self._blocks.source is not self.W):
+            self.compile_connectivity()
+
         # 1. 膜電位の更新 (LIF)
-        synaptic_input = self.W @ self.x_fast
-        self.v = self.v * self.alpha + input_current + synaptic_input
+        if self.event_driven:
+            if self._syn_dirty or self._steps_since_sync >= self.resync_interval:
+                self.sync_synaptic_current()
+            self._steps_since_sync += 1
+            synaptic_input = self.i_syn_fixed + self.i_syn_plastic
+        else:
+            if self._blocks is not None:
+                synaptic_input = self._blocks.matvec(self.x_fast)
+            else:
+                synaptic_input = self.W @ self.x_fast
+            if self._store is not None:
+                synaptic_input += self._store.current(self.x_fast, self.n_total)
+        # in-place 演算で dtype (float32 等) を維持する
+        self.v *= self.alpha
+        if isinstance(input_current, tuple):
+            # 疎な入力: 入力のあるニューロンのみ加算 (dense な入力の加算と同じ結果)
+            indices, values = input_current
+            self.v[indices] += values
+        else:
+            self.v += input_current
+        self.v += synaptic_input
+        if inst is not None:
+            inst.lap("integration")
         
         # 2. 順応の減衰と閾値決定
         self.adaptation *= self.decay_adapt 
@@ -161,7 +707,7 @@ class BiCortexEngine:
         self.refractory_count = np.maximum(0, self.refractory_count - 1)
 
         # 3. 発火判定
-        spikes = (self.v >= v_thresh).astype(float)
+        spikes = (self.v >= v_thresh).astype(self.dtype)
         fired = np.where(spikes > 0)[0]
         
         # 発火後処理: リセット、不応期設定、順応加算
@@ -169,49 +715,292 @@ class BiCortexEngine:
         self.refractory_count[fired] = self.refractory_steps
         if self.adaptation_step > 0:
             self.adaptation[fired] += self.adaptation_step
+        if inst is not None:
+            inst.lap("fire_reset")
         
         # 4. トレース変数の更新
         self.x_fast = self.x_fast * self.decay_fast + spikes
         self.e_trace = self.e_trace * self.decay_trace + spikes
+        if self.event_driven:
+            self._propagate_spike_events(spikes, fired)
+        if inst is not None:
+            inst.lap("trace")
         
         # 5. SRGゲート判定 (Thinking CortexのConcept活動を監視)
         concept_activity = np.sum(spikes[self.idx_concept])
         self.activity_ma = self.activity_ma * (1 - self.ma_alpha) + concept_activity * self.ma_alpha
         self.is_gating = (self.activity_ma >= self.gate_threshold)
+        if inst is not None:
+            inst.lap("gating")
 
         # 6. 可塑性更新
         self._update_weights_srg(spikes)
+        if self.plastic_store and self.prune_epsilon > 0:
+            self._steps_since_prune += 1
+            if self._steps_since_prune >= self.prune_interval:
+                self.prune_plastic()
+        if inst is not None:
+            inst.lap("plasticity")
+            inst.end_step(self, spikes)
+
+        return spikes
+
+    def fast_forward(self, n_steps: int, input_current: np.ndarray = None) -> bool:
+        """
+        一定入力の n_steps ステップを、どのニューロンも発火しないことを証明できる場合に限り一括で進める。
+
+        発火がなければ各変数は閉じた形で k ステップ分進められる:
+        x_fast, e_trace, adaptation, activity_ma は減衰率の k 乗、可塑性重みは (1 - global_decay)^k、
+        膜電位は alpha^k * v と、d^j で減衰するシナプス入力 (固定成分は decay_fast、可塑成分は
+        decay_fast * (1 - global_decay)) の等比級数和。
+        各ステップの膜電位の上界が閾値 (v_base + 順応の下限) を下回る場合のみ適用し、
+        そうでなければ何もせず False を返す (step() を続けること)。
+        不応期中のニューロンがある間は適用しない。
+
+        Args:
+            n_steps (int): 進めるステップ数
+            input_current (np.ndarray): 区間中の一定入力 (n_total,)。None の場合は0。
+        Returns:
+            bool: 早送りしたか
+        """
+        k = int(n_steps)
+        if k < 1 or np.any(self.refractory_count > 0):
+            return False
+        if self._indexed_plastic and self._connectivity_dirty():
+            self.compile_connectivity()
+
+        if self.event_driven:
+            if self._syn_dirty:
+                self.sync_synaptic_current()
+            fixed, plastic = self.i_syn_fixed, self.i_syn_plastic
+        else:
+            fixed, plastic = self._synaptic_components()
+        c = np.zeros(self.n_total) if input_current is None else np.asarray(input_current, dtype=float)
+
+        alpha, d = self.alpha, self.decay_fast
+        w_decay = 1.0 - self.global_decay
+        q = d * w_decay
+        leak_sum = (1.0 - alpha ** k) / (1.0 - alpha)
+
+        # 1 <= t <= k の各ステップの膜電位の上界 (各項の最大値の和)
+        v_bound = (np.where(self.v > 0, alpha * self.v, alpha ** k * self.v)
+                   + np.maximum(fixed, 0.0) * _peak_response(alpha, d, k)
+                   + np.maximum(plastic, 0.0) * _peak_response(alpha, q, k)
+                   + np.where(c > 0, c * leak_sum, c))
+        if np.any(v_bound >= self.v_base + np.minimum(self.adaptation, 0.0)):
+            return False
+
+        self.v *= alpha ** k
+        self.v += fixed * _geometric_response(alpha, d, k) + plastic * _geometric_response(alpha, q, k) + c * leak_sum
+        self.x_fast *= d ** k
+        self.e_trace *= self.decay_trace ** k
+        self.adaptation *= self.decay_adapt ** k
+        self.activity_ma *= (1 - self.ma_alpha) ** k
+        self.is_gating = (self.activity_ma >= self.gate_threshold)
+
+        if self.global_decay > 0:
+            if self._indexed_plastic:
+                data, index = self._plastic_index()
+                data[index] *= w_decay ** k
+            else:
+                self.W[self.mask_plastic] *= w_decay ** k
+        if self.event_driven:
+            self.i_syn_fixed *= d ** k
+            self.i_syn_plastic *= q ** k
+            self._steps_since_sync += k
+        return True
 
+    def _step_fused(self, input_current: np.ndarray):
+        """backend='numba' 用: 融合カーネルで1ステップ実行する (状態はin-placeで更新)"""
+        spikes = np.empty(self.n_total, dtype=self.dtype)
+        self.activity_ma, self.is_gating = self._fused_step(
+            self.W, self.mask_plastic, self.v, self.refractory_count, self.adaptation,
+            self.x_fast, self.e_trace, np.ascontiguousarray(input_current, dtype=self.dtype), spikes,
+            self.n_sensory, self.n_sensory + self.n_concept,
+            self.alpha, self.v_base, self.decay_adapt, self.adaptation_step, float(self.refractory_steps),
+            self.decay_fast, self.decay_trace, self.activity_ma, self.ma_alpha, self.gate_threshold,
+            self.learning_rate, self.global_decay, self.w_max_clip)
+        self.is_gating = bool(self.is_gating)
         return spikes
 
+    def run(self, input_series, probes=None, fast_forward: bool = False) -> dict:
+        """
+        シナリオ全体のシミュレーションを実行する
+
+        Args:
+            input_series: 感覚入力系列。(T, n_sensory) の ndarray、同形状の scipy.sparse 行列、
+                          または StimulusSchedule (各ステップの入力は疎な (indices, values) で渡される)。
+            probes (list[Probe]): 記録対象 (core.probes)。出力バッファは開始時に一括確保される。
+            fast_forward (bool): 入力が0の区間で、発火がないことを証明できる間は fast_forward() で
+                                 一括して進める。状態を記録するプローブの記録ステップ
+                                 (Probe.next_sample) では早送りを区切るため、記録結果は変わらない
+                                 (丸め誤差を除く)。
+        Returns:
+            dict: probe.name -> 記録データ (ndarray)
+        """
+        probes = probes or []
+        total_steps = input_series.shape[0]
+        for probe in probes:
+            probe.allocate(self, total_steps)
+
+        current = np.zeros(self.n_total)
+        idx_s = self.idx_sensory
+        if fast_forward:
+            self._run_fast_forward(input_series, probes, current)
+        elif isinstance(input_series, StimulusSchedule):
+            for t_start, t_end, indices, values in input_series.segments():
+                segment_input = (idx_s[indices], values)
+                for t in range(t_start, t_end):
+                    spikes = self.step(segment_input)
+                    for probe in probes:
+                        probe.observe(self, spikes, t)
+        elif sp.issparse(input_series):
+            series = sp.csr_matrix(input_series)
+            indptr, indices, values = series.indptr, series.indices, series.data
+            for t in range(total_steps):
+                current[idx_s] = 0.0
+                lo, hi = indptr[t], indptr[t + 1]
+                current[idx_s[indices[lo:hi]]] = values[lo:hi]
+                spikes = self.step(current)
+                for probe in probes:
+                    probe.observe(self, spikes, t)
+        else:
+            for t in range(total_steps):
+                current[idx_s] = input_series[t]
+                spikes = self.step(current)
+                for probe in probes:
+                    probe.observe(self, spikes, t)
+
+        for probe in probes:
+            probe.finish(self)
+        return {probe.name: probe.data for probe in probes}
+
+    def _run_fast_forward(self, input_series, probes, current: np.ndarray):
+        """run(fast_forward=True) の本体: 入力0の区間を fast_forward() で進め、それ以外は step() する"""
+        total_steps = input_series.shape[0]
+        idx_s = self.idx_sensory
+        schedule = input_series if isinstance(input_series, StimulusSchedule) else None
+        if schedule is not None:
+            quiet_end = schedule.quiet_until
+        else:
+            if sp.issparse(input_series):
+                series = sp.csr_matrix(input_series)
+                series.eliminate_zeros()
+                quiet = np.diff(series.indptr) == 0
+            else:
+                series = input_series
+                quiet = ~np.any(np.asarray(input_series) != 0, axis=1)
+            # quiet_end(t): t から始まる入力0の区間の終端 (t 自身に入力があれば t)
+            next_active = np.append(np.flatnonzero(~quiet), total_steps)
+            quiet_end_steps = next_active[np.searchsorted(next_active, np.arange(total_steps))]
+
+            def quiet_end(t):
+                return quiet_end_steps[t]
+        no_spikes = np.zeros(self.n_total, dtype=self.dtype)
+
+        t = 0
+        retry_at = 0
+        while t < total_steps:
+            if t >= retry_at and quiet_end(t) > t:
+                # 記録が必要なステップ s で止める (s の step() 後の状態を observe させる)
+                end = min([quiet_end(t)] + [probe.next_sample(t) + 1 for probe in probes])
+                k = int(end) - t
+                if k >= 2:
+                    if self.fast_forward(k):
+                        t += k
+                        for probe in probes:
+                            probe.observe(self, no_spikes, t - 1)
+                        continue
+                    retry_at = t + self.fast_forward_retry
+
+            if schedule is not None:
+                indices, values = schedule.at(t)
+                spikes = self.step((idx_s[indices], values))
+            else:
+                if sp.issparse(series):
+                    current[idx_s] = 0.0
+                    lo, hi = series.indptr[t], series.indptr[t + 1]
+                    current[idx_s[series.indices[lo:hi]]] = series.data[lo:hi]
+                else:
+                    current[idx_s] = series[t]
+                spikes = self.step(current)
+            for probe in probes:
+                probe.observe(self, spikes, t)
+            t += 1
+
     def _update_weights_srg(self, spikes: np.ndarray):
         """
         Semantic Resonance Gating による重み更新
         Rule: Delta W = eta * Gate * Post(t) * Pre_Trace(t)
         """
+        if self._indexed_plastic:
+            self._update_weights_srg_indexed(spikes)
+            return
+
+        inst = self.instrumentation
         # A. 全体減衰 (Global Decay) - 忘却プロセス
         if self.global_decay > 0:
              self.W[self.mask_plastic] *= (1.0 - self.global_decay)
+             if self.event_driven:
+                 self.i_syn_plastic *= (1.0 - self.global_decay)
+             if inst is not None:
+                 inst.count_plasticity(0, int(np.count_nonzero(self.mask_plastic)))
         
         # ゲートが閉じている場合は学習しない
         if not self.is_gating:
             return
 
         # B. ヘブ則更新 (Gated Hebbian)
-        fired = np.where(spikes > 0)[0]
-        
-        for post in fired:
-            # このニューロンへの入力結合のうち、可塑性があるものを抽出
-            mask_p = self.mask_plastic[post, :]
-            if not np.any(mask_p): continue
-            
-            # Pre-synaptic Activity (Trace)
-            pre_trace = self.e_trace[mask_p]
-            
-            # 更新量の計算
-            delta = self.learning_rate * pre_trace
-            
-            # 重み更新とクリッピング
-            w = self.W[post, mask_p]
-            new_w = w + delta
-            self.W[post, mask_p] = np.clip(new_w, -self.w_max_clip, self.w_max_clip)
\ No newline at end of file
+        # 発火した post 行をまとめて取り出し、可塑性要素にのみ eta * Pre_Trace を加算する
+        # (発火数によらず 1 回のバッチ演算: gather -> masked update -> scatter)
+        fired = np.flatnonzero(spikes)
+        if len(fired) == 0:
+            return
+
+        w_rows = self.W[fired]
+        mask_rows = self.mask_plastic[fired]
+        new_w = np.clip(w_rows + self.learning_rate * self.e_trace, -self.w_max_clip, self.w_max_clip)
+        new_rows = np.where(mask_rows, new_w, w_rows)
+        self.W[fired] = new_rows
+        if inst is not None:
+            inst.count_plasticity(int(np.count_nonzero(mask_rows)), 0)
+        if self.event_driven:
+            # クリップ後の実変化量でシナプス電流を補正
+            self.i_syn_plastic[fired] += (new_rows - w_rows) @ self.x_fast
+
+    def _update_weights_srg_indexed(self, spikes: np.ndarray):
+        """
+        SRG重み更新のインデックス版 (sparse / compact_mask / plastic_store): 可塑性シナプスのみを走査する
+        (plastic_store ではストアの連続配列を直接更新する)
+        """
+        inst = self.instrumentation
+
+        # A. 全体減衰 (Global Decay)
+        if self.global_decay > 0:
+            data, index = self._plastic_index()
+            data[index] *= (1.0 - self.global_decay)
+            if self.event_driven:
+                self.i_syn_plastic *= (1.0 - self.global_decay)
+            if inst is not None:
+                inst.count_plasticity(0, len(self._plastic_post))
+
+        if not self.is_gating:
+            return
+
+        # B. ヘブ則更新: 発火した post を持つ可塑性シナプスのみ
+        sel = spikes[self._plastic_post] > 0
+        if not np.any(sel):
+            return
+        data, index = self._plastic_index(sel)
+        pre = self._plastic_pre[sel]
+        old_w = data[index]
+        new_w = np.clip(old_w + self.learning_rate * self.e_trace[pre], -self.w_max_clip, self.w_max_clip)
+        data[index] = new_w
+        if self.plastic_store:
+            self._store.potentiated[sel] |= new_w != old_w
+        if inst is not None:
+            inst.count_plasticity(len(pre), 0)
+        if self.event_driven:
+            self.i_syn_plastic += np.bincount(self._plastic_post[sel],
+                                              weights=(new_w - old_w) * self.x_fast[pre],
+                                              minlength=self.n_total)
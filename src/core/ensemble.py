@@ -0,0 +1,190 @@
+import numpy as np
+
+
+class BiCortexEnsemble:
+    """
+    Batched Bi-Cortex Ensemble
+
+    同一トポロジー (領域サイズ・dt) を持つ B 個の独立した BiCortexEngine を
+    (B, N) の状態配列と (B, N, N) の結合行列にまとめ、1つのループで同時に実行する。
+    learning_rate, gate_ratio, global_decay, adaptation_step, seed などは
+    ネットワークごとに異なってよい (パラメータスイープ・シード検証用)。
+    """
+
+    # ネットワークごとに (B,) 配列として保持するスカラーパラメータ
+    _PARAMS = ("learning_rate", "global_decay", "w_max_clip", "gate_threshold", "ma_alpha",
+               "v_base", "alpha", "refractory_steps", "adaptation_step", "decay_adapt",
+               "decay_trace", "decay_fast")
+
+    def __init__(self, engines):
+        """
+        Args:
+            engines (list[BiCortexEngine]): 配線済みのエンジン群。状態・重み・パラメータをコピーして保持する。
+        """
+        if len(engines) == 0:
+            raise ValueError("engines must not be empty")
+        ref = engines[0]
+        for e in engines:
+            # plastic_store は可塑性重みを W の外 (ストア) に保持し、block_structured の積分には対応しないため対象外
+            if e.sparse or e.event_driven or e.plastic_store or e.block_structured:
+                raise ValueError("BiCortexEnsemble supports dense, matvec-integrated engines only")
+            if (e.n_sensory, e.n_concept, e.n_motor, e.n_mem, e.dt) != \
+               (ref.n_sensory, ref.n_concept, ref.n_motor, ref.n_mem, ref.dt):
+                raise ValueError("all engines must share the same topology and dt")
+
+        self.n_networks = len(engines)
+        self.n_sensory = ref.n_sensory
+        self.n_concept = ref.n_concept
+        self.n_motor = ref.n_motor
+        self.n_mem = ref.n_mem
+        self.n_think = ref.n_think
+        self.n_total = ref.n_total
+        self.dt = ref.dt
+
+        self.idx_sensory = ref.idx_sensory
+        self.idx_concept = ref.idx_concept
+        self.idx_motor = ref.idx_motor
+        self.idx_mem = ref.idx_mem
+
+        # --- パラメータ (B,) ---
+        for name in self._PARAMS:
+            setattr(self, name, np.array([getattr(e, name) for e in engines], dtype=float))
+
+        # --- 状態 (B, N) ---
+        self.v = np.stack([e.v for e in engines]).astype(float)
+        self.refractory_count = np.stack([e.refractory_count for e in engines]).astype(float)
+        self.adaptation = np.stack([e.adaptation for e in engines]).astype(float)
+        self.e_trace = np.stack([e.e_trace for e in engines]).astype(float)
+        self.x_fast = np.stack([e.x_fast for e in engines]).astype(float)
+        self.activity_ma = np.array([e.activity_ma for e in engines], dtype=float)
+        self.is_gating = np.array([e.is_gating for e in engines], dtype=bool)
+
+        # --- 結合行列 (B, N, N) ---
+        self.W = np.stack([e.W for e in engines]).astype(float)
+        masks = [np.asarray(e.mask_plastic, dtype=bool) for e in engines]
+        if all(np.array_equal(masks[0], m) for m in masks[1:]):
+            # 可塑性マスクが共通ならば (N, N) 1枚を全ネットワークで共有する
+            self.mask_plastic = np.array(masks[0], dtype=bool)
+        else:
+            self.mask_plastic = np.stack(masks)
+        # 全体減衰で走査する可塑性要素の添字 (毎ステップ (B, N, N) の一時配列を作らないよう構築時に求める)
+        if self.mask_plastic.ndim == 2:
+            self._plastic_idx = (slice(None),) + np.nonzero(self.mask_plastic)
+        else:
+            self._plastic_idx = np.nonzero(self.mask_plastic)
+
+    def reset_state(self):
+        """全ネットワークの状態変数のリセット（重みは保持）"""
+        self.v[:] = 0
+        self.x_fast[:] = 0
+        self.e_trace[:] = 0
+        self.refractory_count[:] = 0
+        self.adaptation[:] = 0
+        self.activity_ma[:] = 0.0
+
+    def step(self, input_current: np.ndarray):
+        """
+        全ネットワークを1タイムステップ進める (BiCortexEngine.step と同じ手順)
+
+        Args:
+            input_current (np.ndarray): (B, n_total) または全ネットワーク共通の (n_total,)
+        Returns:
+            np.ndarray: (B, n_total) のスパイク
+        """
+        col = lambda p: p[:, None]
+
+        # 1. 膜電位の更新 (LIF)
+        synaptic_input = np.matmul(self.W, self.x_fast[:, :, None])[:, :, 0]
+        self.v = self.v * col(self.alpha) + input_current + synaptic_input
+
+        # 2. 順応の減衰と閾値決定
+        self.adaptation *= col(self.decay_adapt)
+        v_thresh = col(self.v_base) + self.adaptation
+
+        self.v[self.refractory_count > 0] = 0.0
+        self.refractory_count = np.maximum(0, self.refractory_count - 1)
+
+        # 3. 発火判定
+        fired = self.v >= v_thresh
+        spikes = fired.astype(float)
+
+        self.v[fired] = 0.0
+        self.refractory_count = np.where(fired, col(self.refractory_steps), self.refractory_count)
+        self.adaptation += col(self.adaptation_step) * spikes
+
+        # 4. トレース変数の更新
+        self.x_fast = self.x_fast * col(self.decay_fast) + spikes
+        self.e_trace = self.e_trace * col(self.decay_trace) + spikes
+
+        # 5. SRGゲート判定
+        concept_activity = np.sum(spikes[:, self.idx_concept], axis=1)
+        self.activity_ma = self.activity_ma * (1 - self.ma_alpha) + concept_activity * self.ma_alpha
+        self.is_gating = self.activity_ma >= self.gate_threshold
+
+        # 6. 可塑性更新
+        self._update_weights_srg(fired)
+
+        return spikes
+
+    def _update_weights_srg(self, fired: np.ndarray):
+        """
+        Semantic Resonance Gating による重み更新 (全ネットワーク一括)
+        Rule: Delta W[b] = eta[b] * Gate[b] * Post[b](t) * Pre_Trace[b](t)
+        """
+        # A. 全体減衰 (Global Decay)
+        if np.any(self.global_decay > 0):
+            factor = 1.0 - self.global_decay
+            if self.mask_plastic.ndim == 2:
+                self.W[self._plastic_idx] *= factor[:, None]
+            else:
+                self.W[self._plastic_idx] *= factor[self._plastic_idx[0]]
+
+        # B. ヘブ則更新: ゲートが開いているネットワークで発火した (b, post) 行のみを一括更新
+        net_idx, post_idx = np.nonzero(fired & self.is_gating[:, None])
+        if len(net_idx) == 0:
+            return
+
+        w_rows = self.W[net_idx, post_idx]
+        if self.mask_plastic.ndim == 2:
+            mask_rows = self.mask_plastic[post_idx]
+        else:
+            mask_rows = self.mask_plastic[net_idx, post_idx]
+        clip = self.w_max_clip[net_idx, None]
+        new_w = np.clip(w_rows + self.learning_rate[net_idx, None] * self.e_trace[net_idx], -clip, clip)
+        self.W[net_idx, post_idx] = np.where(mask_rows, new_w, w_rows)
+
+    def run(self, input_series: np.ndarray):
+        """
+        感覚入力系列を全ネットワークへ与えてシミュレーションする
+
+        Args:
+            input_series (np.ndarray): (T, n_sensory) 全ネットワーク共通、または (T, B, n_sensory)
+        Returns:
+            np.ndarray: (T, B, n_total) のスパイク (bool)
+        """
+        total_steps = input_series.shape[0]
+        spikes_log = np.zeros((total_steps, self.n_networks, self.n_total), dtype=bool)
+        current = np.zeros((self.n_networks, self.n_total))
+        for t in range(total_steps):
+            current[:, self.idx_sensory] = input_series[t]
+            spikes_log[t] = self.step(current) > 0
+        return spikes_log
+
+    def write_back(self, engines):
+        """
+        各ネットワークの重み・状態を対応する BiCortexEngine へ書き戻す (個別解析用)
+
+        Args:
+            engines (list[BiCortexEngine]): 構築時と同じ順序のエンジン群
+        """
+        if len(engines) != self.n_networks:
+            raise ValueError("number of engines does not match the ensemble")
+        for b, e in enumerate(engines):
+            e.W[:] = self.W[b]
+            e.v[:] = self.v[b]
+            e.refractory_count[:] = self.refractory_count[b]
+            e.adaptation[:] = self.adaptation[b]
+            e.e_trace[:] = self.e_trace[b]
+            e.x_fast[:] = self.x_fast[b]
+            e.activity_ma = float(self.activity_ma[b])
+            e.is_gating = bool(self.is_gating[b])
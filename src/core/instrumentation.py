@@ -0,0 +1,104 @@
+"""
+Engine Instrumentation
+
+BiCortexEngine.step() のフェーズ別所要時間と実行時カウンタを集計する opt-in の計測器。
+engine.attach_instrumentation() で有効化し、無効時 (engine.instrumentation is None) の
+オーバーヘッドは1ステップあたり数回の None 判定のみ。
+
+フェーズ (step の処理順):
+    integration  膜電位の積分 (シナプス入力の計算を含む)
+    fire_reset   順応の減衰・発火判定・リセット・不応期
+    trace        トレース変数の更新 (イベント駆動モードではシナプス電流の伝播を含む)
+    gating       SRG ゲート判定
+    plasticity   全体減衰とヘブ則更新
+    fused        backend='numba' の融合カーネル (フェーズ分割なし)
+"""
+import time
+
+import numpy as np
+
+
+class Instrumentation:
+    PHASES = ("integration", "fire_reset", "trace", "gating", "plasticity", "fused")
+    REGIONS = ("sensory", "concept", "motor", "mem")
+
+    def __init__(self, timers: bool = True):
+        """
+        Args:
+            timers (bool): フェーズ別タイマーを有効にするか (False ではカウンタとフックのみ)
+        """
+        self.timers = timers
+        self._hooks = []
+        self.reset()
+
+    def reset(self):
+        """集計値を 0 に戻す (フックは保持する)"""
+        self.steps = 0
+        self.phase_time = dict.fromkeys(self.PHASES, 0.0)
+        self.spikes = dict.fromkeys(self.REGIONS, 0)
+        self.gate_open_steps = 0
+        self.hebbian_updates = 0
+        self.decay_ops = 0
+        self._t = 0.0
+
+    def add_hook(self, callback):
+        """
+        毎ステップ終了時に callback(engine, spikes, step_index) を呼ぶ。
+
+        Returns:
+            callable: remove_hook に渡すハンドル (callback 自身)
+        """
+        self._hooks.append(callback)
+        return callback
+
+    def remove_hook(self, callback):
+        self._hooks.remove(callback)
+
+    # --- engine から呼ばれる計測点 ---
+    def start_step(self):
+        if self.timers:
+            self._t = time.perf_counter()
+
+    def lap(self, phase: str):
+        if self.timers:
+            now = time.perf_counter()
+            self.phase_time[phase] += now - self._t
+            self._t = now
+
+    def count_plasticity(self, hebbian: int, decay: int):
+        self.hebbian_updates += hebbian
+        self.decay_ops += decay
+
+    def end_step(self, engine, spikes: np.ndarray):
+        bounds = (0, engine.n_sensory, engine.n_sensory + engine.n_concept, engine.n_think, engine.n_total)
+        for region, lo, hi in zip(self.REGIONS, bounds[:-1], bounds[1:]):
+            self.spikes[region] += int(np.count_nonzero(spikes[lo:hi]))
+        self.gate_open_steps += int(engine.is_gating)
+        for callback in self._hooks:
+            callback(engine, spikes, self.steps)
+        self.steps += 1
+
+    def summary(self) -> dict:
+        """集計結果を JSON 化可能な dict で返す"""
+        total = sum(self.phase_time.values())
+        steps = max(self.steps, 1)
+        phases = {
+            phase: {
+                "total_s": t,
+                "per_step_us": 1e6 * t / steps,
+                "fraction": t / total if total > 0 else 0.0,
+            }
+            for phase, t in self.phase_time.items() if t > 0
+        }
+        return {
+            "steps": self.steps,
+            "total_time_s": total,
+            "steps_per_sec": self.steps / total if total > 0 else None,
+            "phases": phases,
+            "spikes": dict(self.spikes),
+            "spike_rate": {region: count / steps for region, count in self.spikes.items()},
+            "gate_open_steps": self.gate_open_steps,
+            "gate_open_ratio": self.gate_open_steps / steps,
+            "hebbian_updates": self.hebbian_updates,
+            "decay_ops": self.decay_ops,
+        }
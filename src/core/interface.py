@@ -0,0 +1,118 @@
+"""
+Interface Projection (視覚特徴 -> Memory Cortex)
+
+VisualEncoder の 576 次元特徴ベクトルを、固定の疎行列 (CSR) を介して Memory Cortex の
+ニューロンへの入力電流に直接変換する。感覚ニューロンを 576 個に増やして dense な W に
+書き込む必要がなく、エンジンの行列積のサイズも増えない。
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from .reservoir import sparse_random_positions
+
+
+class InterfaceProjection:
+    """
+    特徴ベクトル (n_features,) -> 記憶野への入力電流 (n_target,) の固定疎投影
+
+    重みは (n_target, n_features) の CSR 行列 P として保持し、I_mem = P @ features で計算する。
+    各記憶ニューロンは平均 density * n_features 個の特徴から興奮性の入力を受ける。
+    """
+
+    def __init__(self, n_features: int, n_target: int, density: float = 0.05, gain: float = 1.0,
+                 seed: int = 0, dtype=np.float64):
+        """
+        Args:
+            n_features (int): 特徴ベクトルの次元 (VisualEncoder では 576)
+            n_target (int): 投影先のニューロン数 (通常は engine.n_mem)
+            density (float): 結合確率
+            gain (float): 重みのスケール (重みは U(0, gain))
+            seed (int): 乱数シード
+            dtype: 重みの dtype (エンジンの dtype に合わせる)
+        """
+        if not 0.0 < density <= 1.0:
+            raise ValueError(f"density must be in (0, 1], got {density}")
+        rng = np.random.default_rng(seed)
+        rows, cols = sparse_random_positions(n_target, n_features, density, rng)
+        weights = gain * rng.random(len(rows))
+        self.P = sp.csr_matrix((weights.astype(dtype), (rows, cols)), shape=(n_target, n_features))
+
+    @classmethod
+    def from_matrix(cls, P) -> "InterfaceProjection":
+        """既存の (n_target, n_features) 行列 (dense / sparse) から作る"""
+        projection = cls.__new__(cls)
+        projection.P = sp.csr_matrix(P)
+        return projection
+
+    @property
+    def n_features(self) -> int:
+        return self.P.shape[1]
+
+    @property
+    def n_target(self) -> int:
+        return self.P.shape[0]
+
+    def calibrate(self, features: np.ndarray, target_mean: float = 1.0, eps: float = 1e-12):
+        """
+        キャリブレーション用の特徴 (B, n_features) に対する各記憶ニューロンの平均入力電流が
+        target_mean になるよう、行ごとに重みをスケールする (結合構造は変えない)。
+
+        Args:
+            features (np.ndarray): キャリブレーション用の特徴ベクトル (B, n_features)
+            target_mean (float): 目標とする平均入力電流
+            eps (float): 入力を受けないニューロンの除算保護
+        Returns:
+            np.ndarray: 行ごとのスケール係数 (n_target,)
+        """
+        mean_current = np.asarray(self.project(features)).mean(axis=0)
+        scale = np.where(mean_current > eps, target_mean / np.maximum(mean_current, eps), 1.0)
+        # CSR の data は行順に並んでいるため、行ごとのスケールは data への repeat で適用できる
+        self.P.data *= np.repeat(scale, np.diff(self.P.indptr)).astype(self.P.dtype)
+        return scale
+
+    def project(self, features: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            features (np.ndarray): (n_features,) または (B, n_features)
+        Returns:
+            np.ndarray: (n_target,) または (B, n_target) の入力電流
+        """
+        features = np.asarray(features)
+        if features.shape[-1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got {features.shape[-1]}")
+        if features.ndim == 1:
+            return self.P @ features
+        return (self.P @ features.T).T
+
+    def inject(self, engine, features: np.ndarray, out: np.ndarray = None):
+        """
+        特徴ベクトルを engine.step に渡す入力電流に変換する。
+        out が None の場合は、入力のある記憶ニューロンのみの疎な入力 (indices, values) を返し、
+        (n_total,) の配列は確保しない。out を渡した場合は記憶野のスライスのみを書き込む
+        (感覚ニューロン側は呼び出し側の値のまま)。
+
+        Args:
+            engine (BiCortexEngine): 投影先のエンジン (n_mem == n_target)
+            features (np.ndarray): (n_features,)
+            out (np.ndarray): 再利用する出力バッファ (n_total,)
+        Returns:
+            tuple | np.ndarray: (indices, values) (out が None の場合) または out
+        """
+        if engine.n_mem != self.n_target:
+            raise ValueError(f"projection targets {self.n_target} neurons, engine has n_mem={engine.n_mem}")
+        projected = self.project(features)
+        if out is None:
+            nz = np.flatnonzero(projected)
+            return engine.idx_mem[nz], projected[nz]
+        out[engine.n_think:] = projected
+        return out
+
+    def to_current(self, engine):
+        """StreamingPipeline の to_current として使える変換関数を返す"""
+        def to_current(features: np.ndarray):
+            return self.inject(engine, features)
+        return to_current
+
+    @property
+    def nbytes(self) -> int:
+        return self.P.data.nbytes + self.P.indices.nbytes + self.P.indptr.nbytes
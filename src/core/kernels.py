@@ -0,0 +1,88 @@
+"""
+JIT-compiled step kernels (Numba)
+
+BiCortexEngine(backend="numba") で使用される融合カーネル。
+積分・順応・不応期・発火判定・トレース・SRGゲート・可塑性更新を1つのループにまとめ、
+NumPy呼び出しごとの一時配列生成とディスパッチのオーバーヘッドを除去する。
+Numbaが無い環境では HAS_NUMBA = False となり、エンジンは NumPy 実装へフォールバックする。
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def fused_step(W, mask_plastic, v, refractory_count, adaptation, x_fast, e_trace,
+               input_current, spikes, concept_start, concept_end,
+               alpha, v_base, decay_adapt, adaptation_step, refractory_steps,
+               decay_fast, decay_trace, activity_ma, ma_alpha, gate_threshold,
+               learning_rate, global_decay, w_max_clip):
+    """
+    BiCortexEngine.step() (dense, NumPy版) と同じ手順を1カーネルで実行する。
+    状態配列はすべてin-placeで更新され、spikes に発火 (0/1) が書き込まれる。
+
+    Returns:
+        (activity_ma, is_gating)
+    """
+    n = v.shape[0]
+
+    # 1-3. 積分 -> 順応 -> 不応期 -> 発火判定 (x_fast は更新前の値を使う)
+    for i in range(n):
+        syn = 0.0
+        for j in range(n):
+            syn += W[i, j] * x_fast[j]
+        vi = v[i] * alpha + input_current[i] + syn
+
+        adaptation[i] *= decay_adapt
+        v_thresh = v_base + adaptation[i]
+
+        if refractory_count[i] > 0:
+            vi = 0.0
+        refractory_count[i] = max(0.0, refractory_count[i] - 1.0)
+
+        if vi >= v_thresh:
+            spikes[i] = 1.0
+            vi = 0.0
+            refractory_count[i] = refractory_steps
+            if adaptation_step > 0:
+                adaptation[i] += adaptation_step
+        else:
+            spikes[i] = 0.0
+        v[i] = vi
+
+    # 4-5. トレース更新とSRGゲート判定
+    concept_activity = 0.0
+    for i in range(n):
+        x_fast[i] = x_fast[i] * decay_fast + spikes[i]
+        e_trace[i] = e_trace[i] * decay_trace + spikes[i]
+        if concept_start <= i < concept_end:
+            concept_activity += spikes[i]
+    activity_ma = activity_ma * (1 - ma_alpha) + concept_activity * ma_alpha
+    is_gating = activity_ma >= gate_threshold
+
+    # 6. 可塑性更新: 全体減衰とゲート付きヘブ則を可塑性要素1パスで適用
+    if global_decay > 0 or is_gating:
+        keep = 1.0 - global_decay
+        for i in range(n):
+            hebb = is_gating and spikes[i] > 0
+            if global_decay <= 0 and not hebb:
+                continue
+            for j in range(n):
+                if mask_plastic[i, j]:
+                    w = W[i, j]
+                    if global_decay > 0:
+                        w *= keep
+                    if hebb:
+                        w = min(max(w + learning_rate * e_trace[j], -w_max_clip), w_max_clip)
+                    W[i, j] = w
+
+    return activity_ma, is_gating
@@ -0,0 +1,273 @@
+"""
+Streaming Sensor-to-Spike Pipeline
+
+フレームソース (動画・画像ディレクトリ・ジェネレータ) -> バックグラウンドでのエンコード ->
+有界キュー (バックプレッシャー / フレーム破棄) -> 入力電流への変換 -> 実時間ペースでの engine.step
+を結ぶストリーミング実行系。CNN の推論時間が SNN のステップループを止めないよう、
+エンコードは別スレッドで行い、SNN 側は最新のフレームを steps_per_frame ステップ保持して使う。
+"""
+import collections
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+_END = object()
+
+
+class _TimingStats:
+    """
+    実行時間の統計 (長時間の実行でもメモリが増えないよう、平均・最大は累積値で、
+    p95 は直近 window 件のみで求める)
+    """
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def append(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"mean": 0.0, "p95": 0.0, "max": 0.0}
+        return {"mean": self.total / self.count, "p95": float(np.percentile(self.recent, 95)), "max": self.max}
+
+
+def image_directory_source(directory: str, extensions=(".png", ".jpg", ".jpeg", ".bmp")):
+    """ディレクトリ内の画像をファイル名順に PIL Image (RGB) として返すジェネレータ"""
+    from PIL import Image
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(extensions):
+            with Image.open(os.path.join(directory, name)) as img:
+                yield img.convert("RGB")
+
+
+def video_file_source(path: str):
+    """動画ファイルのフレームを PIL Image として返すジェネレータ (PyAV が必要)"""
+    try:
+        import av
+    except ImportError as e:
+        raise ImportError("video_file_source requires PyAV (pip install av)") from e
+    with av.open(path) as container:
+        for frame in container.decode(video=0):
+            yield frame.to_image()
+
+
+def sensory_current(engine, gain: float = 1.0):
+    """
+    特徴ベクトルの先頭 n_sensory 次元を感覚ニューロンへの入力電流とする変換関数を返す
+    (576次元をそのまま入力する場合は n_sensory=576 のエンジンを用いる)
+    """
+    def to_current(features: np.ndarray) -> np.ndarray:
+        current = np.zeros(engine.n_total)
+        n = min(len(features), engine.n_sensory)
+        current[engine.idx_sensory[:n]] = gain * np.asarray(features[:n])
+        return current
+    return to_current
+
+
+class StreamingPipeline:
+    """
+    フレームソースから BiCortexEngine までを実時間で駆動するパイプライン
+
+    - エンコードはバックグラウンドスレッドで実行し、結果を有界キューへ入れる。
+    - キューが満杯の場合の振る舞い (drop_policy):
+        "oldest": 最も古い未使用フレームを破棄して新しいフレームを入れる (既定、遅延最小)
+        "newest": 新しいフレームを破棄する
+        "block":  ソースの読み出しを止めて待つ (バックプレッシャー)
+    - SNN 側は1フレームを steps_per_frame ステップ保持する。次のフレームが間に合わない場合は
+      直前の入力電流を保持し続け、underrun として数える。
+    - realtime=True の場合、1ステップを engine.dt (ms) x time_scale の実時間に合わせて実行し、
+      締め切りを超過したステップを deadline miss として数える。
+    """
+
+    DROP_POLICIES = ("oldest", "newest", "block")
+
+    def __init__(self, engine, source, encoder, to_current=None, steps_per_frame: int = 10,
+                 queue_size: int = 4, drop_policy: str = "oldest", realtime: bool = True,
+                 time_scale: float = 1.0, callbacks=None, stats_window: int = 10000):
+        """
+        Args:
+            engine (BiCortexEngine): 駆動するエンジン
+            source (iterable): フレームの iterable (image_directory_source / video_file_source / ジェネレータ)
+            encoder: encode(frame) -> 特徴ベクトル を持つオブジェクト (VisualEncoder) または callable
+            to_current (callable): 特徴ベクトル -> (n_total,) の入力電流または疎な入力 (indices, values)
+                                   (InterfaceProjection.to_current など)。None で sensory_current(engine)。
+            steps_per_frame (int): 1フレームを保持する SNN ステップ数
+            queue_size (int): エンコード済みフレームのキューの長さ
+            drop_policy (str): キュー満杯時の振る舞い ("oldest" / "newest" / "block")
+            realtime (bool): 実時間ペースで実行するか (False の場合はフレームを待ちつつ可能な限り速く実行)
+            time_scale (float): 1ステップの実時間 = engine.dt [ms] x time_scale
+            callbacks (list[callable]): 毎ステップ callback(t, spikes, engine) を呼ぶ
+            stats_window (int): report() の p95 を求める直近のサンプル数 (平均・最大は全体)
+        """
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"unknown drop_policy: {drop_policy!r}")
+        self.engine = engine
+        self.source = source
+        self.encode = encoder.encode if hasattr(encoder, "encode") else encoder
+        self.to_current = to_current or sensory_current(engine)
+        self.steps_per_frame = steps_per_frame
+        self.drop_policy = drop_policy
+        self.realtime = realtime
+        self.step_seconds = engine.dt / 1000.0 * time_scale
+        self.callbacks = callbacks or []
+        self.stats_window = stats_window
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._worker = None
+        self._error = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames_captured = 0
+        self.frames_encoded = 0
+        self.frames_dropped = 0
+        self.frames_used = 0
+        self.steps = 0
+        self.underruns = 0
+        self.deadline_misses = 0
+        self._latencies = _TimingStats(self.stats_window)
+        self._encode_times = _TimingStats(self.stats_window)
+        self._step_times = _TimingStats(self.stats_window)
+
+    # --- Encoder thread ---
+    def _encode_loop(self):
+        try:
+            for frame in self.source:
+                if self._stop.is_set():
+                    break
+                t_capture = time.perf_counter()
+                self.frames_captured += 1
+                features = self.encode(frame)
+                self._encode_times.append(time.perf_counter() - t_capture)
+                self.frames_encoded += 1
+                self._enqueue((t_capture, features))
+        except Exception as e:  # エラーはメインスレッドで再送出する
+            self._error = e
+        finally:
+            self._enqueue(_END, force=True)
+
+    def _enqueue(self, item, force: bool = False):
+        if self.drop_policy == "block" or force:
+            # 終端マーカーはフレームを破棄せずに待つ (停止要求があれば諦める)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.drop_policy == "newest":
+                self.frames_dropped += 1
+                return
+            self._drop_oldest()
+            self._queue.put_nowait(item)
+
+    def _drop_oldest(self):
+        try:
+            self._queue.get_nowait()
+            self.frames_dropped += 1
+        except queue.Empty:
+            pass
+
+    # --- SNN driver ---
+    def run(self, max_steps: int = None) -> dict:
+        """
+        ソースが尽きる (または max_steps に達する) までエンジンを駆動する
+
+        Returns:
+            dict: report() と同じ統計
+        """
+        self._reset_stats()
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._encode_loop, daemon=True)
+        self._worker.start()
+
+        current = np.zeros(self.engine.n_total)
+        hold = 0
+        t_start = time.perf_counter()
+        try:
+            while max_steps is None or self.steps < max_steps:
+                if hold == 0:
+                    # 実時間モードでは最初のフレームのみ待ち、以降は間に合わなければ直前の入力を保持する。
+                    # 非実時間モードでは常に次のフレームを待つ (全フレームを steps_per_frame ずつ再生)。
+                    item = self._next_item(block=(not self.realtime or self.frames_used == 0))
+                    if item is _END:
+                        break
+                    if item is not None:
+                        t_capture, features = item
+                        current = self.to_current(features)
+                        self._latencies.append(time.perf_counter() - t_capture)
+                        self.frames_used += 1
+                        hold = self.steps_per_frame
+                    else:
+                        self.underruns += 1
+
+                t0 = time.perf_counter()
+                spikes = self.engine.step(current)
+                for callback in self.callbacks:
+                    callback(self.steps, spikes, self.engine)
+                self._step_times.append(time.perf_counter() - t0)
+                self.steps += 1
+                hold = max(0, hold - 1)
+
+                if self.realtime:
+                    deadline = t_start + self.steps * self.step_seconds
+                    remaining = deadline - time.perf_counter()
+                    if remaining < 0:
+                        self.deadline_misses += 1
+                    else:
+                        time.sleep(remaining)
+        finally:
+            self.stop()
+
+        if self._error is not None:
+            raise self._error
+        return self.report()
+
+    def _next_item(self, block: bool):
+        try:
+            return self._queue.get() if block else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        """エンコードスレッドを停止する"""
+        self._stop.set()
+        if self._worker is not None:
+            # キューを空けて、put 待ちのスレッドを解放する
+            while self._worker.is_alive():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._worker.join(timeout=0.05)
+            self._worker = None
+
+    def report(self) -> dict:
+        """スループット・遅延・締め切り超過の統計 (p95 は直近 stats_window 件)"""
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_encoded": self.frames_encoded,
+            "frames_dropped": self.frames_dropped,
+            "frames_used": self.frames_used,
+            "steps": self.steps,
+            "underruns": self.underruns,
+            "deadline_misses": self.deadline_misses,
+            "latency_s": self._latencies.summary(),
+            "encode_time_s": self._encode_times.summary(),
+            "step_time_s": self._step_times.summary(),
+        }
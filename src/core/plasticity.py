@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class PackedMask:
+    """
+    ビットパックされた2次元ブールマスク (可塑性マスク用)
+
+    (rows, cols) のマスクを rows x ceil(cols/8) バイトで保持し、dense な bool 配列の 1/8 のメモリで済む。
+    numpy 配列と同様の添字 (int, slice, 配列, np.ix_) による読み書きをサポートするため、
+    既存の配線コード (engine.mask_plastic[grid] = True など) はそのまま動作する。
+    書き込みのたびに version が増加し、エンジン側の可塑性インデックス再構築の判定に用いられる。
+    """
+
+    def __init__(self, shape):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.bits = np.zeros((self.shape[0], (self.shape[1] + 7) // 8), dtype=np.uint8)
+        self.version = 0
+
+    @classmethod
+    def from_dense(cls, dense: np.ndarray) -> "PackedMask":
+        mask = cls(dense.shape)
+        mask.bits = np.packbits(np.asarray(dense, dtype=bool), axis=1)
+        return mask
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def _unpack(self, rows) -> np.ndarray:
+        return np.unpackbits(self.bits[rows], axis=1, count=self.shape[1]).astype(bool)
+
+    def _localize(self, key):
+        """添字を「対象行のみを展開したブロック」に対する添字へ変換する"""
+        if not isinstance(key, tuple):
+            key = (key,)
+        idx = np.arange(self.shape[0])[key[0]]
+        rows = np.unique(idx)
+        if isinstance(key[0], slice):
+            # スライスは展開後のブロック上でもスライスのまま扱う (列側の配列添字と組み合わせるため)
+            local = slice(None) if (key[0].step or 1) > 0 else slice(None, None, -1)
+        else:
+            local = np.searchsorted(rows, idx)
+        return rows, (local,) + key[1:]
+
+    def __getitem__(self, key):
+        rows, local_key = self._localize(key)
+        return self._unpack(rows)[local_key]
+
+    def __setitem__(self, key, value):
+        rows, local_key = self._localize(key)
+        block = self._unpack(rows)
+        block[local_key] = value
+        self.bits[rows] = np.packbits(block, axis=1)
+        self.version += 1
+
+    def toarray(self) -> np.ndarray:
+        return self._unpack(slice(None))
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.toarray()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def copy(self) -> "PackedMask":
+        mask = PackedMask(self.shape)
+        mask.bits = self.bits.copy()
+        return mask
+
+    def nonzero(self, chunk_rows: int = 1024):
+        """
+        True 要素の (row, col) を int32 配列で返す。
+        全体を展開しないよう chunk_rows 行ずつ処理する。
+        """
+        rows, cols = [], []
+        for start in range(0, self.shape[0], chunk_rows):
+            r, c = np.nonzero(self._unpack(slice(start, start + chunk_rows)))
+            rows.append((r + start).astype(np.int32))
+            cols.append(c.astype(np.int32))
+        if not rows:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def sum(self) -> int:
+        return int(np.unpackbits(self.bits).sum())
+
+
+class PlasticSynapses:
+    """
+    可塑性シナプスの専用ストア: (post, pre, weight) の3つの連続配列
+
+    重みは結合行列 W から取り出して保持するため、減衰・ヘブ則更新はこの配列のみを走査する。
+    prune() で |weight| < epsilon まで減衰したシナプスを削除し、配列を詰め直す (compaction)。
+    potentiated は重みを持ったことがあるか (初期値が0でない、またはヘブ則で変化した) を示し、
+    重み0で作られてまだ学習していないシナプスは削除の対象にならない。
+    詰め直すたびに配列は新しく確保され、以前の配列への参照は無効になる。
+    要素は (post, pre) の行優先順に並ぶ。
+    """
+
+    def __init__(self, post: np.ndarray, pre: np.ndarray, weight: np.ndarray, potentiated: np.ndarray = None):
+        order = np.lexsort((pre, post))
+        self.post = np.ascontiguousarray(np.asarray(post)[order], dtype=np.int32)
+        self.pre = np.ascontiguousarray(np.asarray(pre)[order], dtype=np.int32)
+        self.weight = np.ascontiguousarray(np.asarray(weight)[order])
+        if potentiated is None:
+            potentiated = self.weight != 0
+        else:
+            potentiated = np.asarray(potentiated, dtype=bool)[order]
+        self.potentiated = np.ascontiguousarray(potentiated)
+        self.n_pruned = 0
+
+    def __len__(self) -> int:
+        return len(self.weight)
+
+    @property
+    def nbytes(self) -> int:
+        return self.post.nbytes + self.pre.nbytes + self.weight.nbytes + self.potentiated.nbytes
+
+    def current(self, x: np.ndarray, n: int) -> np.ndarray:
+        """可塑性シナプスによる入力 sum_pre weight * x[pre] (n,)"""
+        return np.bincount(self.post, weights=self.weight * x[self.pre], minlength=n)
+
+    def prune(self, epsilon: float):
+        """
+        |weight| < epsilon まで減衰したシナプス (potentiated のもの) を削除して配列を詰め直す
+
+        Returns:
+            tuple: 削除したシナプスの (post, pre)
+        """
+        keep = ~self.potentiated | (np.abs(self.weight) >= epsilon)
+        removed = (self.post[~keep], self.pre[~keep])
+        if len(removed[0]):
+            self.post = self.post[keep]
+            self.pre = self.pre[keep]
+            self.weight = self.weight[keep]
+            self.potentiated = self.potentiated[keep]
+            self.n_pruned += len(removed[0])
+        return removed
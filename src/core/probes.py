@@ -0,0 +1,325 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+class Probe:
+    """
+    記録プローブの基底クラス
+
+    BiCortexEngine.run() の開始時に allocate() で出力バッファを確保し、
+    every ステップごとに record() で1行ずつ書き込む。
+    """
+
+    def __init__(self, name: str, every: int = 1):
+        """
+        Args:
+            name (str): run() の戻り値 (dict) のキー
+            every (int): 記録間隔 (ステップ)。1なら毎ステップ記録。
+        """
+        self.name = name
+        self.every = max(1, int(every))
+        self.data = None
+
+    def n_records(self, total_steps: int) -> int:
+        return (total_steps + self.every - 1) // self.every
+
+    def allocate(self, engine, total_steps: int):
+        raise NotImplementedError
+
+    def observe(self, engine, spikes: np.ndarray, t: int):
+        """毎ステップ呼ばれる。既定では every ステップごとに record() する。"""
+        if t % self.every == 0:
+            self.record(engine, spikes, t // self.every)
+
+    def record(self, engine, spikes: np.ndarray, k: int):
+        raise NotImplementedError
+
+    def finish(self, engine):
+        """run() の終了時に呼ばれる (バッファの書き出し等)。既定では何もしない。"""
+
+    def next_sample(self, t: int):
+        """
+        t 以降で状態の記録が必要な最初のステップ。
+        run(fast_forward=True) は静止区間の早送りをこのステップまでで止め、observe() を呼ぶ。
+        """
+        return t + (-t) % self.every
+
+
+class SpikeProbe(Probe):
+    """
+    領域 (ニューロンID列) のスパイクを記録する。
+    every > 1 の場合は各区間の発火数を合計するため、スパイクの取りこぼしはない。
+    """
+
+    def __init__(self, name: str, indices, every: int = 1):
+        super().__init__(name, every)
+        self.indices = np.asarray(indices)
+
+    def allocate(self, engine, total_steps: int):
+        self.data = np.zeros((self.n_records(total_steps), len(self.indices)))
+
+    def observe(self, engine, spikes: np.ndarray, t: int):
+        self.data[t // self.every] += spikes[self.indices]
+
+    def next_sample(self, t: int):
+        # 静止区間の発火数は0 (バッファの初期値のまま) なので早送りを妨げない
+        return float("inf")
+
+
+class GrowableArray:
+    """
+    追記専用の1次元型付き配列 (容量を倍々に拡張し、追記は償却 O(1))
+    """
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._buf = np.empty(max(1, int(capacity)), dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        n = len(values)
+        if self.size + n > len(self._buf):
+            new_capacity = max(2 * len(self._buf), self.size + n)
+            buf = np.empty(new_capacity, dtype=self._buf.dtype)
+            buf[:self.size] = self._buf[:self.size]
+            self._buf = buf
+        self._buf[self.size:self.size + n] = values
+        self.size += n
+
+    def view(self) -> np.ndarray:
+        """記録済み部分のビュー (コピーしない)"""
+        return self._buf[:self.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class SpikeEvents:
+    """
+    アドレスイベント形式 (発火時刻, ニューロンID) のスパイク記録
+
+    ids は記録対象の indices 内での位置 (0 ~ n_neurons-1)。
+    dense なラスタ (時間 x ニューロン) は必要な時に to_raster() で生成する。
+    """
+
+    def __init__(self, times: np.ndarray, ids: np.ndarray, n_steps: int, n_neurons: int):
+        self.times = times
+        self.ids = ids
+        self.n_steps = n_steps
+        self.n_neurons = n_neurons
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def to_raster(self, bin_size: int = 1, t_start: int = 0, t_end: int = None) -> np.ndarray:
+        """
+        (n_bins, n_neurons) の発火数ラスタ。print_cli_heatmap や matplotlib (imshow) にそのまま渡せる。
+
+        Args:
+            bin_size (int): 1ビンのステップ数
+            t_start (int), t_end (int): 対象区間 [t_start, t_end)
+        """
+        t_end = self.n_steps if t_end is None else t_end
+        sel = (self.times >= t_start) & (self.times < t_end)
+        n_bins = (t_end - t_start + bin_size - 1) // bin_size
+        raster = np.zeros((n_bins, self.n_neurons))
+        np.add.at(raster, ((self.times[sel] - t_start) // bin_size, self.ids[sel]), 1.0)
+        return raster
+
+    def counts(self, bin_size: int = 1) -> np.ndarray:
+        """ビンごとの集団発火数 (n_bins,)"""
+        n_bins = (self.n_steps + bin_size - 1) // bin_size
+        return np.bincount(self.times // bin_size, minlength=n_bins).astype(float)
+
+    def to_sparse(self) -> sp.csr_matrix:
+        """(n_steps, n_neurons) の疎ラスタ"""
+        values = np.ones(len(self.times))
+        return sp.csr_matrix((values, (self.times, self.ids)), shape=(self.n_steps, self.n_neurons))
+
+
+class EventProbe(Probe):
+    """
+    領域のスパイクをアドレスイベント形式で記録する。
+    メモリは発火数に比例し、記録時間 x ニューロン数の dense なバッファを確保しない。
+    run() の戻り値は SpikeEvents。
+    """
+
+    def __init__(self, name: str, indices, capacity: int = 4096):
+        super().__init__(name)
+        self.indices = np.asarray(indices)
+        self.capacity = capacity
+        self._times = None
+        self._ids = None
+        self._n_steps = 0
+
+    def allocate(self, engine, total_steps: int = 0):
+        self._times = GrowableArray(np.int64, self.capacity)
+        self._ids = GrowableArray(np.int32, self.capacity)
+        self._n_steps = 0
+
+    def observe(self, engine, spikes: np.ndarray, t: int):
+        fired = np.flatnonzero(spikes[self.indices])
+        if len(fired):
+            self._times.extend(np.full(len(fired), t, dtype=np.int64))
+            self._ids.extend(fired)
+        self._n_steps = max(self._n_steps, t + 1)
+
+    def next_sample(self, t: int):
+        return float("inf")
+
+    @property
+    def data(self) -> SpikeEvents:
+        if self._times is None:
+            return None
+        return SpikeEvents(self._times.view(), self._ids.view(), self._n_steps, len(self.indices))
+
+    @data.setter
+    def data(self, value):
+        # Probe.__init__ の初期化 (data = None) のみを受け付ける
+        if value is not None:
+            raise AttributeError("EventProbe.data is read-only")
+
+
+class BlockGather:
+    """
+    結合ブロック W[post, pre] の値を1次元の重み格納配列から取り出すための位置を保持する。
+    dense では W.ravel() 上のフラットインデックス、CSR では W.data 上の位置を事前計算し、
+    毎回の np.ix_ による部分行列コピーを避ける。CSR の構造が変わった場合のみ再計算する。
+    """
+
+    def __init__(self, post, pre):
+        self.post = np.asarray(post)
+        self.pre = np.asarray(pre)
+        self._key = None
+        self._positions = None
+        self._present = None
+        self._store_key = None
+        self._store_positions = None
+        self._store_present = None
+        self.size = len(self.post) * len(self.pre)
+
+    def values(self, engine) -> np.ndarray:
+        values = self._matrix_values(engine.W, engine.n_total)
+        store = getattr(engine, "plastic_synapses", None)
+        if store is not None:
+            # plastic_store: 可塑性シナプスの重みは W ではなくストアにある
+            if self._store_key is not store.post:
+                self._locate_store(store, engine.n_total)
+            values[self._store_present] = store.weight[self._store_positions]
+        return values
+
+    def _matrix_values(self, W, n_total: int) -> np.ndarray:
+        if not sp.issparse(W):
+            if self._positions is None:
+                self._positions = (self.post[:, None] * n_total + self.pre[None, :]).ravel()
+            return W.reshape(-1)[self._positions]
+
+        if not sp.isspmatrix_csr(W):
+            # 配線中 (LIL) は構造が確定していないため直接取り出す
+            return W[np.ix_(self.post, self.pre)].toarray().ravel()
+        if self._key is not W.indices:
+            self._locate(W)
+        # 構造上存在しない要素は 0
+        values = np.zeros(self.size, dtype=W.dtype)
+        values[self._present] = W.data[self._positions]
+        return values
+
+    def _locate_store(self, store, n_total: int):
+        # ストアは (post, pre) の行優先順に並んでいるため、キーをそのまま二分探索できる
+        self._store_key = store.post
+        keys = store.post.astype(np.int64) * n_total + store.pre
+        wanted = (self.post[:, None].astype(np.int64) * n_total + self.pre[None, :]).ravel()
+        pos = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+        if len(keys) == 0:
+            self._store_present = np.zeros(len(wanted), dtype=bool)
+        else:
+            self._store_present = keys[pos] == wanted
+        self._store_positions = pos[self._store_present]
+
+    def _locate(self, W):
+        # W.data の並び (エンジンの可塑性 slot が参照) は変更せず、キーの argsort で探索する
+        self._key = W.indices
+        rows = np.repeat(np.arange(W.shape[0], dtype=np.int64), np.diff(W.indptr))
+        entry_keys = rows * W.shape[1] + W.indices
+        order = np.argsort(entry_keys, kind="stable")
+        sorted_keys = entry_keys[order]
+        wanted = (self.post[:, None].astype(np.int64) * W.shape[1] + self.pre[None, :]).ravel()
+        pos = np.minimum(np.searchsorted(sorted_keys, wanted), max(len(sorted_keys) - 1, 0))
+        if len(sorted_keys) == 0:
+            self._present = np.zeros(len(wanted), dtype=bool)
+        else:
+            self._present = sorted_keys[pos] == wanted
+        self._positions = order[pos[self._present]]
+
+
+class WeightProbe(Probe):
+    """
+    結合ブロック W[post, pre] の平均重みを記録する。
+    フラットインデックスを事前計算し、毎回の np.ix_ による部分行列コピーを避ける。
+    """
+
+    def __init__(self, name: str, post, pre, every: int = 1):
+        super().__init__(name, every)
+        self.post = np.asarray(post)
+        self.pre = np.asarray(pre)
+        self._gather = BlockGather(self.post, self.pre)
+
+    def allocate(self, engine, total_steps: int):
+        self.data = np.zeros(self.n_records(total_steps))
+
+    def record(self, engine, spikes: np.ndarray, k: int):
+        self.data[k] = self._gather.values(engine).mean()
+
+
+class WeightMonitor(Probe):
+    """
+    結合ブロック W[post, pre] の統計量 (mean / std / min / max / abs_mean) を every ステップごとに記録する。
+    ブロックの重み全体は保存せず、記録時に1回の gather と縮約のみを行う。
+    run() の戻り値は 統計量名 -> (n_records,) の dict。
+    """
+
+    STATS = ("mean", "std", "min", "max", "abs_mean")
+
+    def __init__(self, name: str, post, pre, every: int = 10, stats=("mean", "min", "max")):
+        super().__init__(name, every)
+        unknown = set(stats) - set(self.STATS)
+        if unknown:
+            raise ValueError(f"unknown stats: {sorted(unknown)}")
+        self.stats = tuple(stats)
+        self._gather = BlockGather(post, pre)
+
+    def allocate(self, engine, total_steps: int):
+        n = self.n_records(total_steps)
+        self.data = {stat: np.zeros(n) for stat in self.stats}
+        self.data["t"] = np.arange(n) * self.every
+
+    def record(self, engine, spikes: np.ndarray, k: int):
+        values = self._gather.values(engine)
+        for stat in self.stats:
+            if stat == "abs_mean":
+                self.data[stat][k] = np.abs(values).mean()
+            else:
+                self.data[stat][k] = getattr(values, stat)()
+
+
+class StateProbe(Probe):
+    """
+    エンジンの状態変数 (is_gating, activity_ma, v など) を記録する。
+    配列変数の場合は indices で記録対象を絞り込める。
+    """
+
+    def __init__(self, name: str, attr: str, indices=None, every: int = 1):
+        super().__init__(name, every)
+        self.attr = attr
+        self.indices = None if indices is None else np.asarray(indices)
+
+    def allocate(self, engine, total_steps: int):
+        value = np.asarray(getattr(engine, self.attr), dtype=float)
+        if self.indices is not None:
+            value = value[self.indices]
+        self.data = np.zeros((self.n_records(total_steps),) + value.shape)
+
+    def record(self, engine, spikes: np.ndarray, k: int):
+        value = getattr(engine, self.attr)
+        if self.indices is not None:
+            value = value[self.indices]
+        self.data[k] = value
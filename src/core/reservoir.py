@@ -0,0 +1,89 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+
+def sparse_random_positions(n_rows: int, n_cols: int, density: float, rng: np.random.Generator):
+    """
+    (n_rows, n_cols) の各要素を確率 density で独立に選んだときの位置 (rows, cols) を生成する。
+    行ごとに個数を二項分布で決め、列は復元抽出してから重複のみを引き直すため、
+    n_rows * n_cols の添字配列は作らず、メモリ・時間ともに O(nnz) (density <= 0.5 の行)。
+
+    Returns:
+        tuple: 行優先順に並んだ (rows, cols) (int64)
+    """
+    counts = rng.binomial(n_cols, density, size=n_rows)
+    rows = np.repeat(np.arange(n_rows, dtype=np.int64), counts)
+    cols = np.empty(len(rows), dtype=np.int64)
+
+    # 半分以上を選ぶ行は重複の引き直しが収束しにくいため、行ごとに非復元抽出する
+    full = np.flatnonzero(2 * counts > n_cols)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    for r in full:
+        cols[offsets[r]:offsets[r + 1]] = rng.choice(n_cols, size=counts[r], replace=False)
+    sparse_rows = np.repeat(2 * counts <= n_cols, counts)
+    cols[sparse_rows] = rng.integers(0, n_cols, size=int(sparse_rows.sum()))
+
+    keys = np.sort(rows * n_cols + cols)
+    while True:
+        dup = keys[1:] == keys[:-1]
+        if not np.any(dup):
+            return np.divmod(keys, n_cols)
+        # 重複分を同じ行の中で引き直す (整列済みの列への追加なので stable ソートはほぼ線形)
+        redraw = keys[1:][dup] // n_cols * n_cols + rng.integers(0, n_cols, size=int(dup.sum()))
+        keys = np.sort(np.concatenate([keys[np.concatenate([[True], ~dup])], redraw]), kind="stable")
+
+
+def random_dale_reservoir(n: int, exc_mask: np.ndarray, density: float, rng: np.random.Generator,
+                          dtype=np.float64) -> sp.csr_matrix:
+    """
+    Dale's Law に従うスパースなランダム結合 (n x n) を CSR 形式で直接生成する。
+    dense な n x n の乱数行列や添字配列を経由しないため、メモリ・時間ともに O(nnz)
+    (位置の生成は sparse_random_positions)。
+
+    Args:
+        n (int): ニューロン数
+        exc_mask (np.ndarray): 興奮性ニューロンのマスク (長さ n)。列 (pre) 単位で符号を決める。
+        density (float): 結合確率
+        rng (np.random.Generator): 乱数生成器
+    Returns:
+        sp.csr_matrix: 興奮性 pre からは正、抑制性 pre からは負の重み (絶対値は U(0, 1))
+    """
+    rows, cols = sparse_random_positions(n, n, density, rng)
+    weights = rng.random(len(rows))
+    weights[~exc_mask[cols]] *= -1.0
+    return sp.csr_matrix((weights.astype(dtype), (rows, cols)), shape=(n, n))
+
+
+def estimate_spectral_radius(W, tol: float = 1e-3, rng: np.random.Generator = None,
+                             maxiter: int = None) -> float:
+    """
+    スペクトル半径 (最大固有値の絶対値) を ARPACK の反復法で推定する。
+    O(n^3) の固有値分解を避けるため、大規模なリザーバ初期化に用いる。
+
+    Args:
+        W: 正方行列 (ndarray または scipy.sparse)
+        tol (float): 固有値の相対精度 (0 で機械精度)
+        rng (np.random.Generator): 初期ベクトル生成用 (再現性のため)。None の場合は ARPACK 既定。
+        maxiter (int): 最大反復回数
+    Returns:
+        float: スペクトル半径の推定値
+    """
+    n = W.shape[0]
+    if n < 3:
+        # ARPACK は k < n - 1 を要求するため、極小行列は直接計算する
+        dense = W.toarray() if sp.issparse(W) else np.asarray(W)
+        return float(np.max(np.abs(np.linalg.eigvals(dense)))) if n > 0 else 0.0
+
+    if sp.issparse(W) and W.nnz == 0:
+        return 0.0
+
+    v0 = None if rng is None else rng.random(n)
+    try:
+        eig = spla.eigs(W, k=1, which="LM", tol=tol, v0=v0, maxiter=maxiter,
+                        return_eigenvectors=False)
+    except spla.ArpackNoConvergence as e:
+        if len(e.eigenvalues) == 0:
+            raise
+        eig = e.eigenvalues
+    return float(np.max(np.abs(eig)))
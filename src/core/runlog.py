@@ -0,0 +1,249 @@
+"""
+Chunked Run Logger
+
+長時間 (数百万ステップ) のオンライン学習ログを、固定長のチャンクごとに非圧縮の .npy として
+ディスクへ書き出す。メモリ上に保持するのは書き込み中の1チャンク分のみ。
+読み出し (RunLog) はチャンクを np.load(mmap_mode="r") でメモリマップし、
+時間範囲を指定して必要な部分だけを参照する。
+
+ディレクトリ構成:
+    <path>/meta.json                          構成と書き込み済みチャンクの一覧 (t_start, t_end)
+    <path>/chunk_00000/state_<attr>.npy       状態変数 (is_gating, activity_ma, ...) (n_steps,)
+    <path>/chunk_00000/spikes_<region>_t.npy  スパイクのアドレスイベント: 時刻 (絶対ステップ, int64)
+    <path>/chunk_00000/spikes_<region>_id.npy                         : 領域内のニューロンID (int32)
+    <path>/chunk_00000/weight_<name>.npy      監視ブロックの平均重み (weight_every ステップごと)
+"""
+import json
+import os
+
+import numpy as np
+
+from .probes import GrowableArray, Probe, SpikeEvents, BlockGather
+
+FORMAT_VERSION = 1
+
+
+class RunLogger(Probe):
+    """
+    スパイク・ゲート状態・activity_ma・監視重みをチャンク単位でディスクへ書き出すプローブ
+
+    engine.run(probes=[logger]) で使うほか、step() ループから logger.observe(engine, spikes) を
+    直接呼んでもよい (その場合は最後に close() を呼ぶ)。
+    時刻はロガー自身のステップカウンタで数えるため、run() を複数回呼んでも連続した時刻で記録される。
+    run() の終了時には書き込み中のチャンクを (短いチャンクとして) 書き出し、
+    以降の記録は新しいチャンクに続ける。
+    """
+
+    def __init__(self, directory: str, regions: dict = None, weights: dict = None,
+                 states=("is_gating", "activity_ma"), chunk_steps: int = 100_000,
+                 weight_every: int = 100, name: str = "runlog"):
+        """
+        Args:
+            directory (str): 出力先ディレクトリ (既存のログがあれば続きから追記する)
+            regions (dict): 領域名 -> ニューロンID列。スパイクをアドレスイベント形式で記録する。
+            weights (dict): 監視名 -> (post, pre)。ブロックの平均重みを記録する。
+            states (tuple): 毎ステップ記録するスカラー状態変数
+            chunk_steps (int): 1チャンクのステップ数
+            weight_every (int): 重みの記録間隔 (ステップ)
+            name (str): run() の戻り値のキー
+        """
+        super().__init__(name)
+        self.directory = directory
+        self.regions = {k: np.asarray(v) for k, v in (regions or {}).items()}
+        self.weights = {k: BlockGather(post, pre) for k, (post, pre) in (weights or {}).items()}
+        self.states = tuple(states)
+        self.chunk_steps = int(chunk_steps)
+        self.weight_every = max(1, int(weight_every))
+        self._meta = None
+
+    # --- 書き込み ---
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self._meta = json.load(f)
+            if (set(self._meta["regions"]) != set(self.regions) or set(self._meta["weights"]) != set(self.weights)
+                    or tuple(self._meta["states"]) != self.states):
+                raise ValueError(f"{self.directory} contains a log with a different layout")
+            if self._meta["weight_every"] != self.weight_every:
+                # 重みの時間軸は weight_every から復元するため、異なる間隔で追記すると壊れる
+                raise ValueError(f"{self.directory} was logged with weight_every={self._meta['weight_every']}, "
+                                 f"got {self.weight_every}")
+        else:
+            self._meta = {
+                "format_version": FORMAT_VERSION,
+                "regions": {k: int(len(v)) for k, v in self.regions.items()},
+                "weights": list(self.weights),
+                "states": list(self.states),
+                "weight_every": self.weight_every,
+                "chunks": [],
+            }
+        self._t = self._meta["chunks"][-1]["t_end"] if self._meta["chunks"] else 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._chunk_start = self._t
+        self._state_buf = {k: np.zeros(self.chunk_steps) for k in self.states}
+        self._events = {k: (GrowableArray(np.int64), GrowableArray(np.int32)) for k in self.regions}
+        self._weight_buf = {k: GrowableArray(np.float64) for k in self.weights}
+
+    def allocate(self, engine, total_steps: int = 0):
+        if self._meta is None:
+            self._open()
+
+    def observe(self, engine, spikes: np.ndarray, t: int = None):
+        if self._meta is None:
+            self._open()
+        t = self._t
+        i = t - self._chunk_start
+        for k in self.states:
+            self._state_buf[k][i] = getattr(engine, k)
+        for k, indices in self.regions.items():
+            fired = np.flatnonzero(spikes[indices])
+            if len(fired):
+                times, ids = self._events[k]
+                times.extend(np.full(len(fired), t, dtype=np.int64))
+                ids.extend(fired)
+        if t % self.weight_every == 0:
+            for k, gather in self.weights.items():
+                self._weight_buf[k].extend([gather.values(engine).mean()])
+
+        self._t += 1
+        if self._t - self._chunk_start == self.chunk_steps:
+            self.flush()
+
+    def flush(self):
+        """書き込み中のチャンクを書き出す (空なら何もしない)"""
+        n = self._t - self._chunk_start
+        if self._meta is None or n == 0:
+            return
+        index = len(self._meta["chunks"])
+        chunk_dir = os.path.join(self.directory, f"chunk_{index:05d}")
+        os.makedirs(chunk_dir, exist_ok=True)
+        for k, buf in self._state_buf.items():
+            np.save(os.path.join(chunk_dir, f"state_{k}.npy"), buf[:n])
+        for k, (times, ids) in self._events.items():
+            np.save(os.path.join(chunk_dir, f"spikes_{k}_t.npy"), times.view())
+            np.save(os.path.join(chunk_dir, f"spikes_{k}_id.npy"), ids.view())
+        for k, buf in self._weight_buf.items():
+            np.save(os.path.join(chunk_dir, f"weight_{k}.npy"), buf.view())
+
+        self._meta["chunks"].append({"index": index, "t_start": self._chunk_start, "t_end": self._t})
+        # meta.json は全ファイルの書き込み後に置き換える (途中で落ちても読めるのは完了済みチャンクのみ)
+        tmp_path = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, "meta.json"))
+        self._reset_buffers()
+
+    def finish(self, engine):
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+    @property
+    def data(self):
+        """書き出し済みのログ (RunLog)"""
+        if self._meta is None or not self._meta["chunks"]:
+            return None
+        return RunLog(self.directory)
+
+    @data.setter
+    def data(self, value):
+        # Probe.__init__ の初期化 (data = None) のみを受け付ける
+        if value is not None:
+            raise AttributeError("RunLogger.data is read-only")
+
+
+class RunLog:
+    """
+    RunLogger の出力を時間範囲を指定して読み出す
+
+    各チャンクは初回アクセス時にメモリマップされ、指定範囲に重なるチャンクのみが参照される。
+    """
+
+    def __init__(self, directory: str, mmap_mode: str = "r"):
+        self.directory = directory
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.chunks = self.meta["chunks"]
+        self._starts = np.array([c["t_start"] for c in self.chunks], dtype=np.int64)
+        self._ends = np.array([c["t_end"] for c in self.chunks], dtype=np.int64)
+        self._cache = {}
+
+    @property
+    def n_steps(self) -> int:
+        return int(self._ends[-1]) if len(self._ends) else 0
+
+    def _load(self, index: int, filename: str) -> np.ndarray:
+        key = (index, filename)
+        if key not in self._cache:
+            path = os.path.join(self.directory, f"chunk_{index:05d}", filename)
+            self._cache[key] = np.load(path, mmap_mode=self.mmap_mode)
+        return self._cache[key]
+
+    def _range(self, t_start, t_end):
+        t_end = self.n_steps if t_end is None else min(t_end, self.n_steps)
+        t_start = max(0, t_start)
+        # [t_start, t_end) に重なるチャンク
+        first = int(np.searchsorted(self._ends, t_start, side="right"))
+        last = int(np.searchsorted(self._starts, t_end, side="left"))
+        return t_start, t_end, range(first, last)
+
+    def state(self, name: str, t_start: int = 0, t_end: int = None) -> np.ndarray:
+        """状態変数の時系列 [t_start, t_end)"""
+        t_start, t_end, chunks = self._range(t_start, t_end)
+        parts = []
+        for i in chunks:
+            lo, hi = self._starts[i], self._ends[i]
+            data = self._load(i, f"state_{name}.npy")
+            parts.append(data[max(t_start, lo) - lo:min(t_end, hi) - lo])
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+    def spikes(self, region: str, t_start: int = 0, t_end: int = None) -> SpikeEvents:
+        """
+        領域のスパイクイベント [t_start, t_end)。
+        返り値の times は t_start を 0 とする相対時刻 (to_raster() は区間のラスタを返す)。
+        """
+        t_start, t_end, chunks = self._range(t_start, t_end)
+        times, ids = [], []
+        for i in chunks:
+            t = self._load(i, f"spikes_{region}_t.npy")
+            lo, hi = np.searchsorted(t, [t_start, t_end])
+            times.append(np.asarray(t[lo:hi]) - t_start)
+            ids.append(np.asarray(self._load(i, f"spikes_{region}_id.npy")[lo:hi]))
+        times = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+        ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32)
+        return SpikeEvents(times, ids, max(0, t_end - t_start), self.meta["regions"][region])
+
+    def weights(self, name: str, t_start: int = 0, t_end: int = None):
+        """
+        監視重みの記録 [t_start, t_end)
+
+        Returns:
+            tuple: (記録時刻, 平均重み)
+        """
+        every = self.meta["weight_every"]
+        t_start, t_end, chunks = self._range(t_start, t_end)
+        times, values = [], []
+        for i in chunks:
+            lo = self._starts[i]
+            data = np.asarray(self._load(i, f"weight_{name}.npy"))
+            # チャンク内で記録された時刻 (lo 以上の every の倍数)
+            t = (lo + (-lo) % every) + every * np.arange(len(data))
+            sel = (t >= t_start) & (t < t_end)
+            times.append(t[sel])
+            values.append(data[sel])
+        if not times:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(times), np.concatenate(values)
+
+    def states_frame(self, t_start: int = 0, t_end: int = None):
+        """状態変数を pandas.DataFrame (index: 時刻) として返す"""
+        import pandas as pd
+        t_start, t_end, _ = self._range(t_start, t_end)
+        columns = {name: self.state(name, t_start, t_end) for name in self.meta["states"]}
+        return pd.DataFrame(columns, index=pd.RangeIndex(t_start, t_end, name="t"))
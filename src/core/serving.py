@@ -0,0 +1,440 @@
+"""
+Multi-Tenant Serving
+
+1つのプロセスで多数の独立した学習者 (ユーザー・デバイスのストリームごとに1テナント) を実行する。
+
+テナント間で異なるのは可塑性シナプス (記憶野 MC->MC 等) の重みと状態変数のみであり、
+思考野・Interface の固定結合は設計上すべてのテナントで同じである。そこで:
+
+- 固定結合は読み取り専用の CSR 1つを全テナントで共有する。
+- 可塑性シナプスの構造 (post, pre) も共有し、テナントごとには重み (n_plastic,) のみを持つ。
+- 状態変数 (v, 不応期, 順応, x_fast, e_trace) と SRG 状態はテナントごとに持つ。
+
+テナントあたりのメモリは n_total^2 (BiCortexEngine の W) から n_plastic + 5 * n_total 程度に減る。
+状態・重みは BiCortexEnsemble と同様に (テナント数, ...) の配列にまとめて保持し、
+step_batch() は指定されたテナントの行だけを集めて1回の行列積で進める。
+
+TenantServer は asyncio のフロントエンドで、並行するテナントの step 要求をまとめて step_batch() で処理する。
+"""
+import asyncio
+import collections
+
+import numpy as np
+import scipy.sparse as sp
+
+from .sharded import _PARAM_KEYS, _STATE_KEYS, _plastic_csr
+
+
+class TenantPool:
+    """
+    固定結合を共有する多テナントのエンジン群
+
+    テンプレートのエンジン (配線済みの BiCortexEngine) から固定結合・可塑性シナプスの構造・
+    ハイパーパラメータを取り出して共有する。新しいテナントはテンプレートの可塑性重みと状態から開始する。
+    積分は CSR の行列積で行うため、sparse=True のエンジンとは和の順序による丸め誤差の範囲で一致する。
+    event_driven / backend="numba" / plastic_store のエンジンはテンプレートにできない。
+    """
+
+    def __init__(self, engine, capacity: int = 16):
+        """
+        Args:
+            engine (BiCortexEngine): テンプレート。構築後にエンジンを変更してもプールには反映されない。
+            capacity (int): 最初に確保するテナント数 (超えた場合は倍に拡張する)
+        """
+        if engine.event_driven or engine.backend == "numba" or engine.plastic_store:
+            raise ValueError("TenantPool does not support event_driven, numba or plastic_store engines")
+        self.n_sensory = engine.n_sensory
+        self.n_concept = engine.n_concept
+        self.n_motor = engine.n_motor
+        self.n_mem = engine.n_mem
+        self.n_total = engine.n_total
+        self.dt = engine.dt
+        self.dtype = engine.dtype
+        self.idx_sensory = engine.idx_sensory
+        self.idx_concept = engine.idx_concept
+        self.idx_motor = engine.idx_motor
+        self.idx_mem = engine.idx_mem
+        for name in _PARAM_KEYS:
+            setattr(self, name, getattr(engine, name))
+
+        # --- 共有: 固定結合 (読み取り専用) と可塑性シナプスの構造 ---
+        n = self.n_total
+        W, slots = _plastic_csr(engine)
+        entry_rows = np.repeat(np.arange(n), np.diff(W.indptr))
+        self.plastic_post = entry_rows[slots].astype(np.int32)
+        self.plastic_pre = W.indices[slots].astype(np.int32)
+        self._initial_weights = W.data[slots].copy()
+        W.data[slots] = 0.0
+        W.eliminate_zeros()
+        self.W_fixed = W
+        for array in (W.data, W.indices, W.indptr, self.plastic_post, self.plastic_pre, self._initial_weights):
+            array.flags.writeable = False
+        # 可塑性シナプス k の寄与を post へ集約する (n_total, n_plastic) の行列
+        n_plastic = len(slots)
+        self._scatter = sp.csr_matrix((np.ones(n_plastic, dtype=self.dtype),
+                                       (self.plastic_post, np.arange(n_plastic))), shape=(n, n_plastic))
+        self._initial_state = {k: np.array(getattr(engine, k), dtype=self.dtype) for k in _STATE_KEYS}
+        self._initial_srg = (float(engine.activity_ma), bool(engine.is_gating))
+
+        # --- テナントごと: (capacity, ...) の配列の先頭 len(self) 行を使う ---
+        self._ids = []
+        self._rows = {}
+        for name in _STATE_KEYS:
+            setattr(self, name, np.zeros((capacity, n), dtype=self.dtype))
+        self.weights = np.zeros((capacity, n_plastic), dtype=self.dtype)
+        self.activity_ma = np.zeros(capacity)
+        self.is_gating = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, tenant_id) -> bool:
+        return tenant_id in self._rows
+
+    @property
+    def tenants(self) -> list:
+        return list(self._ids)
+
+    @property
+    def n_plastic(self) -> int:
+        return len(self.plastic_post)
+
+    @property
+    def shared_nbytes(self) -> int:
+        """全テナントで共有する配列のバイト数"""
+        W = self.W_fixed
+        return (W.data.nbytes + W.indices.nbytes + W.indptr.nbytes + self.plastic_post.nbytes
+                + self.plastic_pre.nbytes + self._scatter.data.nbytes + self._scatter.indices.nbytes
+                + self._scatter.indptr.nbytes)
+
+    @property
+    def tenant_nbytes(self) -> int:
+        """1テナントあたりのバイト数 (状態変数・可塑性重み・SRG状態)"""
+        per_row = sum(getattr(self, k).itemsize * self.n_total for k in _STATE_KEYS)
+        return per_row + self.weights.itemsize * self.n_plastic + self.activity_ma.itemsize + 1
+
+    def _reserve(self, n_rows: int):
+        capacity = len(self.weights)
+        if n_rows <= capacity:
+            return
+        capacity = max(n_rows, 2 * capacity)
+        for name in _STATE_KEYS + ("weights", "activity_ma", "is_gating"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add_tenant(self, tenant_id):
+        """
+        テナントを追加する (テンプレートの可塑性重みと状態から開始)
+
+        Args:
+            tenant_id (hashable): テナントの識別子
+        """
+        if tenant_id in self._rows:
+            raise ValueError(f"tenant already exists: {tenant_id!r}")
+        row = len(self._ids)
+        self._reserve(row + 1)
+        for name, value in self._initial_state.items():
+            getattr(self, name)[row] = value
+        self.weights[row] = self._initial_weights
+        self.activity_ma[row], self.is_gating[row] = self._initial_srg
+        self._rows[tenant_id] = row
+        self._ids.append(tenant_id)
+
+    def remove_tenant(self, tenant_id):
+        """テナントを削除する (最後の行を空いた行へ移して詰める)"""
+        row = self._rows.pop(tenant_id)
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            for name in _STATE_KEYS + ("weights", "activity_ma", "is_gating"):
+                array = getattr(self, name)
+                array[row] = array[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+
+    def rows(self, tenant_ids) -> np.ndarray:
+        """テナントID列 -> 状態配列の行番号"""
+        try:
+            return np.array([self._rows[t] for t in tenant_ids], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"unknown tenant: {e.args[0]!r}") from None
+
+    def plastic_weights(self, tenant_id) -> np.ndarray:
+        """テナントの可塑性重み (plastic_post, plastic_pre の順) のコピー"""
+        return self.weights[self._rows[tenant_id]].copy()
+
+    def check_input(self, input_current):
+        """
+        1テナント分の入力を検証する (不正な場合は ValueError)
+
+        Args:
+            input_current: (n_total,) の ndarray、疎な入力 (indices, values)、または None (入力なし)
+        """
+        if input_current is None:
+            return
+        if isinstance(input_current, tuple):
+            if len(input_current) != 2:
+                raise ValueError("sparse input must be an (indices, values) pair")
+            indices, values = np.asarray(input_current[0]), np.asarray(input_current[1])
+            if indices.ndim != 1 or (len(indices) and not np.issubdtype(indices.dtype, np.integer)):
+                raise ValueError("sparse input indices must be a 1-D integer array")
+            if len(indices) and (indices.min() < 0 or indices.max() >= self.n_total):
+                raise ValueError(f"sparse input indices must be in [0, {self.n_total})")
+            if values.ndim > 1 or (values.ndim == 1 and values.shape != indices.shape):
+                raise ValueError("sparse input values must be a scalar or match the indices")
+        elif np.shape(input_current) != (self.n_total,):
+            raise ValueError(f"input shape {np.shape(input_current)} does not match ({self.n_total},)")
+
+    def _batch_input(self, inputs, n_batch: int) -> np.ndarray:
+        current = np.zeros((n_batch, self.n_total), dtype=self.dtype)
+        if isinstance(inputs, np.ndarray) and inputs.ndim == 2:
+            current[:] = inputs
+            return current
+        if len(inputs) != n_batch:
+            raise ValueError("number of inputs does not match the number of tenants")
+        for b, item in enumerate(inputs):
+            if item is None:
+                continue
+            if isinstance(item, tuple):
+                indices, values = item
+                current[b, indices] = values
+            else:
+                current[b] = item
+        return current
+
+    def step_batch(self, tenant_ids, inputs=None) -> np.ndarray:
+        """
+        指定したテナントをそれぞれ1タイムステップ進める (BiCortexEngine.step と同じ手順)
+
+        Args:
+            tenant_ids (list): テナントID (重複不可)
+            inputs: (B, n_total) の ndarray、またはテナントごとの入力のリスト
+                    (各要素は (n_total,) の ndarray・疎な入力 (indices, values)・None (入力なし))。
+                    None の場合は全テナント入力なし。
+        Returns:
+            np.ndarray: (B, n_total) のスパイク
+        """
+        r = self.rows(tenant_ids)
+        if len(np.unique(r)) != len(r):
+            raise ValueError("each tenant can be stepped only once per batch")
+        current = self._batch_input([None] * len(r) if inputs is None else inputs, len(r))
+        pre, post = self.plastic_pre, self.plastic_post
+        x_fast = self.x_fast[r]
+        weights = self.weights[r]
+
+        # 1. 膜電位の更新 (LIF): 共有の固定結合 + テナントごとの可塑性結合
+        synaptic_input = (self.W_fixed @ x_fast.T + self._scatter @ (weights * x_fast[:, pre]).T).T
+        v = self.v[r]
+        v *= self.alpha
+        v += current
+        v += synaptic_input
+
+        # 2. 順応の減衰と閾値決定
+        adaptation = self.adaptation[r] * self.decay_adapt
+        v_thresh = self.v_base + adaptation
+        refractory_count = self.refractory_count[r]
+        v[refractory_count > 0] = 0.0
+        refractory_count = np.maximum(0, refractory_count - 1)
+
+        # 3. 発火判定
+        spikes = (v >= v_thresh).astype(self.dtype)
+        fired = spikes > 0
+        v[fired] = 0.0
+        refractory_count[fired] = self.refractory_steps
+        if self.adaptation_step > 0:
+            adaptation[fired] += self.adaptation_step
+
+        # 4. トレース変数の更新
+        x_fast = x_fast * self.decay_fast + spikes
+        e_trace = self.e_trace[r] * self.decay_trace + spikes
+
+        # 5. SRGゲート判定
+        concept_activity = np.sum(spikes[:, self.idx_concept], axis=1)
+        activity_ma = self.activity_ma[r] * (1 - self.ma_alpha) + concept_activity * self.ma_alpha
+        is_gating = activity_ma >= self.gate_threshold
+
+        # 6. 可塑性更新: 全体減衰と、ゲートが開いたテナントで発火した post を持つシナプスのヘブ則更新
+        if self.global_decay > 0:
+            weights *= (1.0 - self.global_decay)
+        b, k = np.nonzero(fired[:, post] & is_gating[:, None])
+        if len(b):
+            weights[b, k] = np.clip(weights[b, k] + self.learning_rate * e_trace[b, pre[k]],
+                                    -self.w_max_clip, self.w_max_clip)
+
+        self.v[r] = v
+        self.refractory_count[r] = refractory_count
+        self.adaptation[r] = adaptation
+        self.x_fast[r] = x_fast
+        self.e_trace[r] = e_trace
+        self.weights[r] = weights
+        self.activity_ma[r] = activity_ma
+        self.is_gating[r] = is_gating
+        return spikes
+
+    def step(self, tenant_id, input_current=None) -> np.ndarray:
+        """1テナントを1タイムステップ進め、スパイク列 (n_total,) を返す"""
+        return self.step_batch([tenant_id], [input_current])[0]
+
+    def write_back(self, tenant_id, engine):
+        """
+        テナントの可塑性重み・状態を BiCortexEngine へ書き戻す (個別解析・チェックポイント用)
+
+        Args:
+            tenant_id (hashable): テナントID
+            engine (BiCortexEngine): テンプレートと同じ配線のエンジン
+        """
+        if engine.n_total != self.n_total:
+            raise ValueError("engine topology does not match the pool")
+        row = self._rows[tenant_id]
+        if engine.sparse:
+            # 可塑性シナプスを構造に含めてから slot (行優先順) へ書き込む
+            engine.compile_connectivity()
+            engine.W.data[engine._plastic_slots] = self.weights[row]
+        else:
+            engine.W[self.plastic_post, self.plastic_pre] = self.weights[row]
+        for name in _STATE_KEYS:
+            setattr(engine, name, getattr(self, name)[row].copy())
+        engine.activity_ma = float(self.activity_ma[row])
+        engine.is_gating = bool(self.is_gating[row])
+
+
+class TenantServer:
+    """
+    TenantPool の asyncio フロントエンド
+
+    各テナントのコルーチンは await server.step(tenant_id, input_current) でステップを要求する。
+    サーバーはイベントループ上で要求をまとめ、最大 max_batch テナント分を1回の step_batch() で処理する。
+    同じテナントの要求が複数ある場合は到着順に別のバッチで処理する。
+    step_batch() はイベントループ上で同期的に実行される (計算中は他のコルーチンは進まない)。
+    不正な入力は step() の時点で ValueError になり、バッチの処理が失敗した場合はテナントごとに
+    再実行するため、1テナントの要求の失敗が同じバッチの他のテナントに波及しない。
+
+    Example:
+        async with TenantServer(pool, max_batch=64) as server:
+            spikes = await server.step("user-1", current)
+    """
+
+    def __init__(self, pool: TenantPool, max_batch: int = 64, max_delay: float = 0.0):
+        """
+        Args:
+            pool (TenantPool): 実行するテナント群
+            max_batch (int): 1回の step_batch で処理する最大テナント数
+            max_delay (float): 要求がたまるのを待つ最大時間 [s]。0 の場合は、すでにスケジュール済みの
+                               コルーチンの要求が揃うまで (イベントループ1周分) だけ待つ。
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = collections.deque()
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+        self.batches = 0
+        self.requests = 0
+
+    async def start(self):
+        if self._task is not None:
+            raise RuntimeError("server is already running")
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task = asyncio.create_task(self._serve())
+
+    async def stop(self):
+        """受け付け済みの要求をすべて処理してから停止する"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def step(self, tenant_id, input_current=None) -> np.ndarray:
+        """
+        テナントを1タイムステップ進める要求を出し、スパイク列 (n_total,) を待つ
+
+        Args:
+            tenant_id (hashable): テナントID
+            input_current: (n_total,) の ndarray、疎な入力 (indices, values)、または None (入力なし)
+        """
+        if self._task is None or self._closing:
+            raise RuntimeError("server is not running")
+        if tenant_id not in self.pool:
+            raise KeyError(f"unknown tenant: {tenant_id!r}")
+        # 不正な入力はバッチに入れる前に弾く (同じバッチの他のテナントを失敗させない)
+        self.pool.check_input(input_current)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((tenant_id, input_current, future))
+        self._wakeup.set()
+        return await future
+
+    def _next_batch(self) -> list:
+        batch, deferred, seen = [], [], set()
+        while self._pending and len(batch) < self.max_batch:
+            item = self._pending.popleft()
+            if item[2].cancelled():
+                continue
+            if item[0] in seen:
+                deferred.append(item)
+                continue
+            seen.add(item[0])
+            batch.append(item)
+        # 後回しにした要求は到着順のまま先頭へ戻す
+        self._pending.extendleft(reversed(deferred))
+        return batch
+
+    async def _serve(self):
+        while self._pending or not self._closing:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.max_delay)
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                spikes = self.pool.step_batch([item[0] for item in batch], [item[1] for item in batch])
+            except Exception:
+                # step_batch は失敗時に状態を書き換えないため、テナントごとに再実行して
+                # 原因となった要求だけを失敗させる
+                self._serve_individually(batch)
+                continue
+            for b, (_, _, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(spikes[b])
+            self.batches += 1
+            self.requests += len(batch)
+
+    def _serve_individually(self, batch: list):
+        for tenant_id, input_current, future in batch:
+            try:
+                spikes = self.pool.step(tenant_id, input_current)
+            except Exception as e:  # エラーは要求元のコルーチンで再送出する
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(spikes)
+            self.batches += 1
+            self.requests += 1
+
+    def report(self) -> dict:
+        return {
+            "tenants": len(self.pool),
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
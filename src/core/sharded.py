@@ -0,0 +1,355 @@
+"""
+Sharded Execution (multi-core)
+
+配線済みの BiCortexEngine をニューロン (行) 単位で複数のワーカープロセスに分割して実行する。
+
+- 結合行列は CSR として共有メモリに1つだけ置き、各ワーカーは担当行の範囲 (W.data の連続区間) を所有する。
+  可塑性シナプスの重み更新は post 側の行を所有するワーカーだけが行うため、書き込みは競合しない。
+- 状態変数 (v, 不応期, 順応, x_fast, e_trace) とスパイク列も共有メモリに置き、各ワーカーは担当行のみ書き込む。
+- 1ステップは次の順に同期する:
+    開始 -> [積分・発火 (担当行)] -> A -> [トレース更新 (担当行)・SRGゲート判定] -> B
+    -> [可塑性更新 (担当行)] -> 終了
+  開始・終了は親と各ワーカーのパイプ、A・B はワーカー間のバリアで行う。
+  A でスパイク列が揃う (= 全ワーカーが旧 x_fast の読み出しを終える)。
+  SRGゲートは全ワーカーが共有スパイク列の概念野から同じ値を計算する (ブロードキャストと等価)。
+  B で e_trace (学習の pre 側) が揃う。
+- 親は終了の応答と同時にワーカーのプロセス自体も監視し、異常終了 (例外・kill) や timeout 超過を
+  検出したら全ワーカーを停止して RuntimeError を送出する (無期限に待ち続けない)。
+  共有のバリアは待機中のプロセスが kill されると壊れるため、親はバリアを使わない。
+
+積分は担当行の CSR 行列積であるため、sparse=True のエンジンとは同じ結果になる
+(dense のエンジンは CSR に変換するため、和の順序による丸め誤差の範囲で一致する)。
+event_driven / backend="numba" / 計測 (instrumentation) には対応しない。
+"""
+import multiprocessing as mp
+import os
+import sys
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+import scipy.sparse as sp
+
+from .stimulus import StimulusSchedule
+
+# 共有メモリの解放は親プロセスが行うため、ワーカー側では resource_tracker に登録しない (3.13+)
+_ATTACH_KWARGS = {"track": False} if sys.version_info >= (3, 13) else {}
+
+_STATE_KEYS = ("v", "refractory_count", "adaptation", "x_fast", "e_trace")
+_PARAM_KEYS = ("alpha", "v_base", "decay_adapt", "adaptation_step", "refractory_steps", "decay_fast",
+               "decay_trace", "ma_alpha", "gate_threshold", "learning_rate", "global_decay", "w_max_clip")
+_RUN, _STOP = 0.0, 1.0
+
+
+def _plastic_csr(engine):
+    """
+    エンジンの結合を CSR (可塑性シナプスは重み0でも明示的な要素) と、W.data 上の可塑性 slot に変換する
+    """
+    if engine.sparse:
+        engine.compile_connectivity()
+        return engine.W.copy(), np.asarray(engine._plastic_slots)
+    n = engine.n_total
+    W_coo = sp.coo_matrix(engine.W)
+    m_row, m_col = engine.mask_plastic.nonzero()
+    rows = np.concatenate([W_coo.row, m_row])
+    cols = np.concatenate([W_coo.col, m_col])
+    data = np.concatenate([W_coo.data, np.zeros(len(m_row), dtype=W_coo.data.dtype)])
+    W = sp.csr_matrix((data, (rows, cols)), shape=(n, n), dtype=engine.dtype)
+    W.sum_duplicates()
+    entry_rows = np.repeat(np.arange(n), np.diff(W.indptr))
+    keys = entry_rows.astype(np.int64) * n + W.indices
+    slots = np.flatnonzero(np.isin(keys, m_row.astype(np.int64) * n + m_col))
+    return W, slots
+
+
+def partition_rows(indptr: np.ndarray, n_shards: int, row_cost: float = 8.0) -> np.ndarray:
+    """
+    行を連続した n_shards 個の範囲に分ける (各範囲の 非零要素数 + row_cost * 行数 がほぼ等しくなるように)
+
+    Returns:
+        np.ndarray: 境界 (n_shards + 1,)。shard i は行 [bounds[i], bounds[i+1]) を担当する。
+    """
+    n = len(indptr) - 1
+    cost = np.cumsum(np.diff(indptr) + row_cost)
+    targets = cost[-1] * np.arange(1, n_shards) / n_shards
+    inner = np.searchsorted(cost, targets, side="right")
+    return np.concatenate([[0], inner, [n]]).astype(np.int64)
+
+
+def _shared_csr(data, indices, indptr, shape) -> sp.csr_matrix:
+    """共有メモリ上の配列を (コピーせずに) 参照する CSR 行列"""
+    W = sp.csr_matrix((data, indices, indptr), shape=shape)
+    # コンストラクタは条件によって配列をコピーするため、ビューを明示的に差し戻す
+    W.data, W.indices, W.indptr = data, indices.astype(W.indices.dtype, copy=False), indptr.astype(
+        W.indptr.dtype, copy=False)
+    return W
+
+
+def _attach(specs: dict) -> tuple:
+    blocks, arrays = [], {}
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name, **_ATTACH_KWARGS)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return blocks, arrays
+
+
+def _shard_worker(specs, r0, r1, slots, idx_concept, params, conn, peers):
+    """ワーカープロセス: 行 [r0, r1) の積分・発火・トレース・可塑性更新を担当する"""
+    blocks, a = _attach(specs)
+    p = params
+    n = len(a["v"])
+    indptr, p0, p1 = a["indptr"], int(a["indptr"][r0]), int(a["indptr"][r1])
+    # W.data の担当区間 (共有メモリのビュー) をそのまま使う行列
+    W = _shared_csr(a["data"][p0:p1], a["indices"][p0:p1], indptr[r0:r1 + 1] - p0, (r1 - r0, n))
+    data = W.data
+    local_slots = slots - p0
+    local_post = np.repeat(np.arange(r0, r1), np.diff(indptr[r0:r1 + 1]))[local_slots]
+    local_pre = a["indices"][p0:p1][local_slots]
+    rows = slice(r0, r1)
+    v, ref, adapt = a["v"][rows], a["refractory_count"][rows], a["adaptation"][rows]
+    x_fast, e_trace, spikes = a["x_fast"], a["e_trace"], a["spikes"]
+    scalars = a["scalars"]  # [activity_ma, is_gating]
+    try:
+        while True:
+            if conn.recv() == _STOP:  # 開始
+                break
+            activity_ma = scalars[0]
+
+            # 1-3. 積分・発火 (BiCortexEngine.step と同じ順序)
+            v *= p["alpha"]
+            v += a["input"][rows]
+            v += W @ x_fast
+            adapt *= p["decay_adapt"]
+            v_thresh = p["v_base"] + adapt
+            v[ref > 0] = 0.0
+            np.maximum(0, ref - 1, out=ref)
+            fired = v >= v_thresh
+            v[fired] = 0.0
+            ref[fired] = p["refractory_steps"]
+            if p["adaptation_step"] > 0:
+                adapt[fired] += p["adaptation_step"]
+            spikes[rows] = fired
+            peers.wait()  # A: スパイク列が揃う
+
+            # 4-5. トレース更新・SRGゲート判定
+            x_fast[rows] = x_fast[rows] * p["decay_fast"] + spikes[rows]
+            e_trace[rows] = e_trace[rows] * p["decay_trace"] + spikes[rows]
+            concept_activity = np.sum(spikes[idx_concept])
+            activity_ma = activity_ma * (1 - p["ma_alpha"]) + concept_activity * p["ma_alpha"]
+            is_gating = activity_ma >= p["gate_threshold"]
+            peers.wait()  # B: e_trace が揃う
+            if r0 == 0:
+                scalars[0] = activity_ma
+                scalars[1] = float(is_gating)
+
+            # 6. 可塑性更新 (担当行の可塑性シナプスのみ)
+            if p["global_decay"] > 0:
+                data[local_slots] *= (1.0 - p["global_decay"])
+            if is_gating:
+                sel = spikes[local_post] > 0
+                if np.any(sel):
+                    s = local_slots[sel]
+                    data[s] = np.clip(data[s] + p["learning_rate"] * e_trace[local_pre[sel]],
+                                      -p["w_max_clip"], p["w_max_clip"])
+            conn.send(True)  # 終了
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+class ShardedEngine:
+    """
+    BiCortexEngine を複数プロセスで分割実行する
+
+    step() / run() はエンジンと同じインターフェースで、probes (core.probes) もそのまま使える
+    (W は共有メモリ上の CSR を直接参照する)。終了時は close() (または with 文) で
+    ワーカーを停止し、重みと状態を元のエンジンへ書き戻す。
+    """
+
+    def __init__(self, engine, n_shards: int = None, row_cost: float = 8.0, timeout: float = 60.0):
+        """
+        Args:
+            engine (BiCortexEngine): 配線済みのエンジン (event_driven / numba は非対応)
+            n_shards (int): ワーカープロセス数 (None で os.cpu_count())
+            row_cost (float): 分割時の1行あたりのコスト (非零要素数換算)
+            timeout (float): 1ステップでワーカーの応答を待つ最大秒数 (超えたらワーカーの異常とみなす)
+        """
+        if engine.event_driven or engine.backend != "numpy" or engine.plastic_store:
+            raise ValueError("ShardedEngine supports the matvec-integrated NumPy engine only")
+        self.engine = engine
+        self.n_total = engine.n_total
+        self.dtype = engine.dtype
+        for name in ("idx_sensory", "idx_concept", "idx_motor", "idx_mem", "n_think", "n_mem"):
+            setattr(self, name, getattr(engine, name))
+        self.sparse = True
+        self.timeout = timeout
+
+        W, slots = _plastic_csr(engine)
+        n_shards = max(1, min(n_shards or os.cpu_count() or 1, self.n_total))
+        self.bounds = partition_rows(W.indptr, n_shards, row_cost)
+
+        # 共有メモリ上の配列
+        arrays = {
+            "data": W.data, "indices": W.indices, "indptr": W.indptr,
+            "input": np.zeros(self.n_total, dtype=self.dtype),
+            "spikes": np.zeros(self.n_total, dtype=self.dtype),
+            "scalars": np.array([engine.activity_ma, float(engine.is_gating)]),
+        }
+        for key in _STATE_KEYS:
+            arrays[key] = getattr(engine, key)
+        self._blocks, specs, self._arrays = [], {}, {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+            shared[...] = array
+            self._blocks.append(shm)
+            self._arrays[name] = shared
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+        a = self._arrays
+        self.W = _shared_csr(a["data"], a["indices"], a["indptr"], W.shape)
+        for key in _STATE_KEYS:
+            setattr(self, key, a[key])
+
+        params = {key: float(getattr(engine, key)) for key in _PARAM_KEYS}
+        ctx = mp.get_context()
+        peers = ctx.Barrier(n_shards)
+        self._workers, self._conns = [], []
+        for r0, r1 in zip(self.bounds[:-1], self.bounds[1:]):
+            p0, p1 = W.indptr[r0], W.indptr[r1]
+            own = slots[(slots >= p0) & (slots < p1)]
+            conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(target=_shard_worker, daemon=True,
+                               args=(specs, int(r0), int(r1), own, engine.idx_concept, params, child_conn, peers))
+            proc.start()
+            child_conn.close()
+            self._workers.append(proc)
+            self._conns.append(conn)
+        self._closed = False
+        self._failed = False
+
+    @property
+    def n_shards(self) -> int:
+        return len(self._workers)
+
+    @property
+    def activity_ma(self) -> float:
+        return float(self._arrays["scalars"][0])
+
+    @property
+    def is_gating(self) -> bool:
+        return bool(self._arrays["scalars"][1])
+
+    def step(self, input_current) -> np.ndarray:
+        """1タイムステップを全ワーカーで実行し、スパイク列 (n_total,) を返す (入力は BiCortexEngine.step と同じ)"""
+        if isinstance(input_current, tuple):
+            indices, values = input_current
+            self._arrays["input"][:] = 0.0
+            self._arrays["input"][indices] = values
+        else:
+            self._arrays["input"][:] = input_current
+        self._dispatch(_RUN)
+        return self._arrays["spikes"].copy()
+
+    def _dispatch(self, command: float):
+        """全ワーカーへ開始 (または停止) を送り、終了の応答を待つ。異常時は全ワーカーを停止して RuntimeError を送出する"""
+        if self._failed:
+            raise RuntimeError("ShardedEngine workers have failed; close() it and create a new one")
+        try:
+            for conn in self._conns:
+                conn.send(command)
+        except OSError:
+            pass  # 受信側が終了している (下でプロセスの終了として検出する)
+        if command == _STOP:
+            return
+        pending = set(self._conns)
+        sentinels = {proc.sentinel: proc for proc in self._workers}
+        while pending:
+            ready = connection.wait(list(pending) + list(sentinels), self.timeout)
+            dead = [sentinels[r] for r in ready if r in sentinels]
+            if not ready or dead:
+                self._failed = True
+                for proc in self._workers:
+                    proc.terminate()
+                    proc.join()
+                reason = (f"exit codes {[proc.exitcode for proc in dead]}" if dead
+                          else f"no response within {self.timeout}s")
+                raise RuntimeError(f"ShardedEngine worker failed ({reason})")
+            for conn in ready:
+                conn.recv()
+                pending.discard(conn)
+
+    def run(self, input_series, probes=None) -> dict:
+        """BiCortexEngine.run と同じ (入力は (T, n_sensory) の ndarray・scipy.sparse 行列・StimulusSchedule)"""
+        probes = probes or []
+        total_steps = input_series.shape[0]
+        for probe in probes:
+            probe.allocate(self, total_steps)
+        series = sp.csr_matrix(input_series) if sp.issparse(input_series) else input_series
+        current = np.zeros(self.n_total)
+        idx_s = self.idx_sensory
+        for t in range(total_steps):
+            if isinstance(series, StimulusSchedule):
+                indices, values = series.at(t)
+                step_input = (idx_s[indices], values)
+            elif sp.issparse(series):
+                current[idx_s] = 0.0
+                lo, hi = series.indptr[t], series.indptr[t + 1]
+                current[idx_s[series.indices[lo:hi]]] = series.data[lo:hi]
+                step_input = current
+            else:
+                current[idx_s] = series[t]
+                step_input = current
+            spikes = self.step(step_input)
+            for probe in probes:
+                probe.observe(self, spikes, t)
+        for probe in probes:
+            probe.finish(self)
+        return {probe.name: probe.data for probe in probes}
+
+    def sync_to_engine(self):
+        """重み・状態変数・SRG状態を元のエンジンへ書き戻す"""
+        engine = self.engine
+        if engine.sparse:
+            engine.W = self.W.copy()
+            engine.compile_connectivity()
+        else:
+            engine.W[...] = self.W.toarray()
+        for key in _STATE_KEYS:
+            getattr(engine, key)[...] = self._arrays[key]
+        engine.activity_ma = self.activity_ma
+        engine.is_gating = self.is_gating
+
+    def close(self, sync: bool = True):
+        """
+        ワーカーを停止して共有メモリを解放する (sync=True なら先にエンジンへ書き戻す)
+
+        ワーカーが異常終了していた場合、状態は途中までしか更新されていないため書き戻さない。
+        """
+        if self._closed:
+            return
+        if not self._failed:
+            if sync:
+                self.sync_to_engine()
+            self._dispatch(_STOP)
+        for proc in self._workers:
+            proc.join(self.timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        for conn in self._conns:
+            conn.close()
+        self.W = None
+        for key in _STATE_KEYS:
+            setattr(self, key, None)
+        self._arrays = {}
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,177 @@
+"""
+Stimulus Schedule
+
+実験シナリオの入力を (開始ステップ, 持続ステップ数, 対象チャンネル, 振幅) のイベント列として保持する。
+compile() で「入力が一定の区間 (セグメント)」の列に変換し、各セグメントのアクティブな
+(チャンネル, 値) だけを CSR 風の配列で持つ。メモリはイベント数に比例し、(total_steps, n_channels) の
+dense な配列は作らない。
+
+BiCortexEngine.run() にそのまま渡すことができ、各ステップの入力は (indices, values) の
+疎な形で step() に渡される。
+"""
+import collections
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class StimulusSchedule:
+    """
+    刺激イベントのスケジュール
+
+    同じチャンネルで重なるイベントの振幅は加算される。
+    チャンネルは run() では engine.idx_sensory[channel] のニューロンに対応する。
+
+    Example:
+        schedule = StimulusSchedule(1500, n_channels=2)
+        schedule.add(100, 50, 0, 10.0)          # Bell
+        schedule.add(160, 30, [1], 10.0)        # Food
+        engine.run(schedule, probes=...)
+    """
+
+    def __init__(self, total_steps: int, n_channels: int):
+        """
+        Args:
+            total_steps (int): シナリオの総ステップ数
+            n_channels (int): 入力チャンネル数 (通常は n_sensory)
+        """
+        self.total_steps = int(total_steps)
+        self.n_channels = int(n_channels)
+        self.events = []
+        self._segments = None
+
+    @property
+    def shape(self) -> tuple:
+        return (self.total_steps, self.n_channels)
+
+    def __len__(self) -> int:
+        return self.total_steps
+
+    def add(self, start: int, duration: int, channels, amplitude) -> "StimulusSchedule":
+        """
+        刺激イベントを追加する ([start, start + duration) の間、channels に amplitude を入力)
+
+        Args:
+            start (int): 開始ステップ
+            duration (int): 持続ステップ数 (total_steps を超える部分は切り捨て)
+            channels (int | list[int]): 対象チャンネル
+            amplitude (float | list[float]): 振幅 (チャンネルごとに指定も可)
+        Returns:
+            StimulusSchedule: self (連続して add できる)
+        """
+        channels = np.atleast_1d(np.asarray(channels, dtype=np.int64))
+        amplitude = np.broadcast_to(np.asarray(amplitude, dtype=float), channels.shape).copy()
+        if start < 0 or duration < 0:
+            raise ValueError("start and duration must be non-negative")
+        if np.any((channels < 0) | (channels >= self.n_channels)):
+            raise ValueError(f"channel out of range [0, {self.n_channels})")
+        end = min(int(start) + int(duration), self.total_steps)
+        if end > start:
+            self.events.append((int(start), end, channels, amplitude))
+            self._segments = None
+        return self
+
+    def compile(self):
+        """
+        イベント列をセグメント列 (境界時刻・各区間のアクティブな入力) に変換する
+
+        イベントの開始・終了を時刻順に走査し、アクティブな入力の集合を差分で更新する (O(E log E))。
+        各チャンネルの値は変化したときのみ、アクティブなイベントの振幅を追加順に足し直して求める。
+        """
+        starts = np.array([e[0] for e in self.events], dtype=np.int64)
+        ends = np.array([e[1] for e in self.events], dtype=np.int64)
+        bounds = np.unique(np.concatenate([[0, self.total_steps], starts, ends]).astype(np.int64))
+
+        # (イベント, チャンネル) ごとの入力要素。変化点は要素の開始 (追加) と終了 (削除)
+        sizes = [len(e[2]) for e in self.events]
+        channels = np.concatenate([e[2] for e in self.events]).tolist() if self.events else []
+        amplitudes = np.concatenate([e[3] for e in self.events]).tolist() if self.events else []
+        n_entries = len(channels)
+        times = np.concatenate([np.repeat(starts, sizes), np.repeat(ends, sizes)])
+        order = np.argsort(times, kind="stable")
+        change_bounds = np.searchsorted(times[order], bounds)
+        order = order.tolist()
+
+        active = collections.defaultdict(dict)  # チャンネル -> {入力要素: 振幅}
+        current = {}  # 値が0でないチャンネル -> 値
+        indptr, indices, values = [0], [], []
+        for k in range(len(bounds) - 1):
+            touched = set()
+            for j in order[change_bounds[k]:change_bounds[k + 1]]:
+                i = j if j < n_entries else j - n_entries
+                c = channels[i]
+                if j < n_entries:
+                    active[c][i] = amplitudes[i]
+                else:
+                    del active[c][i]
+                touched.add(c)
+            for c in touched:
+                total = sum(active[c][i] for i in sorted(active[c]))
+                if total != 0:
+                    current[c] = total
+                else:
+                    current.pop(c, None)
+            nz = sorted(current)
+            indices.extend(nz)
+            values.extend(current[c] for c in nz)
+            indptr.append(len(indices))
+        self._segments = (
+            bounds,
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int64),
+            np.array(values, dtype=float),
+        )
+        return self
+
+    def _compiled(self):
+        if self._segments is None:
+            self.compile()
+        return self._segments
+
+    def segments(self):
+        """(t_start, t_end, indices, values) を時刻順に返す。区間内の入力は一定。"""
+        bounds, indptr, indices, values = self._compiled()
+        for k in range(len(bounds) - 1):
+            lo, hi = indptr[k], indptr[k + 1]
+            yield int(bounds[k]), int(bounds[k + 1]), indices[lo:hi], values[lo:hi]
+
+    def _segment(self, t: int) -> int:
+        """ステップ t を含む区間の番号"""
+        if not 0 <= t < self.total_steps:
+            raise ValueError(f"step {t} out of range [0, {self.total_steps})")
+        return int(np.searchsorted(self._compiled()[0], t, side="right")) - 1
+
+    def at(self, t: int):
+        """ステップ t の入力 (indices, values)"""
+        k = self._segment(t)
+        _, indptr, indices, values = self._compiled()
+        return indices[indptr[k]:indptr[k + 1]], values[indptr[k]:indptr[k + 1]]
+
+    def quiet_until(self, t: int) -> int:
+        """ステップ t から入力0が続く区間の終端 (t に入力があれば t)"""
+        k = self._segment(t)
+        bounds, indptr, _, _ = self._compiled()
+        return int(bounds[k + 1]) if indptr[k] == indptr[k + 1] else t
+
+    def to_sparse(self) -> sp.csr_matrix:
+        """(total_steps, n_channels) の CSR 行列"""
+        rows, cols, data = [], [], []
+        for t0, t1, idx, val in self.segments():
+            steps = np.arange(t0, t1)
+            rows.append(np.repeat(steps, len(idx)))
+            cols.append(np.tile(idx, len(steps)))
+            data.append(np.tile(val, len(steps)))
+        if not rows:
+            return sp.csr_matrix(self.shape)
+        return sp.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=self.shape)
+
+    def to_dense(self) -> np.ndarray:
+        """(total_steps, n_channels) の ndarray (可視化用)"""
+        dense = np.zeros(self.shape)
+        for t0, t1, idx, val in self.segments():
+            dense[t0:t1, idx] = val
+        return dense
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self._compiled())
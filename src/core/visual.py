@@ -1,56 +1,371 @@
-import torch
-import torch.nn as nn
-from torchvision import models, transforms
+"""
+Visual Encoder (MobileNetV3-Small)
+
+torch / torchvision はモジュール読み込み時には import せず、最初のエンコード
+(または load()) の時点で読み込む。エンジンのみを使うプロセスの起動時間に影響しない。
+"""
+import hashlib
+import json
+import os
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from PIL import Image
 import numpy as np
 
+
+class FeatureCache:
+    """
+    画像内容のハッシュをキーとする特徴ベクトルのディスクキャッシュ
+
+    1特徴 = 1ファイル (<key>.npy) で保存し、合計サイズが max_bytes を超えた場合は
+    最も長く参照されていないものから削除する (LRU, ファイルの mtime で管理)。
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # 既存エントリを参照順 (mtime 昇順) に読み込む
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".npy"):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.total_bytes = sum(self._entries.values())
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image: Image.Image, namespace: str = "") -> str:
+        """画像のモード・サイズ・画素内容 (とモデル識別子) からキーを作る"""
+        h = hashlib.sha1(namespace.encode())
+        h.update(f"{image.mode}:{image.size}".encode())
+        h.update(image.tobytes())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key: str):
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        try:
+            feature = np.load(self._path(key))
+            os.utime(self._path(key))
+        except (FileNotFoundError, ValueError):
+            # 他プロセスによる削除・書き込み途中のファイル
+            self.total_bytes -= self._entries.pop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return feature
+
+    def put(self, key: str, feature: np.ndarray):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, feature)
+        os.replace(tmp_path, self._path(key))
+
+        size = os.path.getsize(self._path(key))
+        self.total_bytes += size - self._entries.pop(key, 0)
+        self._entries[key] = size
+        self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+def _noise_images(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return [Image.fromarray(rng.integers(0, 256, (224, 224, 3), dtype=np.uint8)) for _ in range(n)]
+
+
 class VisualEncoder:
-    def __init__(self, device='cpu'):
+    RUNTIMES = ("eager", "traced", "quantized")
+
+    def __init__(self, device='cpu', num_threads: int = None, num_workers: int = 0,
+                 cache_dir: str = None, cache_max_bytes: int = 512 * 2**20,
+                 runtime: str = "eager", model_cache_dir: str = None,
+                 calibration_images=None, validation_images=None, min_cosine: float = 0.98):
         """
         MobileNetV3-Small based Visual Encoder for SNN.
         Extracts 576-dimensional feature vector from images.
+        モデルは最初の encode 呼び出し (または load()) まで読み込まない。
+
+        Args:
+            device (str): 推論デバイス
+            num_threads (int): torch の CPU 演算スレッド数 (None で torch の既定値)
+            num_workers (int): 前処理 (Resize/Crop/Normalize) を並列実行するスレッド数 (0 で逐次)
+            cache_dir (str): 特徴ベクトルのディスクキャッシュ先 (None で無効)
+            cache_max_bytes (int): キャッシュの合計サイズ上限 (byte)
+            runtime (str): 特徴抽出器の実行形式 (エッジ向け CPU 推論)
+                - "eager": float32 の PyTorch モデル (既定)
+                - "traced": TorchScript (trace + freeze) 化したグラフ
+                - "quantized": int8 静的量子化 (FX) + TorchScript 化したグラフ (CPU のみ)
+            model_cache_dir (str): "traced" / "quantized" のグラフを保存・再利用するディレクトリ。
+                                   初回のみ構築し、以降は torchvision のモデル構築を省略して読み込む。
+            calibration_images (list[Image.Image]): 量子化のキャリブレーション (とトレース) に用いる画像。
+                                                     None の場合はノイズ画像で代用する。
+            validation_images (list[Image.Image]): 精度検証に用いる画像 (キャリブレーションに使わないもの)。
+                                                    None の場合は calibration_images の 1/4 (最低1枚) を
+                                                    検証用に取り分ける。
+            min_cosine (float): 量子化・トレース後の出力と float モデルの出力の、検証画像上の
+                                コサイン類似度の下限。
+                                下回った場合は警告を出して "eager" にフォールバックする。
         """
+        if runtime not in self.RUNTIMES:
+            raise ValueError(f"unknown runtime: {runtime!r}")
+        if runtime == "quantized" and device != 'cpu':
+            raise ValueError("runtime='quantized' is supported on CPU only")
+
         self.device = device
-        
+        self.num_threads = num_threads
+        self.runtime = runtime
+        self.model_cache_dir = model_cache_dir
+        self.calibration_images = calibration_images
+        self.validation_images = validation_images
+        self.min_cosine = min_cosine
+        self.accuracy_report = None
+
+        self._model = None
+        self._extractor = None
+        self.preprocess = None
+        self.cache_namespace = None
+
+        # 前処理ワーカーと特徴キャッシュ
+        self._pool = ThreadPoolExecutor(num_workers) if num_workers > 0 else None
+        self.cache = FeatureCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+
+    @property
+    def model(self):
+        """float32 の MobileNetV3-Small (分類ヘッド無効化済み)"""
+        if self._model is None:
+            self._model = self._build_float_model()
+        return self._model
+
+    def load(self):
+        """torch の読み込みとモデル構築を明示的に行う (ウォームアップ用)"""
+        if self._extractor is not None:
+            return
+        import torch
+        from torchvision import models
+
+        if self.num_threads is not None:
+            torch.set_num_threads(self.num_threads)
+
+        # Preprocessing Pipeline
+        # ImageNetの学習時に使われた正規化パラメータ
+        weights = models.MobileNet_V3_Small_Weights.DEFAULT
+        self.preprocess = weights.transforms()
+
+        if self.runtime == "eager":
+            self._extractor = self._float_extractor()
+        else:
+            self._extractor = self._load_compiled(weights.name)
+        # キャッシュキーにモデル識別子を含め、別モデル・別実行形式の特徴と混ざらないようにする
+        self.cache_namespace = f"mobilenet_v3_small:{weights.name}:{self.runtime}"
+
+        print("Visual Encoder Ready. Output Dimension: 576")
+
+    def _build_float_model(self):
+        import torch.nn as nn
+        from torchvision import models
+
         # 1. Load Pre-trained Model
         # MobileNetV3 Small: 軽量で高速、エッジデバイス向き
         print("Loading MobileNetV3-Small...")
         weights = models.MobileNet_V3_Small_Weights.DEFAULT
-        self.model = models.mobilenet_v3_small(weights=weights)
-        
+        model = models.mobilenet_v3_small(weights=weights)
+
         # 2. Modifying Architecture
         # 分類ヘッド(Classifier)は不要なので無効化し、特徴抽出部(Features)のみ使う
         # MobileNetV3-Small の avgpool 直後の出力は [Batch, 576, 1, 1]
-        self.model.classifier = nn.Identity() 
-        
-        self.model.to(self.device)
-        self.model.eval() # 推論モード固定
-        
-        # 3. Preprocessing Pipeline
-        # ImageNetの学習時に使われた正規化パラメータ
-        self.preprocess = weights.transforms()
-        
-        print("Visual Encoder Ready. Output Dimension: 576")
+        model.classifier = nn.Identity()
+
+        model.to(self.device)
+        model.eval() # 推論モード固定
+        return model
+
+    def _float_extractor(self):
+        import torch.nn as nn
+        # features(conv) -> avgpool -> flatten
+        return nn.Sequential(self.model.features, self.model.avgpool, nn.Flatten(1)).eval()
+
+    def _compiled_path(self, weights_name: str) -> str:
+        import torch
+        if self.runtime == "quantized":
+            suffix = f"int8_{torch.backends.quantized.engine}"
+        else:
+            suffix = f"traced_{self.device}"
+        return os.path.join(self.model_cache_dir, f"mobilenet_v3_small_{weights_name}_{suffix}.pt")
+
+    def _load_compiled(self, weights_name: str):
+        """traced / quantized グラフをディスクから読み込む。無ければ構築・検証して保存する。"""
+        import torch
+
+        path = self._compiled_path(weights_name) if self.model_cache_dir else None
+        if path is not None and os.path.exists(path):
+            with open(path + ".json") as f:
+                self.accuracy_report = json.load(f)
+            if self.accuracy_report["min_cosine"] >= self.min_cosine:
+                return torch.jit.load(path, map_location=self.device)
+            warnings.warn(f"cached {self.runtime} graph does not meet min_cosine={self.min_cosine}; "
+                          "falling back to runtime='eager'")
+            self.runtime = "eager"
+            return self._float_extractor()
+
+        float_extractor = self._float_extractor()
+        calibration, validation = self._calibration_split()
+        example = torch.stack([self.preprocess(img) for img in calibration]).to(self.device)
+        held_out = torch.stack([self.preprocess(img) for img in validation]).to(self.device)
+
+        with torch.inference_mode():
+            module = self._quantize(float_extractor, example) if self.runtime == "quantized" else float_extractor
+        compiled = torch.jit.freeze(torch.jit.trace(module, example[:1]).eval())
+
+        # 精度検証: キャリブレーションに使っていない画像で float モデルの 576 次元出力と比較する
+        with torch.inference_mode():
+            ref = float_extractor(held_out)
+            out = compiled(held_out)
+        cosine = torch.nn.functional.cosine_similarity(ref, out, dim=1)
+        rel_err = (out - ref).norm(dim=1) / ref.norm(dim=1).clamp_min(1e-12)
+        self.accuracy_report = {
+            "runtime": self.runtime,
+            "n_calibration": int(example.shape[0]),
+            "n_images": int(held_out.shape[0]),
+            "min_cosine": float(cosine.min()),
+            "mean_cosine": float(cosine.mean()),
+            "max_rel_error": float(rel_err.max()),
+        }
+        if self.accuracy_report["min_cosine"] < self.min_cosine:
+            warnings.warn(f"{self.runtime} feature extractor deviates from the float model "
+                          f"(min cosine {self.accuracy_report['min_cosine']:.4f} < {self.min_cosine}); "
+                          "falling back to runtime='eager'")
+            self.runtime = "eager"
+            return float_extractor
+
+        if path is not None:
+            os.makedirs(self.model_cache_dir, exist_ok=True)
+            torch.jit.save(compiled, path)
+            with open(path + ".json", "w") as f:
+                json.dump(self.accuracy_report, f, indent=2)
+        return compiled
+
+    def _quantize(self, float_extractor, example):
+        """FX グラフモードによる int8 静的量子化 (example でキャリブレーション)"""
+        import copy
+        import torch
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+        qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+        prepared = prepare_fx(copy.deepcopy(float_extractor), qconfig_mapping, (example[:1],))
+        prepared(example)
+        return convert_fx(prepared)
+
+    def _calibration_split(self):
+        """(キャリブレーション画像, 検証画像)。検証画像はキャリブレーションに含めない。"""
+        calibration = list(self.calibration_images or [])
+        if not calibration:
+            warnings.warn("no calibration_images given; calibrating on noise images")
+            calibration = _noise_images(8, seed=0)
+        if self.validation_images:
+            return calibration, list(self.validation_images)
+        if len(calibration) < 2:
+            warnings.warn("too few calibration_images to hold out; validating on noise images")
+            return calibration, _noise_images(4, seed=1)
+        n_val = max(1, len(calibration) // 4)
+        return calibration[:-n_val], calibration[-n_val:]
 
     def encode(self, image: Image.Image) -> np.ndarray:
         """
         PIL Image -> 576-dim Feature Vector (Current for SNN)
         """
+        # 値の範囲は ReLU後なので 0.0 ~ ∞ だが、通常 0.0 ~ 6.0 程度
+        return self.encode_batch([image])[0]
+
+    def encode_batch(self, images, batch_size: int = 32) -> np.ndarray:
+        """
+        複数の PIL Image をまとめて特徴ベクトルに変換する
+
+        Args:
+            images (list[Image.Image]): 入力画像
+            batch_size (int): 1回の forward でまとめる枚数
+        Returns:
+            np.ndarray: (len(images), 576) の特徴ベクトル
+        """
+        self.load()
+        import torch
+
+        images = list(images)
+        features = np.zeros((len(images), self.get_output_dim()), dtype=np.float32)
+
+        # キャッシュ済みの画像は CNN を通さない
+        keys = [None] * len(images)
+        pending = list(range(len(images)))
+        if self.cache is not None:
+            keys = [FeatureCache.key(img, self.cache_namespace) for img in images]
+            pending = []
+            for i, key in enumerate(keys):
+                cached = self.cache.get(key)
+                if cached is None:
+                    pending.append(i)
+                else:
+                    features[i] = cached
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = torch.stack(self._preprocess_many([images[i] for i in chunk]))
+            out = self._forward(batch)
+            features[chunk] = out
+            if self.cache is not None:
+                for i, feature in zip(chunk, out):
+                    self.cache.put(keys[i], feature)
+
+        return features
+
+    def iter_encode(self, images, batch_size: int = 32):
+        """
+        画像の iterable (動画フレーム・データセット等) を batch_size ごとにまとめてエンコードし、
+        1枚ずつ特徴ベクトルを返すジェネレータ
+        """
+        batch = []
+        for image in images:
+            batch.append(image)
+            if len(batch) == batch_size:
+                yield from self.encode_batch(batch, batch_size)
+                batch = []
+        if batch:
+            yield from self.encode_batch(batch, batch_size)
+
+    def _preprocess_many(self, images):
         # 前処理 (Resize, CenterCrop, Normalize)
-        img_tensor = self.preprocess(image).unsqueeze(0).to(self.device)
-        
-        with torch.no_grad():
-            # Forward pass
-            # features(conv) -> avgpool -> flatten
-            x = self.model.features(img_tensor)
-            x = self.model.avgpool(x)
-            x = torch.flatten(x, 1)
-            
-            # 出力を取得 (Batchサイズ1なので [0] を返す)
-            # 値の範囲は ReLU後なので 0.0 ~ ∞ だが、通常 0.0 ~ 6.0 程度
-            feature_vector = x.cpu().numpy()[0]
-            
-        return feature_vector
+        if self._pool is None:
+            return [self.preprocess(img) for img in images]
+        return list(self._pool.map(self.preprocess, images))
+
+    def _forward(self, batch) -> np.ndarray:
+        import torch
+        with torch.inference_mode():
+            return self._extractor(batch.to(self.device)).cpu().numpy()
+
+    def close(self):
+        """前処理ワーカーを停止する"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def get_output_dim(self):
-        return 576
\ No newline at end of file
+        return 576
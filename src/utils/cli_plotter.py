@@ -1,5 +1,10 @@
+import shutil
+import sys
+import time
+
 import numpy as np
 
+
 class CLIColors:
     RESET = "\033[0m"
     GRAY = "\033[90m"
@@ -10,77 +15,224 @@ class CLIColors:
     BOLD = "\033[1m"
     CYAN = "\033[96m"
 
-def print_cli_heatmap(spike_history: np.ndarray, bin_size: int = 10, title: str = "Activity Log"):
-    """スパイク履歴(0/1)のヒートマップ表示"""
+# Unicode Block Elements
+BLOCKS = np.array([" ", "▂", "▃", "▄", "▅", "▆", "▇", "█"])
+
+
+def terminal_width(default: int = 100) -> int:
+    return shutil.get_terminal_size((default, 24)).columns
+
+
+def bin_reduce(data: np.ndarray, bin_size: int, op: str = "sum") -> np.ndarray:
+    """
+    1次元系列を bin_size ごとに縮約する (Python ループなし)。末尾の端数ビンも含む。
+
+    Args:
+        op (str): "sum" / "mean" / "min" / "max"
+    """
+    data = np.asarray(data, dtype=float)
+    starts = np.arange(0, len(data), bin_size)
+    if len(starts) == 0:
+        return np.zeros(0)
+    if op == "sum":
+        return np.add.reduceat(data, starts)
+    if op == "mean":
+        return np.add.reduceat(data, starts) / np.diff(np.append(starts, len(data)))
+    if op == "min":
+        return np.minimum.reduceat(data, starts)
+    if op == "max":
+        return np.maximum.reduceat(data, starts)
+    raise ValueError(f"unknown op: {op!r}")
+
+
+def downsample_minmax(data: np.ndarray, width: int):
+    """
+    系列を width 列に間引く。各列の最小値・最大値を保持するため、短いスパイクやピークが平均で消えない。
+
+    Returns:
+        tuple: (mins, maxs, bin_size)
+    """
+    bin_size = max(1, int(np.ceil(len(data) / max(1, width))))
+    return bin_reduce(data, bin_size, "min"), bin_reduce(data, bin_size, "max"), bin_size
+
+
+def _heatmap_cells(counts: np.ndarray) -> np.ndarray:
+    """ビンごとの発火数 -> 色付き1文字の配列"""
+    counts = counts.astype(int)
+    chars = np.where(counts < 10, counts.astype(str), "+")
+    chars = np.where(counts == 0, "_", chars)
+    colors = np.select(
+        [counts == 0, counts <= 2, counts <= 5, counts <= 9],
+        [CLIColors.GRAY, CLIColors.BLUE, CLIColors.GREEN, CLIColors.YELLOW],
+        default=CLIColors.RED + CLIColors.BOLD,
+    )
+    return np.char.add(np.char.add(colors, chars), CLIColors.RESET)
+
+
+def _level_cells(levels: np.ndarray) -> np.ndarray:
+    """0-7 の段階 -> 色付きブロック文字の配列"""
+    colors = np.select([levels < 2, levels < 5], [CLIColors.BLUE, CLIColors.GREEN], default=CLIColors.RED)
+    return np.char.add(np.char.add(colors, BLOCKS[levels]), CLIColors.RESET)
+
+
+def _join_rows(cells: np.ndarray, row_length: int = None) -> str:
+    if row_length is None or len(cells) == 0:
+        return "".join(cells)
+    rows = ["".join(cells[i:i + row_length]) for i in range(0, len(cells), row_length)]
+    # 元の実装と同様、ちょうど割り切れる場合は末尾に改行が付く
+    return "\n".join(rows) + ("\n" if len(cells) % row_length == 0 else "")
+
+
+def print_cli_heatmap(spike_history: np.ndarray, bin_size: int = 10, title: str = "Activity Log",
+                      width: int = None):
+    """
+    スパイク履歴(0/1)のヒートマップ表示
+
+    Args:
+        width (int): 指定した場合は全体が width 列に収まるよう bin_size を決める (0 で端末幅)
+    """
     if spike_history.ndim > 1:
         data = np.sum(spike_history, axis=1)
     else:
         data = spike_history
 
-    total_steps = len(data)
-    n_bins = int(np.ceil(total_steps / bin_size))
-    
+    row_length = 100
+    if width is not None:
+        width = width or terminal_width()
+        bin_size = max(1, int(np.ceil(len(data) / width)))
+        row_length = width
+
+    counts = bin_reduce(data, bin_size, "sum")
     print(f"\n{CLIColors.BOLD}=== {title} (Bin: {bin_size}) ==={CLIColors.RESET}")
-    output_buffer = ""
-    
-    for i in range(n_bins):
-        start = i * bin_size
-        end = min((i + 1) * bin_size, total_steps)
-        count = int(np.sum(data[start:end]))
-        
-        char = str(count) if count < 10 else "+"
-        if count == 0: color = CLIColors.GRAY; char = "_"
-        elif count <= 2: color = CLIColors.BLUE
-        elif count <= 5: color = CLIColors.GREEN
-        elif count <= 9: color = CLIColors.YELLOW
-        else: color = CLIColors.RED + CLIColors.BOLD
-            
-        output_buffer += f"{color}{char}{CLIColors.RESET}"
-        if (i + 1) % 100 == 0: output_buffer += "\n"
-
-    print(output_buffer)
-
-def print_cli_float_series(data_series: np.ndarray, bin_size: int = 10, title: str = "Value Log"):
+    print(_join_rows(_heatmap_cells(counts), row_length))
+
+
+def _levels(values: np.ndarray, min_val: float, range_val: float) -> np.ndarray:
+    # 正規化 0.0 - 7.99
+    return (((values - min_val) / range_val) * 7.99).astype(int)
+
+
+def print_cli_float_series(data_series: np.ndarray, bin_size: int = 10, title: str = "Value Log",
+                           width: int = None):
     """
     連続値（重みなど）の推移を簡易グラフ化して表示する
     値の大きさに応じて高さを表現する文字 (  ▂ ▃ ▄ ▅ ▆ ▇ █ ) を使用
+
+    Args:
+        bin_size (int): 平均化するステップ数
+        width (int): 指定した場合は width 列に min/max を保持して間引き、最大値・最小値の2行で表示する
+                     (0 で端末幅)。平均化で短いピークが消えることを防ぐ。
     """
-    # データをビンごとに平均化
-    total_steps = len(data_series)
-    n_bins = int(np.ceil(total_steps / bin_size))
-    binned_data = []
-    
-    for i in range(n_bins):
-        start = i * bin_size
-        end = min((i + 1) * bin_size, total_steps)
-        binned_data.append(np.mean(data_series[start:end]))
-    
-    binned_data = np.array(binned_data)
-    min_val = np.min(binned_data)
-    max_val = np.max(binned_data)
+    if width is None:
+        # データをビンごとに平均化
+        binned_data = bin_reduce(data_series, bin_size, "mean")
+        min_val = np.min(binned_data)
+        max_val = np.max(binned_data)
+        range_val = max_val - min_val if max_val > min_val else 1.0
+
+        print(f"\n{CLIColors.BOLD}=== {title} (Min: {min_val:.4f} -> Max: {max_val:.4f}) ==={CLIColors.RESET}")
+        # 改行なしで一行 (端末の折り返しに任せる)
+        print("".join(_level_cells(_levels(binned_data, min_val, range_val))))
+        return
+
+    mins, maxs, bin_size = downsample_minmax(data_series, width or terminal_width())
+    min_val, max_val = np.min(mins), np.max(maxs)
     range_val = max_val - min_val if max_val > min_val else 1.0
-    
-    # Unicode Block Elements
-    blocks = [" ", "▂", "▃", "▄", "▅", "▆", "▇", "█"]
-    
-    print(f"\n{CLIColors.BOLD}=== {title} (Min: {min_val:.4f} -> Max: {max_val:.4f}) ==={CLIColors.RESET}")
-    output_buffer = ""
-    
-    for val in binned_data:
-        # 正規化 0.0 - 7.99
-        norm_idx = int(((val - min_val) / range_val) * 7.99)
-        char = blocks[norm_idx]
-        
-        # 色分け (後半ほど赤くする＝学習が進んでいる感)
-        if norm_idx < 2: color = CLIColors.BLUE
-        elif norm_idx < 5: color = CLIColors.GREEN
-        else: color = CLIColors.RED
-        
-        output_buffer += f"{color}{char}{CLIColors.RESET}"
-        
-        if len(output_buffer.replace(CLIColors.BLUE, "").replace(CLIColors.RESET, "")) % 100 == 0: # 簡易改行判定
-           pass # エスケープシーケンスがあるため正確な改行は難しいが、今回はそのまま流す
-
-    # 100文字ごとに改行を入れる処理（エスケープシーケンス除去は複雑なので簡易的に）
-    # 今回は改行なしで一行または端末折り返しに任せる
-    print(output_buffer)
\ No newline at end of file
+    print(f"\n{CLIColors.BOLD}=== {title} (Min: {min_val:.4f} -> Max: {max_val:.4f}, "
+          f"Bin: {bin_size}) ==={CLIColors.RESET}")
+    print("".join(_level_cells(_levels(maxs, min_val, range_val))) + " max")
+    print("".join(_level_cells(_levels(mins, min_val, range_val))) + " min")
+
+
+class LiveDashboard:
+    """
+    シミュレーション中に端末上で逐次更新されるダッシュボード
+
+    領域ごとの発火数をビン単位で集計し、直近 width ビンのヒートマップと、ゲート開放率・
+    activity_ma・実行速度を refresh_every ステップごとに同じ位置へ再描画する。
+    毎ステップの処理は領域ごとの発火数の加算のみで、描画コストは O(width) / refresh_every。
+
+    engine.run(probes=[dashboard]) で使うほか、step() ループや StreamingPipeline の callback から
+    dashboard.observe(engine, spikes, t) を呼んでもよい。core.probes.Probe と同じメソッド
+    (allocate / observe / next_sample / finish / data) を持つが、core には依存しない。
+    """
+
+    def __init__(self, regions: dict, bin_size: int = 10, width: int = None, refresh_every: int = 1000,
+                 stream=None, name: str = "dashboard"):
+        """
+        Args:
+            regions (dict): 表示名 -> ニューロンID列
+            bin_size (int): 1列あたりのステップ数
+            width (int): 表示する列数 (None で端末幅に合わせる)
+            refresh_every (int): 再描画の間隔 (ステップ)
+            stream: 出力先 (既定: sys.stdout)
+        """
+        self.name = name
+        self.regions = {k: np.asarray(v) for k, v in regions.items()}
+        self.bin_size = max(1, int(bin_size))
+        self.width = width or max(10, terminal_width() - 16)
+        self.refresh_every = max(1, int(refresh_every))
+        self.stream = stream or sys.stdout
+        self.reset()
+
+    def reset(self):
+        # 直近 width ビンのリングバッファ (領域 x 列)
+        self._bins = np.zeros((len(self.regions), self.width))
+        self._current = np.zeros(len(self.regions))
+        self._n_bins = 0
+        self._steps = 0
+        self._gate_steps = 0
+        self._activity_ma = 0.0
+        self._lines_drawn = 0
+        self._t0 = time.perf_counter()
+
+    def allocate(self, engine, total_steps: int = 0):
+        pass
+
+    def observe(self, engine, spikes: np.ndarray, t: int = None):
+        for i, indices in enumerate(self.regions.values()):
+            self._current[i] += np.count_nonzero(spikes[indices])
+        self._gate_steps += int(engine.is_gating)
+        self._activity_ma = engine.activity_ma
+        self._steps += 1
+        if self._steps % self.bin_size == 0:
+            self._bins[:, self._n_bins % self.width] = self._current
+            self._current[:] = 0.0
+            self._n_bins += 1
+        if self._steps % self.refresh_every == 0:
+            self.render()
+
+    def next_sample(self, t: int):
+        # 毎ステップ observe() で集計するため、run(fast_forward=True) の早送りを行わない
+        return t
+
+    def finish(self, engine):
+        self.render()
+
+    def render(self):
+        """現在の状態を再描画する (前回の描画を上書き)"""
+        n = min(self._n_bins, self.width)
+        # リングバッファを古い順に並べる
+        order = (np.arange(n) + self._n_bins - n) % self.width
+        elapsed = time.perf_counter() - self._t0
+        lines = [
+            f"{CLIColors.BOLD}t={self._steps}  gate={self._gate_steps / max(self._steps, 1):.1%}  "
+            f"activity_ma={self._activity_ma:.3f}  {self._steps / max(elapsed, 1e-9):.0f} steps/s"
+            f"{CLIColors.RESET}"
+        ]
+        for i, name in enumerate(self.regions):
+            row = "".join(_heatmap_cells(self._bins[i, order]))
+            lines.append(f"{name[:12]:>12} |{row}")
+
+        out = ""
+        if self._lines_drawn:
+            # カーソルを前回の描画の先頭へ戻し、行ごとに消去して書き直す
+            out += f"\033[{self._lines_drawn}F"
+        out += "".join(f"\033[2K{line}\n" for line in lines)
+        self.stream.write(out)
+        self.stream.flush()
+        self._lines_drawn = len(lines)
+
+    @property
+    def data(self) -> dict:
+        return {"steps": self._steps, "gate_open_ratio": self._gate_steps / max(self._steps, 1)}
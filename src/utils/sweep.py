@@ -0,0 +1,164 @@
+"""
+Parameter Sweep / Multi-Seed Runner
+
+実験シナリオ (params, seed, stimulus) -> 評価指標 dict を、パラメータ空間 x シードの全条件について
+プロセスプールで並列実行し、結果を pandas.DataFrame にまとめる。
+
+- 刺激系列 (input_series 等の ndarray) は共有メモリに1度だけ置き、各ワーカーはコピーせずに参照する。
+- ワーカーからは評価指標 (スカラーの dict) のみを返し、スパイク・重みのログは転送しない。
+- results_path を指定すると、条件が1つ終わるごとに CSV へ追記する。同じファイルで再実行すると
+  完了済みの条件を読み込んで残りのみを実行する (中断からの再開)。
+"""
+import hashlib
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+def grid_space(**axes) -> list:
+    """
+    全組み合わせのパラメータ空間
+
+    Example:
+        grid_space(learning_rate=[0.001, 0.002], gate_ratio=[0.1, 0.15, 0.3])  # 6条件
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[n] for n in names))]
+
+
+def random_space(n: int, seed: int = 0, **axes) -> list:
+    """
+    ランダムサンプリングによるパラメータ空間
+
+    Args:
+        n (int): 条件数
+        seed (int): サンプリングの乱数シード
+        axes: パラメータ名 -> 範囲。(low, high) で一様分布、(low, high, "log") で対数一様分布、
+              list で候補からの一様選択。
+    """
+    rng = np.random.default_rng(seed)
+    samples = [{} for _ in range(n)]
+    for name, spec in axes.items():
+        if isinstance(spec, list):
+            values = [spec[i] for i in rng.integers(0, len(spec), n)]
+        elif len(spec) == 3 and spec[2] == "log":
+            values = np.exp(rng.uniform(np.log(spec[0]), np.log(spec[1]), n)).tolist()
+        else:
+            values = rng.uniform(spec[0], spec[1], n).tolist()
+        for sample, value in zip(samples, values):
+            sample[name] = value
+    return samples
+
+
+def task_key(params: dict, seed: int) -> str:
+    """条件 (パラメータ + シード) の識別子 (再開時の照合に用いる)"""
+    payload = json.dumps({"params": params, "seed": seed}, sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+# --- ワーカー側 ---
+# 共有メモリの解放は親プロセスが行うため、ワーカー側では resource_tracker に登録しない (3.13+)
+_ATTACH_KWARGS = {"track": False} if sys.version_info >= (3, 13) else {}
+_worker_stimulus = {}
+_worker_shm = []
+
+
+def _attach_stimulus(specs: dict):
+    """プールの initializer: 共有メモリ上の刺激系列を ndarray として参照する"""
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name, **_ATTACH_KWARGS)
+        _worker_shm.append(shm)  # プロセス終了まで参照を保持する
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        _worker_stimulus[name] = array
+
+
+def _run_task(scenario, params: dict, seed: int, context: dict) -> dict:
+    return scenario(params, seed, **_worker_stimulus, **context)
+
+
+def _share(stimulus: dict):
+    blocks, specs = [], {}
+    for name, array in stimulus.items():
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        blocks.append(shm)
+        specs[name] = (shm.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def run_sweep(scenario, param_sets: list, seeds, stimulus: dict = None, context: dict = None,
+              n_workers: int = None, results_path: str = None, verbose: bool = True) -> pd.DataFrame:
+    """
+    パラメータ空間 x シードの全条件を並列に実行する
+
+    Args:
+        scenario (callable): scenario(params, seed, **stimulus, **context) -> dict (評価指標)。
+                             ワーカーへ渡すため、モジュールのトップレベル関数であること。
+        param_sets (list[dict]): grid_space / random_space 等で作ったパラメータの一覧
+        seeds (iterable[int]): 各パラメータで実行するシード
+        stimulus (dict[str, np.ndarray]): 全条件で共通の刺激系列。共有メモリ経由で渡す。
+        context (dict): 全条件で共通の小さな引数 (test_start 等)
+        n_workers (int): プロセス数 (None で os.cpu_count()、1 でプールを使わず逐次実行)
+        results_path (str): 結果を追記する CSV。既存の場合は完了済みの条件をスキップする。
+        verbose (bool): 進捗を表示する
+    Returns:
+        pd.DataFrame: 1行1条件 (パラメータ列, seed, 評価指標列, task_key)
+    """
+    stimulus = stimulus or {}
+    context = context or {}
+    n_workers = n_workers or os.cpu_count() or 1
+
+    tasks = [(params, int(seed)) for params in param_sets for seed in seeds]
+    done = pd.DataFrame()
+    if results_path is not None and os.path.exists(results_path):
+        done = pd.read_csv(results_path, dtype={"task_key": str})  # 数字だけのハッシュを数値として読まない
+        finished = set(done["task_key"])
+        tasks = [(p, s) for p, s in tasks if task_key(p, s) not in finished]
+    if verbose:
+        print(f"Sweep: {len(tasks)} tasks to run ({len(done)} already done), {n_workers} workers")
+
+    rows = []
+
+    def record(params, seed, metrics):
+        row = dict(params, seed=seed, **metrics, task_key=task_key(params, seed))
+        rows.append(row)
+        if results_path is not None:
+            write_header = not os.path.exists(results_path)
+            pd.DataFrame([row]).to_csv(results_path, mode="a", header=write_header, index=False)
+        if verbose:
+            print(f"  [{len(rows)}/{len(tasks)}] seed={seed} {params}")
+
+    if n_workers == 1:
+        for params, seed in tasks:
+            record(params, seed, scenario(params, seed, **stimulus, **context))
+    elif tasks:
+        blocks, specs = _share(stimulus)
+        try:
+            with ProcessPoolExecutor(n_workers, initializer=_attach_stimulus, initargs=(specs,)) as pool:
+                futures = {pool.submit(_run_task, scenario, params, seed, context): (params, seed)
+                           for params, seed in tasks}
+                for future in as_completed(futures):
+                    params, seed = futures[future]
+                    record(params, seed, future.result())
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    return pd.concat([done, pd.DataFrame(rows)], ignore_index=True)
+
+
+def summarize(results: pd.DataFrame, param_names: list) -> pd.DataFrame:
+    """パラメータごとにシード間の平均・標準偏差を集計する"""
+    metrics = [c for c in results.columns
+               if c not in param_names and c not in ("seed", "task_key")
+               and pd.api.types.is_numeric_dtype(results[c])]
+    return results.groupby(param_names)[metrics].agg(["mean", "std"])
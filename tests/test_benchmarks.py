@@ -0,0 +1,38 @@
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.run_benchmarks import compare
+
+
+def test_compare_reports_regressions_beyond_tolerance():
+    baseline = {
+        "engine/a": {"engine_backend": "numpy", "steps_per_sec": 1000.0, "peak_mem_mb": 10.0},
+        "engine/b": {"engine_backend": "numpy", "steps_per_sec": 1000.0},
+        "engine/c": {"error": "MemoryError()"},
+        "scenario/x": {"wall_time_s": 2.0},
+    }
+    results = {
+        # 速度は許容範囲内の悪化、メモリは 50% 増加
+        "engine/a": {"engine_backend": "numpy", "steps_per_sec": 900.0, "peak_mem_mb": 15.0},
+        # 改善は悪化として扱わない
+        "engine/b": {"engine_backend": "numpy", "steps_per_sec": 2000.0},
+        "engine/c": {"steps_per_sec": 1.0},
+        "scenario/x": {"wall_time_s": 3.0},
+        "engine/new": {"steps_per_sec": 1.0},
+    }
+    regressions = compare(results, baseline, tolerance=0.2)
+    assert [(key, metric) for key, metric, *_ in regressions] == [("engine/a", "peak_mem_mb"),
+                                                                  ("scenario/x", "wall_time_s")]
+    key, metric, base, value, change = regressions[0]
+    assert (base, value) == (10.0, 15.0) and abs(change - 0.5) < 1e-12
+
+
+def test_compare_skips_results_from_a_different_backend():
+    baseline = {"engine/backend=numba": {"engine_backend": "numba", "steps_per_sec": 10000.0}}
+    results = {"engine/backend=numba": {"engine_backend": "numpy", "steps_per_sec": 1000.0}}
+    assert compare(results, baseline, tolerance=0.2) == []
+    results["engine/backend=numba"]["engine_backend"] = "numba"
+    assert len(compare(results, baseline, tolerance=0.2)) == 1
@@ -0,0 +1,56 @@
+import sys
+import os
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.engine import BiCortexEngine
+from core.checkpoint import CheckpointManager
+from test_engine import build_pavlov_engine, pavlov_inputs, run_engine, dense_weights
+
+
+def test_checkpoint_roundtrip_resumes_identically(tmp_path):
+    series = pavlov_inputs(900)
+    for kwargs in (dict(), dict(sparse=True, event_driven=True), dict(compact_mask=True, dtype=np.float32),
+                   dict(plastic_store=True), dict(sparse=True, plastic_store=True)):
+        engine = build_pavlov_engine(**kwargs)
+        run_engine(engine, series[:450])
+
+        path = str(tmp_path / ("ckpt_" + "_".join(sorted(kwargs))))
+        engine.save_checkpoint(path)
+        restored = BiCortexEngine.load_checkpoint(path)
+
+        assert restored.is_gating == engine.is_gating
+        assert restored.activity_ma == engine.activity_ma
+        spikes_orig = run_engine(engine, series[450:])
+        spikes_restored = run_engine(restored, series[450:])
+        np.testing.assert_array_equal(spikes_orig, spikes_restored)
+        np.testing.assert_array_equal(dense_weights(engine), dense_weights(restored))
+
+
+def test_incremental_checkpoints(tmp_path):
+    series = pavlov_inputs(900)
+    engine = build_pavlov_engine()
+    manager = CheckpointManager(engine, str(tmp_path))
+
+    manager.save()
+    run_engine(engine, series[:300])
+    path = manager.save()
+    assert os.path.basename(path) == "inc_00001"
+    w_after_first = engine.W.copy()
+    run_engine(engine, series[300:600])
+    manager.save()
+
+    # 差分は可塑性シナプスのみ (全重みより十分小さい)
+    n_changed = len(np.load(os.path.join(path, "positions.npy")))
+    assert 0 < n_changed <= engine.mask_plastic.sum()
+
+    restored = CheckpointManager.restore(str(tmp_path))
+    np.testing.assert_array_equal(restored.W, engine.W)
+    np.testing.assert_array_equal(restored.e_trace, engine.e_trace)
+    np.testing.assert_array_equal(run_engine(restored, series[600:]), run_engine(engine, series[600:]))
+
+    partial = CheckpointManager.restore(str(tmp_path), upto=1)
+    np.testing.assert_array_equal(partial.W, w_after_first)
@@ -0,0 +1,70 @@
+import sys
+import os
+import io
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from utils.cli_plotter import (CLIColors, LiveDashboard, bin_reduce, downsample_minmax,
+                               print_cli_float_series, print_cli_heatmap)
+from test_engine import build_pavlov_engine, pavlov_inputs
+
+
+def _cell(color, char):
+    return f"{color}{char}{CLIColors.RESET}"
+
+
+def test_vectorized_binning_keeps_output_format(capsys):
+    data = np.zeros(2005)
+    data[0:3] = 1           # 3 -> GREEN
+    data[10:11] = 1         # 1 -> BLUE
+    data[20:30] = 1         # 10 -> "+"
+    data[2000:] = 1         # 端数ビン (5)
+    print_cli_heatmap(data, title="T")
+    out = capsys.readouterr().out.split("\n")
+    assert out[1] == f"{CLIColors.BOLD}=== T (Bin: 10) ==={CLIColors.RESET}"
+    row = out[2]
+    assert row.startswith(_cell(CLIColors.GREEN, "3") + _cell(CLIColors.BLUE, "1")
+                          + _cell(CLIColors.RED + CLIColors.BOLD, "+") + _cell(CLIColors.GRAY, "_"))
+    # 100ビンごとに改行、端数ビンは最後の行
+    assert row.count(CLIColors.RESET) == 100
+    assert out[4] == _cell(CLIColors.GREEN, "5")
+
+    assert np.allclose(bin_reduce(np.arange(25), 10, "mean"), [4.5, 14.5, 22.0])
+    print_cli_float_series(np.arange(30, dtype=float), title="W")
+    out = capsys.readouterr().out.split("\n")
+    assert out[1] == f"{CLIColors.BOLD}=== W (Min: 4.5000 -> Max: 24.5000) ==={CLIColors.RESET}"
+    assert out[2] == _cell(CLIColors.BLUE, " ") + _cell(CLIColors.GREEN, "▄") + _cell(CLIColors.RED, "█")
+
+
+def test_minmax_downsampling_preserves_peaks(capsys):
+    data = np.zeros(10_000)
+    data[1234] = 1.0
+    mins, maxs, bin_size = downsample_minmax(data, 80)
+    assert len(maxs) <= 80 and bin_size == 125
+    assert maxs.max() == 1.0 and mins.max() == 0.0
+    print_cli_float_series(data, width=80)
+    lines = capsys.readouterr().out.split("\n")
+    assert "█" in lines[2] and lines[2].endswith(" max")
+
+
+def test_live_dashboard_redraws_in_place():
+    series = pavlov_inputs(500)
+    engine = build_pavlov_engine()
+    stream = io.StringIO()
+    dash = LiveDashboard({"mem": engine.idx_mem, "motor": engine.idx_motor},
+                         bin_size=10, width=20, refresh_every=100, stream=stream)
+    logs = engine.run(series, probes=[dash])
+    assert logs["dashboard"]["steps"] == 500
+    out = stream.getvalue()
+    # 5回の定期描画 + finish() の描画。2回目以降は前回の3行分カーソルを戻す
+    assert out.count("\033[3F") == 5
+    last = out.split("\033[3F")[-1].split("\n")
+    assert last[0].startswith("\033[2K") and "t=500" in last[0]
+    assert last[1].count(CLIColors.RESET) == 20
+
+    # run(fast_forward=True) でも毎ステップ集計される
+    dash = LiveDashboard({"mem": engine.idx_mem}, refresh_every=1000, stream=io.StringIO())
+    assert engine.run(series, probes=[dash], fast_forward=True)["dashboard"]["steps"] == 500
@@ -0,0 +1,421 @@
+import sys
+import os
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.engine import BiCortexEngine
+
+
+def build_pavlov_engine(init_method=None, n_mem=100, **kwargs):
+    """Phase 1.4 (Pavlov) と同じ配線の小規模エンジンを構築する"""
+    engine = BiCortexEngine(n_sensory=2, n_concept=2, n_motor=1, n_mem=n_mem, seed=42, **kwargs)
+    engine.init_memory_reservoir(density=0.2, spectral_radius=0.9, method=init_method)
+
+    idx_s, idx_c, idx_m, idx_mem = engine.idx_sensory, engine.idx_concept, engine.idx_motor, engine.idx_mem
+    engine.W[idx_c[0], idx_s[0]] = 8.0
+    engine.W[idx_c[1], idx_s[1]] = 8.0
+    engine.W[idx_m[0], idx_c[1]] = 8.0
+
+    mem_bell, mem_food = idx_mem[0:10], idx_mem[10:20]
+    for c, mem in ((0, mem_bell), (1, mem_food)):
+        engine.W[mem, idx_c[c]] = 0.6
+        engine.W[idx_c[c], mem] = 0.12
+
+    engine.mask_plastic[idx_c, :] = False
+    engine.mask_plastic[:, idx_c] = False
+    grid = np.ix_(mem_food, mem_bell)
+    engine.W[grid] = 0.0
+    engine.mask_plastic[grid] = True
+    return engine
+
+
+def pavlov_inputs(total_steps=1000):
+    """Bell/Food の対提示を含む入力系列 (total_steps, n_sensory)"""
+    series = np.zeros((total_steps, 2))
+    for t in range(100, total_steps - 150, 150):
+        series[t:t + 50, 0] = 10.0
+        series[t + 60:t + 90, 1] = 10.0
+    return series
+
+
+def run_engine(engine, series):
+    spikes_log = []
+    for row in series:
+        current = np.zeros(engine.n_total)
+        current[engine.idx_sensory] = row
+        spikes_log.append(engine.step(current))
+    return np.array(spikes_log)
+
+
+def dense_weights(engine):
+    W = engine.full_weights() if getattr(engine, "plastic_store", False) else engine.W
+    return W.toarray() if hasattr(W, "toarray") else np.asarray(W)
+
+
+def test_sparse_backend_matches_dense():
+    series = pavlov_inputs()
+    dense = build_pavlov_engine(init_method="sparse")
+    sparse = build_pavlov_engine(sparse=True)
+
+    spikes_dense = run_engine(dense, series)
+    spikes_sparse = run_engine(sparse, series)
+
+    assert dense.is_gating or np.any(spikes_dense[:, dense.idx_concept])
+    np.testing.assert_array_equal(spikes_dense, spikes_sparse)
+    np.testing.assert_allclose(dense_weights(dense), dense_weights(sparse), atol=1e-12)
+
+
+def test_sparse_backend_keeps_zero_plastic_synapses():
+    engine = build_pavlov_engine(sparse=True)
+    engine.compile_connectivity()
+
+    # 重み0で初期化された Bell->Food の可塑性シナプスも構造として保持される
+    n_plastic_mem = int((engine.mask_plastic[np.ix_(engine.idx_mem, engine.idx_mem)]).sum())
+    assert len(engine._plastic_slots) == n_plastic_mem
+    assert engine.mask_plastic[engine.idx_mem[10], engine.idx_mem[0]]
+
+
+def reference_srg_update(engine, spikes):
+    """ベクトル化前の post ニューロン単位ループによる SRG 更新 (比較用)"""
+    if engine.global_decay > 0:
+        engine.W[engine.mask_plastic] *= (1.0 - engine.global_decay)
+    if not engine.is_gating:
+        return
+    for post in np.where(spikes > 0)[0]:
+        mask_p = engine.mask_plastic[post, :]
+        if not np.any(mask_p):
+            continue
+        w = engine.W[post, mask_p] + engine.learning_rate * engine.e_trace[mask_p]
+        engine.W[post, mask_p] = np.clip(w, -engine.w_max_clip, engine.w_max_clip)
+
+
+def test_vectorized_srg_matches_reference_loop():
+    series = pavlov_inputs()
+    vectorized = build_pavlov_engine()
+    reference = build_pavlov_engine()
+    reference._update_weights_srg = lambda spikes: reference_srg_update(reference, spikes)
+
+    spikes_vec = run_engine(vectorized, series)
+    spikes_ref = run_engine(reference, series)
+
+    np.testing.assert_array_equal(spikes_vec, spikes_ref)
+    np.testing.assert_allclose(vectorized.W, reference.W, rtol=0, atol=1e-12)
+
+
+def test_event_driven_integration_matches_matvec():
+    series = pavlov_inputs()
+    for sparse in (False, True):
+        reference = build_pavlov_engine(sparse=sparse)
+        event = build_pavlov_engine(sparse=sparse, event_driven=True)
+
+        spikes_ref = run_engine(reference, series)
+        spikes_event = run_engine(event, series)
+
+        np.testing.assert_array_equal(spikes_ref, spikes_event)
+        np.testing.assert_allclose(dense_weights(reference), dense_weights(event), atol=1e-12)
+        # SRGによる可塑的重み変化を含めて W @ x_fast と一致していること
+        np.testing.assert_allclose(event.i_syn_fixed + event.i_syn_plastic,
+                                   event.W @ event.x_fast, atol=1e-9)
+
+        # 発火列の取り出しは発火した pre の結合のみを走査する (CSR の列スライスは構造全体を走査する)
+        if sparse:
+            fired = np.flatnonzero(spikes_event[-200:].any(axis=0))
+            np.testing.assert_array_equal(np.sort(event._plastic_from(fired)),
+                                          np.flatnonzero(np.isin(event._plastic_pre, fired)))
+            columns = event._fixed_columns()
+            assert columns.format == "csc"
+            assert columns.nnz + len(event._plastic_pre) == event.W.nnz
+
+
+def test_run_with_probes_matches_step_loop():
+    import scipy.sparse as sp
+    from core.probes import SpikeProbe, WeightProbe, StateProbe
+
+    series = pavlov_inputs()
+    reference = build_pavlov_engine()
+    spikes_ref = run_engine(reference, series)
+
+    engine = build_pavlov_engine()
+    mem_bell, mem_food = engine.idx_mem[0:10], engine.idx_mem[10:20]
+    probes = [
+        SpikeProbe("motor", engine.idx_motor),
+        SpikeProbe("mem_sum", engine.idx_mem, every=10),
+        WeightProbe("w_bell_food", mem_food, mem_bell, every=5),
+        StateProbe("gate", "is_gating"),
+    ]
+    logs = engine.run(sp.csr_matrix(series), probes=probes)
+
+    np.testing.assert_array_equal(logs["motor"], spikes_ref[:, reference.idx_motor])
+    mem_counts = spikes_ref[:, reference.idx_mem].reshape(-1, 10, len(reference.idx_mem)).sum(axis=1)
+    np.testing.assert_array_equal(logs["mem_sum"], mem_counts)
+    assert logs["w_bell_food"].shape == (len(series) // 5,)
+    assert logs["gate"].shape == (len(series),) and logs["gate"].max() == 1.0
+    np.testing.assert_allclose(engine.W, reference.W, atol=1e-12)
+
+
+def test_fast_forward_matches_step_loop():
+    import scipy.sparse as sp
+    from core.probes import EventProbe, SpikeProbe, WeightProbe
+
+    # 学習後に長い無入力区間と単発の刺激が続くシナリオ
+    series = np.zeros((4000, 2))
+    series[:1000] = pavlov_inputs(1000)
+    series[2500:2550, 0] = 10.0
+    for kwargs in ({}, dict(sparse=True, init_method="sparse"), dict(event_driven=True)):
+        reference = build_pavlov_engine(**kwargs)
+        engine = build_pavlov_engine(**kwargs)
+        logs = []
+        for eng, ff in ((reference, False), (engine, True)):
+            probes = [
+                SpikeProbe("spikes", np.arange(eng.n_total)),
+                EventProbe("mem", eng.idx_mem),
+                WeightProbe("w", eng.idx_mem[10:20], eng.idx_mem[0:10], every=100),
+            ]
+            logs.append(eng.run(sp.csr_matrix(series) if ff else series, probes=probes, fast_forward=ff))
+        np.testing.assert_array_equal(logs[1]["spikes"], logs[0]["spikes"])
+        assert len(logs[1]["mem"]) == len(logs[0]["mem"]) and logs[1]["mem"].n_steps == len(series)
+        np.testing.assert_allclose(logs[1]["w"], logs[0]["w"], atol=1e-12)
+        np.testing.assert_allclose(dense_weights(engine), dense_weights(reference), atol=1e-12)
+        for attr in ("v", "x_fast", "e_trace", "adaptation"):
+            np.testing.assert_allclose(getattr(engine, attr), getattr(reference, attr), atol=1e-12)
+
+    # 閾値付近の膜電位は早送りせず step() に任せる
+    engine = build_pavlov_engine()
+    engine.v[:] = engine.v_base / engine.alpha
+    assert not engine.fast_forward(10)
+    engine.v[:] = 0.0
+    assert not engine.fast_forward(100, np.full(engine.n_total, 1.0))
+    assert engine.fast_forward(100) and engine.activity_ma == 0.0
+
+
+def test_block_structured_integration_matches_dense():
+    series = pavlov_inputs()
+    reference = build_pavlov_engine()
+    engine = build_pavlov_engine(block_structured=True)
+    np.testing.assert_array_equal(run_engine(engine, series), run_engine(reference, series))
+    np.testing.assert_allclose(engine.W, reference.W, atol=1e-12)
+
+    # 結合のない領域ペアは保持せず、Bell/Food の 1対1 配線は対角、記憶野は W のビュー
+    kinds = engine._blocks.kinds()
+    assert ("sensory", "mem") not in kinds and ("motor", "sensory") not in kinds
+    assert kinds[("concept", "sensory")] == "diagonal" and kinds[("mem", "mem")] == "plastic"
+    assert engine._blocks.work() < engine.n_total ** 2
+
+    # 配線変更後は compile_connectivity() で固定ブロックを作り直す
+    engine.W[engine.idx_motor[0], engine.idx_sensory[0]] = 1.0
+    engine.compile_connectivity()
+    x = np.random.default_rng(0).random(engine.n_total)
+    np.testing.assert_allclose(engine._blocks.matvec(x), engine.W @ x, atol=1e-12)
+
+
+def test_plastic_store_matches_masked_updates_and_prunes():
+    from core.probes import WeightProbe
+
+    series = pavlov_inputs()
+    for kwargs in ({}, dict(sparse=True, init_method="sparse"), dict(event_driven=True)):
+        reference = build_pavlov_engine(**kwargs)
+        engine = build_pavlov_engine(plastic_store=True, **kwargs)
+        logs = [eng.run(series, probes=[WeightProbe("w", eng.idx_mem[10:20], eng.idx_mem[0:10])])
+                for eng in (reference, engine)]
+        # プローブはストア上の重みを読む
+        np.testing.assert_allclose(logs[1]["w"], logs[0]["w"], atol=1e-12)
+        np.testing.assert_allclose(dense_weights(engine), dense_weights(reference), atol=1e-12)
+        # W には固定結合のみが残る
+        store = engine.plastic_synapses
+        assert len(store) > 0
+        W = engine.W.toarray() if kwargs.get("sparse") else engine.W
+        assert not np.any(W[store.post, store.pre])
+
+    # 小さな重みのシナプスは定期的に削除され、マスクからも外れる
+    engine = build_pavlov_engine(plastic_store=True)
+    engine.prune_epsilon, engine.prune_interval = 1e-3, 100
+    run_engine(engine, series)
+    store = engine.plastic_synapses
+    assert store.n_pruned > 0 and np.all(np.abs(store.weight) >= 1e-3)
+    assert engine.mask_plastic.sum() == len(store)
+    n_before = len(store)
+    assert engine.prune_plastic(1.0) == n_before and len(engine.plastic_synapses) == 0
+    run_engine(engine, series[:200])
+
+
+def test_pruning_keeps_unlearned_plastic_synapses():
+    series = pavlov_inputs(3000)
+    reference = build_pavlov_engine(plastic_store=True)
+    engine = build_pavlov_engine(plastic_store=True)
+    grid = np.ix_(engine.idx_mem[10:20], engine.idx_mem[0:10])
+    engine.prune_epsilon, engine.prune_interval = 1e-3, 100
+
+    # 最初の削減 (step 100) の時点では Bell->Food は重み0のまま未学習で、削除されない
+    run_engine(engine, series[:100])
+    assert engine.plastic_synapses.n_pruned > 0
+    assert engine.mask_plastic[grid].all()
+
+    # 削減を有効にしても Bell->Food の連合は形成される
+    run_engine(engine, series[100:])
+    run_engine(reference, series)
+    learned = dense_weights(reference)[grid].mean()
+    assert learned > 0.5
+    assert engine.mask_plastic[grid].all()
+    assert dense_weights(engine)[grid].mean() > 0.8 * learned
+
+
+def test_event_probe_and_weight_monitor():
+    from core.probes import EventProbe, WeightMonitor, WeightProbe
+
+    series = pavlov_inputs()
+    logs = {}
+    for kwargs in (dict(init_method="sparse"), dict(sparse=True)):
+        engine = build_pavlov_engine(**kwargs)
+        mem_bell, mem_food = engine.idx_mem[0:10], engine.idx_mem[10:20]
+        probes = [
+            EventProbe("mem", engine.idx_mem, capacity=16),
+            WeightMonitor("w", mem_food, mem_bell, every=10, stats=("mean", "max", "std")),
+            WeightProbe("w_mean", mem_food, mem_bell, every=10),
+            # 疎構造上に存在しない要素を含むブロック (0 として扱われる)
+            WeightMonitor("w_mixed", engine.idx_mem[:30], engine.idx_mem[:30], every=50, stats=("mean",)),
+        ]
+        logs[engine.sparse] = engine.run(series, probes=probes)
+
+    reference = build_pavlov_engine(init_method="sparse")
+    raster_ref = run_engine(reference, series)[:, reference.idx_mem]
+    for log in logs.values():
+        events = log["mem"]
+        assert len(events) == int(raster_ref.sum())
+        np.testing.assert_array_equal(events.to_raster(), raster_ref)
+        np.testing.assert_array_equal(events.to_raster(bin_size=10).sum(axis=0), raster_ref.sum(axis=0))
+        np.testing.assert_array_equal(events.counts(), raster_ref.sum(axis=1))
+        np.testing.assert_array_equal(events.to_sparse().toarray(), raster_ref)
+        np.testing.assert_allclose(log["w"]["mean"], log["w_mean"])
+        assert log["w"]["max"].max() > 0
+    for key in ("mean", "max", "std"):
+        np.testing.assert_allclose(logs[False]["w"][key], logs[True]["w"][key], atol=1e-12)
+    np.testing.assert_allclose(logs[False]["w_mixed"]["mean"], logs[True]["w_mixed"]["mean"], atol=1e-12)
+
+
+def test_numba_backend_conforms_to_reference():
+    import pytest
+    pytest.importorskip("numba")
+
+    series = pavlov_inputs()
+    reference = build_pavlov_engine()
+    fused = build_pavlov_engine(backend="numba")
+
+    spikes_ref = run_engine(reference, series)
+    spikes_fused = run_engine(fused, series)
+
+    np.testing.assert_array_equal(spikes_ref, spikes_fused)
+    np.testing.assert_allclose(fused.W, reference.W, atol=1e-10)
+    np.testing.assert_allclose(fused.v, reference.v, atol=1e-9)
+    np.testing.assert_allclose(fused.e_trace, reference.e_trace, atol=1e-12)
+    assert fused.is_gating == reference.is_gating
+    assert abs(fused.activity_ma - reference.activity_ma) < 1e-12
+
+
+def test_compact_mask_matches_dense_mask():
+    series = pavlov_inputs()
+    for event_driven in (False, True):
+        reference = build_pavlov_engine(event_driven=event_driven)
+        compact = build_pavlov_engine(event_driven=event_driven, compact_mask=True)
+
+        np.testing.assert_array_equal(np.asarray(compact.mask_plastic), reference.mask_plastic)
+        assert compact.mask_plastic.nbytes * 8 <= reference.mask_plastic.nbytes + 8 * compact.n_total
+
+        spikes_ref = run_engine(reference, series)
+        spikes_compact = run_engine(compact, series)
+        np.testing.assert_array_equal(spikes_ref, spikes_compact)
+        np.testing.assert_allclose(compact.W, reference.W, atol=1e-12)
+        # 可塑性インデックスは (post, pre) の int32 列のみ (8 byte/可塑性シナプス)
+        n_plastic = int(reference.mask_plastic.sum())
+        assert compact._plastic_slots is None
+        assert compact._plastic_post.nbytes + compact._plastic_pre.nbytes == 8 * n_plastic
+
+
+def test_float32_dynamics_within_tolerance_of_float64():
+    series = pavlov_inputs()
+    reference = build_pavlov_engine()
+    single = build_pavlov_engine(dtype=np.float32)
+
+    spikes_ref = run_engine(reference, series)
+    spikes_single = run_engine(single, series)
+
+    assert single.W.dtype == np.float32 and single.v.dtype == np.float32
+    assert spikes_single.dtype == np.float32
+    # 発火時刻は閾値付近の丸め差で僅かにずれ得るため、領域ごとの発火数と学習後の重みで比較する
+    counts_ref = spikes_ref.sum(axis=0)
+    counts_single = spikes_single.sum(axis=0)
+    assert np.abs(counts_ref - counts_single).sum() <= 0.02 * counts_ref.sum()
+    mem_bell, mem_food = reference.idx_mem[0:10], reference.idx_mem[10:20]
+    w_ref = reference.W[np.ix_(mem_food, mem_bell)].mean()
+    w_single = single.W[np.ix_(mem_food, mem_bell)].mean()
+    assert abs(w_ref - w_single) <= 0.02 * abs(w_ref)
+
+
+def test_sparse_reservoir_init():
+    import scipy.sparse as sp
+    from core.reservoir import estimate_spectral_radius
+
+    engine = BiCortexEngine(n_sensory=2, n_concept=2, n_motor=1, n_mem=400, seed=0, sparse=True)
+    engine.init_memory_reservoir(density=0.1, spectral_radius=0.9, radius_tol=1e-6)
+
+    block = engine.W[engine.n_think:, engine.n_think:]
+    assert sp.issparse(block)
+    assert abs(block.nnz / 400 ** 2 - 0.1) < 0.01
+    # Dale's Law: 興奮性 pre からの重みは正、抑制性 pre からは負
+    coo = block.tocoo()
+    assert np.all(coo.data[engine.mem_exc_mask[coo.col]] > 0)
+    assert np.all(coo.data[engine.mem_inh_mask[coo.col]] < 0)
+    # 反復法による推定が dense な固有値分解と一致すること
+    exact = np.max(np.abs(np.linalg.eigvals(block.toarray())))
+    assert abs(exact - 0.9) < 1e-4
+    assert abs(estimate_spectral_radius(block, tol=1e-6) - exact) < 1e-4
+    assert engine.mask_plastic[engine.n_think:, engine.n_think:].nnz == block.nnz
+
+
+def test_sparse_random_positions_memory_is_linear_in_nnz():
+    import tracemalloc
+    from core.reservoir import random_dale_reservoir, sparse_random_positions
+
+    # n^2 = 10^10 の添字を列挙すると 80 GB 必要だが、nnz = 約 5 x 10^5 の数倍のメモリで済む
+    n = 100_000
+    tracemalloc.start()
+    rows, cols = sparse_random_positions(n, n, 5e-5, np.random.default_rng(0))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nnz = len(rows)
+    assert abs(nnz / n ** 2 - 5e-5) < 5e-6
+    assert peak < 8 * 16 * nnz
+    keys = rows * n + cols
+    assert np.all(np.diff(keys) > 0)
+
+    # 高密度でも各要素は1回ずつ
+    exc = np.arange(50) < 40
+    W = random_dale_reservoir(50, exc, 0.9, np.random.default_rng(1))
+    assert abs(W.nnz / 2500 - 0.9) < 0.05 and W.nnz == np.count_nonzero(W.toarray())
+
+
+def test_instrumentation_counters_and_hooks():
+    series = pavlov_inputs(400)
+    reference = run_engine(build_pavlov_engine(init_method="sparse"), series)
+
+    summaries = []
+    for kwargs in (dict(init_method="sparse"), dict(sparse=True)):
+        engine = build_pavlov_engine(**kwargs)
+        inst = engine.attach_instrumentation()
+        hook_steps = []
+        inst.add_hook(lambda eng, spikes, t: hook_steps.append(t))
+        spikes = run_engine(engine, series)
+        np.testing.assert_array_equal(spikes, reference)
+        assert hook_steps == list(range(400))
+        summaries.append(inst.summary())
+
+    for summary in summaries:
+        assert summary["steps"] == 400
+        assert summary["spikes"]["concept"] == int(reference[:, 2:4].sum())
+        assert summary["spikes"]["mem"] == int(reference[:, 5:].sum())
+        assert summary["gate_open_steps"] > 0
+        assert set(summary["phases"]) == {"integration", "fire_reset", "trace", "gating", "plasticity"}
+    # 疎・密で同じシナプスが更新される
+    assert summaries[0]["hebbian_updates"] == summaries[1]["hebbian_updates"] > 0
+    assert summaries[0]["decay_ops"] == summaries[1]["decay_ops"] > 0
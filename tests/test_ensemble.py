@@ -0,0 +1,63 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.ensemble import BiCortexEnsemble
+from test_engine import build_pavlov_engine, pavlov_inputs, run_engine
+
+
+def test_ensemble_matches_independent_engines():
+    configs = [
+        dict(learning_rate=0.001, gate_ratio=0.15, global_decay=0.005, adaptation_step=0.3),
+        dict(learning_rate=0.005, gate_ratio=0.3, global_decay=0.001, adaptation_step=0.1),
+        dict(learning_rate=0.002, gate_ratio=0.15, global_decay=0.0, adaptation_step=0.5),
+    ]
+    series = pavlov_inputs(600)
+    ensemble = BiCortexEnsemble([build_pavlov_engine(**c) for c in configs])
+    spikes_batched = ensemble.run(series)
+
+    for b, c in enumerate(configs):
+        engine = build_pavlov_engine(**c)
+        spikes_single = run_engine(engine, series)
+        np.testing.assert_array_equal(spikes_batched[:, b], spikes_single > 0)
+        np.testing.assert_allclose(ensemble.W[b], engine.W, atol=1e-10)
+        assert ensemble.is_gating[b] == engine.is_gating
+
+
+def test_ensemble_per_network_masks_match_independent_engines():
+    def build(b):
+        engine = build_pavlov_engine(global_decay=0.005 * (b + 1))
+        if b:
+            engine.mask_plastic[np.ix_(engine.idx_mem[10:20], engine.idx_mem[0:5])] = False
+        return engine
+
+    series = pavlov_inputs(600)
+    ensemble = BiCortexEnsemble([build(b) for b in range(2)])
+    assert ensemble.mask_plastic.ndim == 3
+    spikes_batched = ensemble.run(series)
+    for b in range(2):
+        engine = build(b)
+        np.testing.assert_array_equal(spikes_batched[:, b], run_engine(engine, series) > 0)
+        np.testing.assert_allclose(ensemble.W[b], engine.W, atol=1e-10)
+
+
+def test_ensemble_write_back():
+    engines = [build_pavlov_engine(), build_pavlov_engine(learning_rate=0.01)]
+    ensemble = BiCortexEnsemble(engines)
+    ensemble.run(pavlov_inputs(300))
+    ensemble.write_back(engines)
+    np.testing.assert_array_equal(engines[1].W, ensemble.W[1])
+    np.testing.assert_array_equal(engines[0].v, ensemble.v[0])
+
+
+def test_ensemble_rejects_plastic_store_and_block_engines():
+    for kwargs in (dict(plastic_store=True), dict(block_structured=True)):
+        engine = build_pavlov_engine(**kwargs)
+        run_engine(engine, pavlov_inputs(300))
+        with pytest.raises(ValueError):
+            BiCortexEnsemble([engine])
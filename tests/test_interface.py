@@ -0,0 +1,45 @@
+import sys
+import os
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.interface import InterfaceProjection
+from test_engine import build_pavlov_engine
+
+
+def test_projection_single_batch_and_injection():
+    engine = build_pavlov_engine(n_mem=200)
+    projection = InterfaceProjection(576, engine.n_mem, density=0.05, seed=1)
+    rng = np.random.default_rng(0)
+    features = rng.random((8, 576)) * 6.0
+
+    batch = projection.project(features)
+    assert batch.shape == (8, engine.n_mem)
+    np.testing.assert_allclose(batch[3], projection.project(features[3]))
+    np.testing.assert_allclose(batch, features @ projection.P.toarray().T)
+
+    # 既定では記憶野のみの疎な入力 (indices, values) を返す
+    indices, values = projection.inject(engine, features[0])
+    assert np.all(indices >= engine.n_think)
+    current = np.zeros(engine.n_total)
+    current[indices] = values
+    np.testing.assert_allclose(current[engine.idx_mem], batch[0])
+
+    out = np.zeros(engine.n_total)
+    assert projection.inject(engine, features[0], out=out) is out
+    np.testing.assert_array_equal(out, current)
+    reference = build_pavlov_engine(n_mem=200)
+    np.testing.assert_array_equal(engine.step((indices, values)), reference.step(out))
+
+
+def test_calibration_sets_mean_current():
+    projection = InterfaceProjection(576, 100, density=0.1, seed=2)
+    features = np.random.default_rng(3).random((32, 576))
+    structure = projection.P.indices.copy()
+    projection.calibrate(features, target_mean=0.5)
+
+    np.testing.assert_allclose(projection.project(features).mean(axis=0), 0.5)
+    np.testing.assert_array_equal(projection.P.indices, structure)
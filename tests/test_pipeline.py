@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.pipeline import StreamingPipeline
+from test_engine import build_pavlov_engine
+
+
+def frame_source(n_frames):
+    for i in range(n_frames):
+        yield np.full(3, float(i % 2))
+
+
+def test_pipeline_holds_each_frame():
+    engine = build_pavlov_engine()
+    seen = []
+    pipeline = StreamingPipeline(
+        engine, frame_source(5), encoder=lambda frame: frame * 20.0,
+        steps_per_frame=7, drop_policy="block", realtime=False,
+        callbacks=[lambda t, spikes, eng: seen.append(t)], stats_window=10,
+    )
+    report = pipeline.run()
+
+    assert report["frames_used"] == 5
+    assert report["frames_dropped"] == 0
+    assert report["steps"] == 35
+    assert seen == list(range(35))
+    assert report["latency_s"]["max"] >= report["latency_s"]["mean"] >= 0.0
+    # 統計の保持は直近 stats_window 件のみ (平均・最大は全ステップ分)
+    assert pipeline._step_times.count == 35 and len(pipeline._step_times.recent) == 10
+
+
+def test_pipeline_drops_frames_under_backpressure():
+    engine = build_pavlov_engine()
+
+    # 1ステップ 2ms x 20ステップ/フレームに対し、エンコードは即座に完了するためキューが溢れる
+    pipeline = StreamingPipeline(
+        engine, frame_source(50), encoder=lambda frame: frame * 20.0,
+        steps_per_frame=20, queue_size=2, drop_policy="oldest", realtime=True, time_scale=2.0,
+    )
+    report = pipeline.run()
+
+    assert report["frames_dropped"] > 0
+    assert report["frames_used"] + report["frames_dropped"] == 50
+    assert report["steps"] == 20 * report["frames_used"]
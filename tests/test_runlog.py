@@ -0,0 +1,55 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.probes import SpikeProbe, StateProbe, WeightProbe
+from core.runlog import RunLog, RunLogger
+from test_engine import build_pavlov_engine, pavlov_inputs
+
+
+def test_runlogger_chunks_match_in_memory_probes(tmp_path):
+    series = pavlov_inputs(1000)
+    engine = build_pavlov_engine()
+    mem_bell, mem_food = engine.idx_mem[0:10], engine.idx_mem[10:20]
+    logger = RunLogger(str(tmp_path / "log"), regions={"mem": engine.idx_mem, "motor": engine.idx_motor},
+                       weights={"bell_food": (mem_food, mem_bell)}, chunk_steps=128, weight_every=10)
+    probes = [
+        logger,
+        SpikeProbe("mem", engine.idx_mem),
+        StateProbe("gate", "is_gating"),
+        StateProbe("ma", "activity_ma"),
+        WeightProbe("w", mem_food, mem_bell, every=10),
+    ]
+    # 2回に分けて実行しても連続した時刻で記録される
+    logs_a = {k: v for k, v in engine.run(series[:600], probes=probes).items() if k != "runlog"}
+    logs_b = engine.run(series[600:], probes=probes)
+    reference = {k: np.concatenate([logs_a[k], logs_b[k]]) for k in logs_a}
+
+    log = RunLog(str(tmp_path / "log"))
+    assert log.n_steps == 1000 and len(log.chunks) == 9
+    assert logs_b["runlog"].n_steps == 1000
+    np.testing.assert_array_equal(log.state("is_gating"), reference["gate"])
+    np.testing.assert_allclose(log.state("activity_ma", 100, 400), reference["ma"][100:400])
+    np.testing.assert_array_equal(log.spikes("mem").to_raster(), reference["mem"])
+    np.testing.assert_array_equal(log.spikes("mem", 250, 390).to_raster(), reference["mem"][250:390])
+    t, w = log.weights("bell_food", 120, 730)
+    np.testing.assert_array_equal(t, np.arange(120, 730, 10))
+    np.testing.assert_allclose(w, reference["w"][12:73])
+    assert len(log.states_frame(0, 50)) == 50
+
+
+def test_runlogger_rejects_appending_with_different_weight_every(tmp_path):
+    engine = build_pavlov_engine()
+    mem_bell, mem_food = engine.idx_mem[0:10], engine.idx_mem[10:20]
+    layout = dict(regions={"mem": engine.idx_mem}, weights={"bell_food": (mem_food, mem_bell)}, chunk_steps=64)
+    engine.run(pavlov_inputs(100), probes=[RunLogger(str(tmp_path / "log"), weight_every=10, **layout)])
+    # 間隔が違うと追記後の重み時刻が復元できないため拒否する
+    with pytest.raises(ValueError, match="weight_every"):
+        engine.run(pavlov_inputs(100), probes=[RunLogger(str(tmp_path / "log"), weight_every=20, **layout)])
+    engine.run(pavlov_inputs(100), probes=[RunLogger(str(tmp_path / "log"), weight_every=10, **layout)])
+    assert RunLog(str(tmp_path / "log")).n_steps == 200
@@ -0,0 +1,107 @@
+import sys
+import os
+import asyncio
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.serving import TenantPool, TenantServer
+from test_engine import build_pavlov_engine, dense_weights, pavlov_inputs
+
+
+def tenant_inputs(engine, n_tenants, total_steps):
+    """テナントごとに提示タイミングをずらした入力 (n_tenants, total_steps, n_total)"""
+    series = np.zeros((n_tenants, total_steps, engine.n_total))
+    for i in range(n_tenants):
+        series[i, :, engine.idx_sensory] = np.roll(pavlov_inputs(total_steps), 40 * i, axis=0).T
+    return series
+
+
+def test_tenant_pool_matches_independent_engines():
+    for kwargs in ({}, dict(sparse=True, init_method="sparse")):
+        template = build_pavlov_engine(**kwargs)
+        pool = TenantPool(template, capacity=1)
+        engines = [build_pavlov_engine(**kwargs) for _ in range(3)]
+        for name in ("a", "b", "c"):
+            pool.add_tenant(name)
+        series = tenant_inputs(template, 3, 600)
+
+        for t in range(600):
+            # "c" は偶数ステップのみ進める (部分バッチ)
+            ids = ["a", "b", "c"] if t % 2 == 0 else ["b", "a"]
+            rows = {"a": 0, "b": 1, "c": 2}
+            spikes = pool.step_batch(ids, [series[rows[i], t // (2 if i == "c" else 1)] for i in ids])
+            for b, i in enumerate(ids):
+                expected = engines[rows[i]].step(series[rows[i], t // (2 if i == "c" else 1)])
+                np.testing.assert_array_equal(spikes[b], expected)
+
+        for name, engine in zip(("a", "b", "c"), engines):
+            W = dense_weights(engine)
+            np.testing.assert_allclose(pool.plastic_weights(name), W[pool.plastic_post, pool.plastic_pre],
+                                       atol=1e-12)
+            restored = build_pavlov_engine(**kwargs)
+            pool.write_back(name, restored)
+            np.testing.assert_allclose(dense_weights(restored), W, atol=1e-12)
+            np.testing.assert_allclose(restored.v, engine.v, atol=1e-12)
+        assert pool.tenant_nbytes * 4 < dense_weights(template).nbytes
+
+    pool.remove_tenant("a")
+    assert pool.tenants == ["c", "b"] and "a" not in pool
+    np.testing.assert_allclose(pool.plastic_weights("c"),
+                               dense_weights(engines[2])[pool.plastic_post, pool.plastic_pre], atol=1e-12)
+
+
+def test_tenant_server_batches_concurrent_requests():
+    template = build_pavlov_engine()
+    series = tenant_inputs(template, 4, 200)
+    reference = TenantPool(template)
+    pool = TenantPool(template)
+    for i in range(4):
+        reference.add_tenant(i)
+        pool.add_tenant(i)
+    expected = np.stack([reference.step_batch(range(4), series[:, t]) for t in range(200)], axis=1)
+
+    async def client(server, i):
+        return [await server.step(i, series[i, t]) for t in range(200)]
+
+    async def main():
+        async with TenantServer(pool, max_batch=4) as server:
+            results = await asyncio.gather(*(client(server, i) for i in range(4)))
+            # 同じテナントの連続した要求は到着順に処理される
+            extra = await asyncio.gather(server.step(0), server.step(0))
+        return results, extra, server.report()
+
+    results, extra, report = asyncio.run(main())
+    np.testing.assert_array_equal(np.array(results), expected)
+    np.testing.assert_array_equal(np.array(extra), [reference.step(0), reference.step(0)])
+    np.testing.assert_array_equal(pool.weights[:4], reference.weights[:4])
+    assert report["requests"] == 802 and report["mean_batch_size"] > 3.0
+
+
+def test_tenant_server_isolates_malformed_inputs():
+    template = build_pavlov_engine()
+    reference = TenantPool(template)
+    for i in range(3):
+        reference.add_tenant(i)
+    expected = reference.step_batch([0, 2], None)
+
+    async def main(pool):
+        async with TenantServer(pool, max_batch=3) as server:
+            return await asyncio.gather(server.step(0), server.step(1, np.zeros(5)), server.step(2),
+                                        return_exceptions=True)
+
+    for validate in (True, False):
+        pool = TenantPool(template)
+        for i in range(3):
+            pool.add_tenant(i)
+        if not validate:
+            # 検証をすり抜けた入力でバッチが失敗しても、テナントごとの再実行で原因の要求だけが失敗する
+            pool.check_input = lambda input_current: None
+        results = asyncio.run(main(pool))
+        assert isinstance(results[1], ValueError)
+        np.testing.assert_array_equal(np.array([results[0], results[2]]), expected)
+        np.testing.assert_array_equal(pool.weights[:3], reference.weights[:3])
+        # 失敗したテナントの状態は変わらない
+        np.testing.assert_array_equal(pool.v[:3], reference.v[:3])
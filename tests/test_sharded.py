@@ -0,0 +1,64 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.probes import SpikeProbe, StateProbe, WeightProbe
+from core.sharded import ShardedEngine, partition_rows
+from test_engine import build_pavlov_engine, dense_weights, pavlov_inputs
+
+
+def test_partition_rows_balances_nonzeros():
+    indptr = np.concatenate([[0], np.cumsum([100, 0, 0, 0, 100, 0, 0, 0])])
+    bounds = partition_rows(indptr, 2, row_cost=1.0)
+    assert bounds[0] == 0 and bounds[-1] == 8 and bounds[1] == 4
+
+
+def test_sharded_engine_matches_single_process():
+    series = pavlov_inputs(600)
+
+    def probes(engine):
+        mem_bell, mem_food = engine.idx_mem[0:10], engine.idx_mem[10:20]
+        return [
+            SpikeProbe("spikes", np.arange(engine.n_total)),
+            StateProbe("gate", "is_gating"),
+            WeightProbe("w", mem_food, mem_bell, every=50),
+        ]
+
+    reference = build_pavlov_engine(sparse=True, init_method="sparse")
+    logs_ref = reference.run(series, probes=probes(reference))
+
+    engine = build_pavlov_engine(sparse=True, init_method="sparse")
+    with ShardedEngine(engine, n_shards=3) as sharded:
+        assert sharded.n_shards == 3
+        logs = sharded.run(series, probes=probes(engine))
+
+    for key in logs_ref:
+        np.testing.assert_array_equal(logs[key], logs_ref[key])
+    assert logs["gate"].max() == 1.0
+    # close() で重み・状態が元のエンジンへ書き戻される
+    np.testing.assert_array_equal(dense_weights(engine), dense_weights(reference))
+    np.testing.assert_array_equal(engine.e_trace, reference.e_trace)
+    assert engine.activity_ma == reference.activity_ma
+
+
+def test_sharded_engine_raises_when_a_worker_dies():
+    engine = build_pavlov_engine(sparse=True, init_method="sparse")
+    w_before = dense_weights(engine).copy()
+    sharded = ShardedEngine(engine, n_shards=2, timeout=2.0)
+    sharded.step(np.zeros(engine.n_total))
+    sharded._workers[1].kill()
+    sharded._workers[1].join()
+    # 無期限に待たず、異常終了したワーカーを報告する
+    with pytest.raises(RuntimeError, match="worker"):
+        sharded.step(np.zeros(engine.n_total))
+    with pytest.raises(RuntimeError):
+        sharded.step(np.zeros(engine.n_total))
+    sharded.close()
+    assert not any(proc.is_alive() for proc in sharded._workers)
+    # 途中までの更新はエンジンへ書き戻さない
+    np.testing.assert_array_equal(dense_weights(engine), w_before)
@@ -0,0 +1,90 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from core.probes import SpikeProbe, WeightProbe
+from core.sharded import ShardedEngine
+from core.stimulus import StimulusSchedule
+from test_engine import build_pavlov_engine, dense_weights, pavlov_inputs
+
+
+def pavlov_schedule(total_steps=1000):
+    """pavlov_inputs と同じ入力のスケジュール"""
+    schedule = StimulusSchedule(total_steps, n_channels=2)
+    for t in range(100, total_steps - 150, 150):
+        schedule.add(t, 50, 0, 10.0).add(t + 60, 30, 1, 10.0)
+    return schedule
+
+
+def test_schedule_compiles_to_dense_series():
+    np.testing.assert_array_equal(pavlov_schedule(1000).to_dense(), pavlov_inputs(1000))
+
+    schedule = StimulusSchedule(100, n_channels=3)
+    schedule.add(10, 20, [0, 2], [1.0, 2.0]).add(20, 200, 2, 0.5)
+    dense = schedule.to_dense()
+    assert dense[15, 2] == 2.0 and dense[25, 2] == 2.5 and dense[99, 2] == 0.5
+    np.testing.assert_array_equal(schedule.to_sparse().toarray(), dense)
+    assert schedule.quiet_until(0) == 10 and schedule.quiet_until(15) == 15
+    indices, values = schedule.at(25)
+    np.testing.assert_array_equal(indices, [0, 2])
+    np.testing.assert_array_equal(values, [1.0, 2.5])
+    assert schedule.nbytes < dense.nbytes
+    with pytest.raises(ValueError):
+        schedule.add(0, 10, 3, 1.0)
+    for t in (-1, 100):
+        with pytest.raises(ValueError):
+            schedule.at(t)
+        with pytest.raises(ValueError):
+            schedule.quiet_until(t)
+
+    # 重なり合う多数のイベントも dense に積み上げた入力と一致する
+    rng = np.random.default_rng(0)
+    schedule, expected = StimulusSchedule(500, n_channels=4), np.zeros((500, 4))
+    for _ in range(200):
+        start, duration, channel = int(rng.integers(0, 500)), int(rng.integers(0, 40)), int(rng.integers(0, 4))
+        schedule.add(start, duration, channel, 1.0)
+        expected[start:start + duration, channel] += 1.0
+    np.testing.assert_array_equal(schedule.to_dense(), expected)
+
+
+def test_run_with_schedule_matches_dense_series():
+    schedule = pavlov_schedule(1000)
+    for kwargs in ({}, dict(sparse=True, init_method="sparse"), dict(event_driven=True)):
+        results = []
+        for series, ff in ((pavlov_inputs(1000), False), (schedule, False), (schedule, True)):
+            engine = build_pavlov_engine(**kwargs)
+            probes = [
+                SpikeProbe("spikes", np.arange(engine.n_total)),
+                WeightProbe("w", engine.idx_mem[10:20], engine.idx_mem[0:10], every=100),
+            ]
+            results.append((engine, engine.run(series, probes=probes, fast_forward=ff)))
+        (reference, ref_log), *others = results
+        for engine, log in others:
+            np.testing.assert_array_equal(log["spikes"], ref_log["spikes"])
+            np.testing.assert_allclose(log["w"], ref_log["w"], atol=1e-12)
+            np.testing.assert_allclose(dense_weights(engine), dense_weights(reference), atol=1e-12)
+
+    # step() は疎な (indices, values) 入力も受け付ける
+    reference, engine = build_pavlov_engine(), build_pavlov_engine()
+    current = np.zeros(reference.n_total)
+    current[reference.idx_sensory[0]] = 10.0
+    for _ in range(20):
+        np.testing.assert_array_equal(engine.step((engine.idx_sensory[:1], np.array([10.0]))),
+                                      reference.step(current))
+    np.testing.assert_array_equal(engine.v, reference.v)
+
+
+def test_sharded_engine_runs_schedule():
+    schedule = pavlov_schedule(600)
+    reference = build_pavlov_engine(sparse=True, init_method="sparse")
+    expected = reference.run(schedule.to_dense(), probes=[SpikeProbe("spikes", np.arange(reference.n_total))])
+    engine = build_pavlov_engine(sparse=True, init_method="sparse")
+    with ShardedEngine(engine, n_shards=2) as sharded:
+        log = sharded.run(schedule, probes=[SpikeProbe("spikes", np.arange(engine.n_total))])
+    np.testing.assert_array_equal(log["spikes"], expected["spikes"])
+    np.testing.assert_allclose(dense_weights(engine), dense_weights(reference), atol=1e-12)
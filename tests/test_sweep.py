@@ -0,0 +1,52 @@
+import sys
+import os
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.sweep import grid_space, random_space, run_sweep, task_key
+
+
+def weighted_sum(params, seed, input_series, offset):
+    """テスト用シナリオ: 共有メモリ上の刺激を読むだけの軽量な評価"""
+    return {"score": float(input_series.sum() * params["gain"] + seed + offset)}
+
+
+def test_sweep_parallel_matches_serial_and_resumes(tmp_path):
+    stimulus = {"input_series": np.arange(12.0).reshape(4, 3)}
+    param_sets = grid_space(gain=[0.5, 2.0], bias=[0])
+    expected = {(p["gain"], s): 66.0 * p["gain"] + s + 1 for p in param_sets for s in range(3)}
+
+    serial = run_sweep(weighted_sum, param_sets, range(3), stimulus, {"offset": 1}, n_workers=1, verbose=False)
+    parallel = run_sweep(weighted_sum, param_sets, range(3), stimulus, {"offset": 1}, n_workers=2, verbose=False)
+    for df in (serial, parallel):
+        assert len(df) == 6
+        for _, row in df.iterrows():
+            assert row["score"] == expected[(row["gain"], row["seed"])]
+
+    # 途中まで実行した結果ファイルから再開する
+    path = str(tmp_path / "results.csv")
+    run_sweep(weighted_sum, param_sets[:1], range(3), stimulus, {"offset": 1}, n_workers=1,
+              results_path=path, verbose=False)
+    resumed = run_sweep(weighted_sum, param_sets, range(3), stimulus, {"offset": 1}, n_workers=2,
+                        results_path=path, verbose=False)
+    assert len(resumed) == 6
+    assert sorted(zip(resumed["gain"], resumed["seed"])) == sorted(expected)
+
+
+def test_sweep_resume_keeps_numeric_looking_task_keys(tmp_path):
+    # gain=447 のハッシュは数字だけになり、CSV から数値として読まれると照合に失敗する
+    param_sets = [{"gain": 447}]
+    assert task_key(param_sets[0], 0).isdigit()
+    stimulus = {"input_series": np.ones((2, 2))}
+    path = str(tmp_path / "results.csv")
+    run_sweep(weighted_sum, param_sets, [0], stimulus, {"offset": 0}, n_workers=1, results_path=path, verbose=False)
+    resumed = run_sweep(weighted_sum, param_sets, [0], stimulus, {"offset": 0}, n_workers=1,
+                        results_path=path, verbose=False)
+    assert len(resumed) == 1
+
+def test_random_space_ranges():
+    samples = random_space(50, seed=1, lr=(1e-4, 1e-2, "log"), decay=(0.0, 0.01), mode=["a", "b"])
+    assert len(samples) == 50
+    assert all(1e-4 <= s["lr"] <= 1e-2 and 0.0 <= s["decay"] <= 0.01 and s["mode"] in "ab" for s in samples)
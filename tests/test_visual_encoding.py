@@ -1,6 +1,7 @@
 import sys
 import os
 import numpy as np
+import pytest
 from PIL import Image
 
 # プロジェクトルートをパスに追加
@@ -40,5 +41,86 @@ def test_visual_encoder():
     else:
         print("\n❌ Test Failed.")
 
+def test_encode_batch_and_cache(tmp_path):
+    print("=== Testing Batched Encoding & Feature Cache ===")
+    images = [Image.new('RGB', (128, 128), color=c) for c in ('red', 'blue', 'green', 'white')]
+
+    encoder = VisualEncoder(num_workers=2, cache_dir=str(tmp_path))
+    features = encoder.encode_batch(images, batch_size=3)
+    single = np.stack([encoder.encode(img) for img in images])
+
+    assert features.shape == (4, 576)
+    np.testing.assert_allclose(features, single, atol=1e-5)
+    # 2回目以降はキャッシュから返される
+    assert encoder.cache.hits == 4
+    streamed = np.stack(list(encoder.iter_encode(iter(images), batch_size=3)))
+    np.testing.assert_array_equal(streamed, features)
+
+    # サイズ上限を超えた分は古い順に削除される
+    small = VisualEncoder(cache_dir=str(tmp_path / "small"), cache_max_bytes=2 * features[0].nbytes + 512)
+    small.encode_batch(images)
+    assert len(os.listdir(tmp_path / "small")) == 2
+    encoder.close()
+
+def test_lazy_torch_import():
+    import subprocess
+    src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+    code = ("import sys; sys.path.insert(0, %r); from core.visual import VisualEncoder; "
+            "VisualEncoder(); print('torch' in sys.modules)" % src_dir)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_traced_runtime_matches_float_model(tmp_path):
+    print("=== Testing TorchScript Runtime ===")
+    images = [Image.new('RGB', (128, 128), color=c) for c in ('red', 'blue', 'green')]
+    reference = VisualEncoder().encode_batch(images)
+
+    traced = VisualEncoder(runtime="traced", model_cache_dir=str(tmp_path), calibration_images=images)
+    features = traced.encode_batch(images)
+    print(f"Accuracy Report: {traced.accuracy_report}")
+    assert traced.runtime == "traced"
+    np.testing.assert_allclose(features, reference, atol=1e-4)
+
+    # 2回目以降はディスク上のグラフを読み込み、float モデルを構築しない
+    cached = VisualEncoder(runtime="traced", model_cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cached.encode_batch(images), features)
+    assert cached._model is None
+
+
+
+def test_calibration_split_holds_out_validation_images():
+    images = [Image.new('RGB', (32, 32), color=(i, 0, 0)) for i in range(8)]
+    calibration, validation = VisualEncoder(calibration_images=images)._calibration_split()
+    assert len(calibration) == 6 and len(validation) == 2
+    assert not set(map(id, calibration)) & set(map(id, validation))
+
+    calibration, validation = VisualEncoder(calibration_images=images[:5],
+                                            validation_images=images[5:])._calibration_split()
+    assert calibration == images[:5] and validation == images[5:]
+
+
+def test_quantized_runtime_validates_on_held_out_images(tmp_path):
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("torchvision")
+    if torch.backends.quantized.engine == "none":
+        pytest.skip("no quantized engine on this platform")
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 256, (128, 128, 3), dtype=np.uint8)) for _ in range(8)]
+
+    encoder = VisualEncoder(runtime="quantized", model_cache_dir=str(tmp_path), calibration_images=images[:6],
+                            validation_images=images[6:], min_cosine=0.0)
+    features = encoder.encode_batch(images[6:])
+    report = encoder.accuracy_report
+    print(f"Accuracy Report: {report}")
+    assert encoder.runtime == "quantized"
+    assert report["n_calibration"] == 6 and report["n_images"] == 2
+    assert features.shape == (2, 576)
+    # 検証画像上の精度がそのまま float モデルとの差を表す
+    reference = VisualEncoder().encode_batch(images[6:])
+    cosine = (features * reference).sum(axis=1) / np.linalg.norm(features, axis=1) / np.linalg.norm(reference, axis=1)
+    assert abs(cosine.min() - report["min_cosine"]) < 1e-3
+
+
 if __name__ == "__main__":
     test_visual_encoder()
\ No newline at end of file